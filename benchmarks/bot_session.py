@@ -0,0 +1,109 @@
+# Update decoding with every JSON library and Bot API calls through default and pooled sessions
+# against a local stub server
+#
+#     python -m benchmarks.bot_session
+import asyncio
+import importlib.util
+import json
+import time
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+from aiohttp import web
+
+from dresscode_bot.services.telegram.enums import JsonLibraryEnum
+from dresscode_bot.services.telegram.session import PooledSession, get_json_functions
+
+PORT = 8765
+DECODES = 50000
+VALIDATES = 20000
+CALL_ROUNDS = 200
+CONCURRENCY = 10
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 5,
+        "date": 1700000000,
+        "chat": {"id": -100123, "type": "supergroup", "title": "Группа"},
+        "from": {
+            "id": 42,
+            "is_bot": False,
+            "first_name": "Иван",
+            "last_name": "Петров",
+            "username": "ivan",
+            "language_code": "ru",
+        },
+        "text": "Привет всем, посмотрите https://example.com " * 5,
+        "entities": [{"type": "url", "offset": 24, "length": 19}],
+    },
+}
+ME = {"ok": True, "result": {"id": 1, "is_bot": True, "first_name": "bot", "username": "bot"}}
+
+
+def decode():
+    raw = json.dumps(UPDATE)
+    for library in JsonLibraryEnum:
+        try:
+            loads, _ = get_json_functions(library)
+        except ImportError:
+            print(f"{library.value}: not installed")
+            continue
+
+        started = time.perf_counter()
+        for _ in range(DECODES):
+            loads(raw)
+        decoded = DECODES / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(VALIDATES):
+            Update.model_validate(loads(raw))
+        validated = VALIDATES / (time.perf_counter() - started)
+
+        print(f"{library.value}: decode {decoded:,.0f}/s, decode and validate {validated:,.0f}/s")
+
+
+async def handle(request: web.Request) -> web.Response:
+    await request.read()
+    return web.json_response(ME)
+
+
+async def call():
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", PORT).start()
+
+    api = TelegramAPIServer.from_base(f"http://127.0.0.1:{PORT}")
+    library = JsonLibraryEnum.ORJSON if importlib.util.find_spec("orjson") else JsonLibraryEnum.JSON
+    sessions = [
+        ("default", AiohttpSession(api=api)),
+        (f"pooled, {library.value}", PooledSession(json_library=library)),
+    ]
+    try:
+        for name, session in sessions:
+            session.api = api
+            bot = Bot("1:token", session=session)
+            # Warm up connection pool
+            await bot.get_me()
+
+            started = time.perf_counter()
+            for _ in range(CALL_ROUNDS):
+                await asyncio.gather(*(bot.get_me() for _ in range(CONCURRENCY)))
+            elapsed = time.perf_counter() - started
+            calls = CALL_ROUNDS * CONCURRENCY
+            print(
+                f"{name}: {elapsed / CALL_ROUNDS * 1000:.2f} ms per {CONCURRENCY} concurrent "
+                f"calls, {calls / elapsed:,.0f} calls/s",
+            )
+            await session.close()
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    decode()
+    asyncio.run(call())
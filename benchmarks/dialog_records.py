@@ -0,0 +1,123 @@
+# Dialog lookups through ORM entities against frozen read models on a SQLite database: middleware
+# loads user and FSM storage loads dialog state for every update
+#
+#     python -m benchmarks.dialog_records
+import asyncio
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.models import (
+    Chat,
+    ChatUser,
+    RoleEnum,
+    User,
+    UserDialog,
+    UserSettings,
+)
+
+USERS = 10000
+CHATS = 2000
+CHATS_PER_USER = 5
+CONCURRENCY = 100
+
+Lookup = Callable[[database.Service, int], Awaitable[Any]]
+
+
+async def seed(dsn: str):
+    random.seed(0)
+    engine = create_async_engine(dsn)
+    async with engine.begin() as connection:
+        ids = range(1, USERS + 1)
+        await connection.execute(
+            insert(User),
+            [{"telegram_id": id, "full_name": f"user {id}"} for id in ids],
+        )
+        await connection.execute(insert(UserSettings), [{"user_id": id} for id in ids])
+        await connection.execute(
+            insert(UserDialog),
+            [
+                {"user_id": id, "state": "DialogState:add_manager", "data": {"chat_id": -1}}
+                for id in ids
+            ],
+        )
+        await connection.execute(
+            insert(Chat),
+            [
+                {"telegram_id": -id, "owner_id": id, "title": f"chat {id}"}
+                for id in range(1, CHATS + 1)
+            ],
+        )
+        await connection.execute(
+            insert(ChatUser),
+            [
+                {"user_id": id, "chat_id": -chat_id, "role": RoleEnum.MEMBER}
+                for id in ids
+                for chat_id in random.sample(range(1, CHATS + 1), CHATS_PER_USER)
+            ],
+        )
+    await engine.dispose()
+
+
+async def entities(database_service: database.Service, id: int) -> Any:
+    user = await database_service.get_user(id=id)
+    # Storage loaded the user entity again to read dialog state
+    state = (await database_service.get_user(id=id)).dialog.state
+    return user, state
+
+
+async def records(database_service: database.Service, id: int) -> Any:
+    user = await database_service.get_user_record(id=id)
+    state = (await database_service.get_dialog(user_id=id)).state
+    return user, state
+
+
+async def run(database_service: database.Service, lookup: Lookup) -> list[Any]:
+    # Results are kept like handler data of concurrent updates
+    held = []
+    for start in range(1, USERS + 1, CONCURRENCY):
+        held.extend(await asyncio.gather(*(
+            lookup(database_service, id) for id in range(start, start + CONCURRENCY)
+        )))
+    return held
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        dsn = f"sqlite+aiosqlite:///{Path(directory) / 'db.sqlite3'}"
+        database_service = database.Service(dsn=dsn)
+        await database_service.migrate_async()
+        await seed(dsn=dsn)
+
+        lookups = (("entities", entities), ("records", records))
+        # Speed is measured without tracemalloc, it slows allocations down a lot
+        for name, lookup in lookups * 2:
+            started = time.perf_counter()
+            await run(database_service=database_service, lookup=lookup)
+            print(f"{name}: {USERS / (time.perf_counter() - started):,.0f} dialogs/s")
+
+        for name, lookup in lookups:
+            gc.collect()
+            tracemalloc.start()
+            held = await run(database_service=database_service, lookup=lookup)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{name}: held {current / 2 ** 20:.1f} MiB, peak {peak / 2 ** 20:.1f} MiB, "
+                f"{current / len(held):,.0f} B per dialog",
+            )
+            del held
+
+        await database_service.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+# Matching speed of compiled chat filter against naive substring scanning
+#
+#     python -m benchmarks.filter_rules
+import random
+import string
+import time
+from types import SimpleNamespace
+
+from dresscode_bot.services.database.models import FilterRuleKindEnum
+from dresscode_bot.services.telegram.functions.filter import compile_filter
+
+WORDS = 9900
+DOMAINS = 90
+REGEXES = 10
+MESSAGES = 2000
+NAIVE_MESSAGES = 200
+
+
+def random_word(length: int) -> str:
+    return "".join(random.choices(string.ascii_lowercase, k=length))
+
+
+def get_rules() -> list[SimpleNamespace]:
+    rules = [
+        SimpleNamespace(kind=FilterRuleKindEnum.WORD, pattern=random_word(random.randint(5, 10)))
+        for _ in range(WORDS)
+    ]
+    rules += [
+        SimpleNamespace(kind=FilterRuleKindEnum.DOMAIN, pattern=f"{random_word(8)}.com")
+        for _ in range(DOMAINS)
+    ]
+    rules += [
+        SimpleNamespace(kind=FilterRuleKindEnum.REGEX, pattern=rf"buy\s+{random_word(5)}")
+        for _ in range(REGEXES)
+    ]
+    return rules
+
+
+def main():
+    random.seed(1)
+    rules = get_rules()
+    messages = [
+        " ".join(random_word(random.randint(2, 9)) for _ in range(30))
+        for _ in range(MESSAGES)
+    ]
+    average = sum(map(len, messages)) / len(messages)
+    print(f"rules: {len(rules)}, average message: {average:.0f} chars")
+
+    started = time.perf_counter()
+    compiled = compile_filter(rules)
+    print(f"compile: {time.perf_counter() - started:.2f} s")
+
+    started = time.perf_counter()
+    for message in messages:
+        compiled.match_text(message)
+    print(f"compiled: {len(messages) / (time.perf_counter() - started):,.0f} messages/s")
+
+    words = [rule.pattern for rule in rules if rule.kind == FilterRuleKindEnum.WORD]
+    started = time.perf_counter()
+    for message in messages[:NAIVE_MESSAGES]:
+        any(word in message for word in words)
+    print(f"naive: {NAIVE_MESSAGES / (time.perf_counter() - started):,.0f} messages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,5 +27,6 @@ def get_cli() -> typer.Typer:
     cli.callback()(config_callback)
     cli.add_typer(database.get_cli(), name="database")
     cli.add_typer(telegram.get_cli(), name="telegram")
+    cli.add_typer(telegram.get_chats_cli(), name="chats")
 
     return cli
@@ -1,3 +1,13 @@
+from typing import Any
+
 from .cli import get_cli
-from .service import Service, get_service
 from .settings import Settings
+
+
+def __getattr__(name: str) -> Any:
+    # Building CLI needs settings only, SQLAlchemy and Alembic load in service callback
+    if name in ("Service", "get_service"):
+        from . import service
+
+        return getattr(service, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
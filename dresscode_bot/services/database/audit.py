@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from .models import AuditEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+class AuditWriter:
+    # Events are only appended to buffer on hot path, background task inserts them in bulk
+    def __init__(
+            self,
+            sessionmaker: async_sessionmaker,
+            batch_size: int = 500,
+            flush_interval: float = 1.0,
+            max_pending: int = 100000,
+    ):
+        self._sessionmaker = sessionmaker
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._buffer: list[dict[str, Any]] = []
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, event: dict[str, Any]):
+        if len(self._buffer) >= self._max_pending:
+            logger.error("[database] Audit buffer is full, event dropped: %s", event)
+            return
+
+        self._buffer.append(event)
+        if len(self._buffer) >= self._batch_size:
+            self._full.set()
+
+    async def run(self):
+        self._stopping = False
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                # Events stay in buffer and are written with the next batch
+                logger.exception("[database] Audit events were not written: %d", len(self._buffer))
+
+    def stop(self):
+        # Loop wakes up, writes buffered events and exits
+        self._stopping = True
+        self._full.set()
+
+    async def flush(self):
+        async with self._lock:
+            self._full.clear()
+            while self._buffer:
+                batch = self._buffer[:self._batch_size]
+                async with self._sessionmaker() as session:
+                    async with session.begin():
+                        await session.execute(insert(AuditEvent), batch)
+                del self._buffer[:len(batch)]
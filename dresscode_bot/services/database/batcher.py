@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+logger = logging.getLogger(__name__)
+
+Operation = Callable[[AsyncSession], Awaitable[Any]]
+# Put in queue by stop, writes submitted before it are committed by run
+STOP = object()
+
+
+class WriteBatcher:
+    def __init__(
+            self,
+            sessionmaker: async_sessionmaker,
+            max_size: int = 100,
+            max_delay: float = 0.005,
+    ):
+        self._sessionmaker = sessionmaker
+        self._max_size = max_size
+        self._max_delay = max_delay
+        self._queue: asyncio.Queue[tuple[Operation, asyncio.Future]] = asyncio.Queue()
+        self._running = False
+        self._stopped = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def submit(self, operation: Operation) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    def _take_batch(self, limit: int) -> list[tuple[Operation, asyncio.Future]]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is STOP:
+                self._stopped = True
+                break
+            batch.append(item)
+        return batch
+
+    async def _commit(self, batch: list[tuple[Operation, asyncio.Future]]):
+        try:
+            async with self._sessionmaker() as session:
+                async with session.begin():
+                    results = [await operation(session) for operation, _ in batch]
+        except Exception as exception:
+            if len(batch) == 1:
+                _, future = batch[0]
+                if not future.done():
+                    future.set_exception(exception)
+                return
+
+            # One broken operation must not fail the whole batch, so replay them one by one
+            logger.warning("[database] Batch of %d writes failed, retry separately", len(batch))
+            for item in batch:
+                await self._commit([item])
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _commit_or_cancel(self, batch: list[tuple[Operation, asyncio.Future]]):
+        try:
+            await self._commit(batch)
+        except asyncio.CancelledError:
+            # Interrupted transaction may be committed or not, callers get cancellation instead
+            # of waiting forever
+            for _, future in batch:
+                future.cancel()
+            raise
+
+    async def run(self):
+        self._running = True
+        self._stopped = False
+        try:
+            while not self._stopped:
+                item = await self._queue.get()
+                if item is STOP:
+                    break
+                batch = [item]
+                if self._queue.qsize() < self._max_size - 1:
+                    await asyncio.sleep(self._max_delay)
+                batch.extend(self._take_batch(limit=self._max_size - 1))
+                await self._commit_or_cancel(batch)
+        finally:
+            self._running = False
+            # Writes left in queue are never committed once batcher is stopped
+            for _, future in self._take_batch(limit=self._queue.qsize()):
+                future.cancel()
+
+    def stop(self):
+        # Later writes are not queued anymore, they are committed by callers directly
+        self._running = False
+        self._queue.put_nowait(STOP)
+
+    async def flush(self):
+        while batch := self._take_batch(limit=self._max_size):
+            await self._commit_or_cancel(batch)
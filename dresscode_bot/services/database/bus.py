@@ -0,0 +1,134 @@
+import asyncio
+import enum
+import logging
+import uuid
+from collections import defaultdict
+from typing import Callable, Iterable
+
+from facet import ServiceMixin
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+
+logger = logging.getLogger(__name__)
+
+Event = tuple["EntityEnum", int]
+Evict = Callable[[int], None]
+Reset = Callable[[], None]
+
+
+class EntityEnum(str, enum.Enum):
+    CHAT = "chat"
+    CHAT_USERS = "chat_users"
+    CHAT_POLICY = "chat_policy"
+    CHAT_FILTER = "chat_filter"
+    USER = "user"
+
+
+class Bus(ServiceMixin):
+    # In-process bus: events are delivered to subscribers of this process after commit. Subclasses
+    # also send events to other processes from notify(), which is called inside write transaction
+    def __init__(self):
+        self._origin = uuid.uuid4().hex
+        self._evicts: dict[EntityEnum, list[Evict]] = defaultdict(list)
+        self._resets: list[Reset] = []
+
+    def subscribe(self, entity: EntityEnum, evict: Evict, reset: Reset | None = None):
+        self._evicts[entity].append(evict)
+        if reset is not None:
+            self._resets.append(reset)
+
+    def dispatch(self, events: Iterable[Event]):
+        for entity, key in events:
+            for evict in self._evicts.get(entity, ()):
+                try:
+                    evict(key)
+                except Exception:
+                    logger.exception("[database] Cache eviction failed: %s %d", entity.value, key)
+
+    def reset(self):
+        # Events could be lost, nothing cached can be trusted
+        for reset in self._resets:
+            try:
+                reset()
+            except Exception:
+                logger.exception("[database] Cache reset failed")
+
+    def encode(self, events: Iterable[Event]) -> str:
+        return ";".join([self._origin, *(f"{entity.value}:{key}" for entity, key in events)])
+
+    def decode(self, payload: str) -> list[Event] | None:
+        origin, *events = payload.split(";")
+        if origin == self._origin:
+            # Own events are already dispatched after commit
+            return None
+        result = []
+        for event in events:
+            entity, key = event.split(":")
+            result.append((EntityEnum(entity), int(key)))
+        return result
+
+    async def notify(self, session: AsyncSession, events: list[Event]):
+        pass
+
+
+class PostgresBus(Bus):
+    # NOTIFY is transactional, so other processes receive events only after commit
+    chunk_size = 250
+
+    def __init__(
+            self,
+            engine: AsyncEngine,
+            channel: str = "dresscode_invalidation",
+            reconnect_delay: float = 1.0,
+    ):
+        super().__init__()
+        self._engine = engine
+        self._channel = channel
+        self._reconnect_delay = reconnect_delay
+
+    async def start(self):
+        connected = asyncio.Event()
+        self.add_task(self._listening(connected=connected))
+        await connected.wait()
+
+    async def notify(self, session: AsyncSession, events: list[Event]):
+        # Payload of NOTIFY is limited by 8000 bytes
+        for start in range(0, len(events), self.chunk_size):
+            payload = self.encode(events[start:start + self.chunk_size])
+            await session.execute(select(func.pg_notify(self._channel, payload)))
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        try:
+            events = self.decode(payload)
+        except ValueError:
+            logger.error("[database] Incorrect invalidation payload: %s", payload)
+            return
+        if events:
+            self.dispatch(events)
+
+    async def _listening(self, connected: asyncio.Event):
+        while True:
+            try:
+                async with self._engine.connect() as connection:
+                    raw_connection = await connection.get_raw_connection()
+                    driver_connection = raw_connection.driver_connection
+                    await driver_connection.add_listener(self._channel, self._on_notification)
+                    if connected.is_set():
+                        # Events sent while listener was down are lost
+                        self.reset()
+                    connected.set()
+                    logger.info("[database] Listen invalidation channel: %s", self._channel)
+                    try:
+                        # Connection is checked by asyncpg keepalive, wait for its termination
+                        while not driver_connection.is_closed():
+                            await asyncio.sleep(self._reconnect_delay)
+                    finally:
+                        if not driver_connection.is_closed():
+                            await driver_connection.remove_listener(self._channel, self._on_notification)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[database] Invalidation listener failed")
+                connected.set()
+            await asyncio.sleep(self._reconnect_delay)
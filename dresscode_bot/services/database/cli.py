@@ -1,12 +1,15 @@
-from typing import Optional
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
 import typer
 
-from .service import Service, get_service
+if TYPE_CHECKING:
+    from .service import Service
 
 
 def migrate(ctx: typer.Context):
-    database_service: Service = ctx.obj["database"]
+    database_service: "Service" = ctx.obj["database"]
 
     database_service.migrate()
 
@@ -19,7 +22,7 @@ def create(
             help="Migration short message",
         ),
 ):
-    database_service: Service = ctx.obj["database"]
+    database_service: "Service" = ctx.obj["database"]
 
     database_service.create_migration(message=message)
 
@@ -33,7 +36,69 @@ def get_migration_cli() -> typer.Typer:
     return cli
 
 
+async def _run_retention(database_service: "Service"):
+    try:
+        result = await database_service.retention.run_once()
+    finally:
+        await database_service.stop()
+    for name, count in result.items():
+        typer.echo(f"{name}: {count}")
+
+
+def retention(ctx: typer.Context):
+    database_service: "Service" = ctx.obj["database"]
+    if database_service.retention is None:
+        typer.echo("Retention is not configured")
+        raise typer.Exit(code=1)
+
+    asyncio.run(_run_retention(database_service=database_service))
+
+
+async def _transfer(database_service: "Service", import_: bool, path: Path, chunk_size: int):
+    from .transfer import export_data, import_data
+
+    transfer = import_data if import_ else export_data
+    try:
+        counts = await transfer(database_service=database_service, path=path, chunk_size=chunk_size)
+    finally:
+        await database_service.stop()
+    for table, count in counts.items():
+        typer.echo(f"{table}: {count}")
+
+
+def export(
+        ctx: typer.Context,
+        path: Path = typer.Argument(..., help="Output file, gzip compressed JSON lines"),
+        chunk_size: int = typer.Option(1000, "--chunk-size", help="Rows fetched at once"),
+):
+    database_service: "Service" = ctx.obj["database"]
+
+    asyncio.run(_transfer(
+        database_service=database_service,
+        import_=False,
+        path=path,
+        chunk_size=chunk_size,
+    ))
+
+
+def import_(
+        ctx: typer.Context,
+        path: Path = typer.Argument(..., exists=True, dir_okay=False, help="File made by export"),
+        chunk_size: int = typer.Option(1000, "--chunk-size", help="Rows inserted at once"),
+):
+    database_service: "Service" = ctx.obj["database"]
+
+    asyncio.run(_transfer(
+        database_service=database_service,
+        import_=True,
+        path=path,
+        chunk_size=chunk_size,
+    ))
+
+
 def service_callback(ctx: typer.Context):
+    from .service import get_service
+
     settings = ctx.obj["settings"]
     database_service = get_service(settings=settings.database)
 
@@ -45,5 +110,8 @@ def get_cli() -> typer.Typer:
 
     cli.callback()(service_callback)
     cli.add_typer(get_migration_cli(), name="migrations")
+    cli.command(name="retention")(retention)
+    cli.command(name="export")(export)
+    cli.command(name="import")(import_)
 
     return cli
@@ -29,6 +29,25 @@ target_metadata = Base.metadata
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Search objects of chat titles are created by raw SQL in migration and are not in metadata,
+# autogenerate must not drop them: FTS5 table with its shadow tables and Postgres indexes
+EXCLUDED_TABLES = frozenset([
+    "chats_titles",
+    "chats_titles_data",
+    "chats_titles_idx",
+    "chats_titles_docsize",
+    "chats_titles_config",
+])
+EXCLUDED_INDEXES = frozenset(["ix_chats_title_prefix", "ix_chats_title_trgm"])
+
+
+def include_name(name: str | None, type_: str, parent_names: dict) -> bool:
+    if type_ == "table":
+        return name not in EXCLUDED_TABLES
+    if type_ == "index":
+        return name not in EXCLUDED_INDEXES
+    return True
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -48,6 +67,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_name=include_name,
     )
 
     with context.begin_transaction():
@@ -55,7 +75,11 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_name=include_name,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -80,9 +104,18 @@ async def run_async_migrations() -> None:
 
 
 def run_migrations_online() -> None:
-    """Run migrations in 'online' mode."""
+    """Run migrations in 'online' mode.
+
+    If a connection is shared through config attributes (migrations run
+    from a running service), use it instead of creating a new Engine.
+
+    """
 
-    asyncio.run(run_async_migrations())
+    connection = config.attributes.get("connection", None)
+    if connection is None:
+        asyncio.run(run_async_migrations())
+    else:
+        do_run_migrations(connection)
 
 
 if context.is_offline_mode():
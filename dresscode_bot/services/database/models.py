@@ -1,4 +1,5 @@
 import enum
+from datetime import date, datetime
 from typing import Any, Optional
 
 import sqlalchemy as sa
@@ -15,6 +16,32 @@ class RoleEnum(str, enum.Enum):
     MEMBER = "member"
 
 
+class FilterRuleKindEnum(str, enum.Enum):
+    WORD = "word"
+    DOMAIN = "domain"
+    REGEX = "regex"
+
+
+class ScheduledActionKindEnum(str, enum.Enum):
+    UNRESTRICT = "unrestrict"
+
+
+class AuditEventKindEnum(str, enum.Enum):
+    SET_CHAT_OWNER = "set_chat_owner"
+    ADD_CHAT_USER = "add_chat_user"
+    REMOVE_CHAT_USER = "remove_chat_user"
+    RESTRICT_CHAT_MEMBER = "restrict_chat_member"
+
+
+class ChatStatKindEnum(str, enum.Enum):
+    JOINS = "joins"
+    RESTRICTIONS = "restrictions"
+    RESTRICTION_FAILURES = "restriction_failures"
+    CAPTCHA_PASSED = "captcha_passed"
+    CAPTCHA_FAILED = "captcha_failed"
+    MESSAGES_DELETED = "messages_deleted"
+
+
 class LanguageEnum(str, enum.Enum):
     RUSSIAN = "russian"
     ENGLISH = "english"
@@ -36,6 +63,8 @@ class User(Base):
 
     telegram_id: Mapped[PositiveInt] = mapped_column(primary_key=True)
     full_name: Mapped[str]
+    # Updated at most once a day, used by retention only
+    last_seen_at: Mapped[Optional[datetime]]
 
     chats: Mapped[list[ChatUser]] = relationship(back_populates="user", lazy="joined")
     ownership_chats: Mapped[list["Chat"]] = relationship(back_populates="owner", lazy="joined")
@@ -70,10 +99,119 @@ class Chat(Base):
     __tablename__ = "chats"
 
     telegram_id: Mapped[PositiveInt] = mapped_column(primary_key=True)
-    owner_id: Mapped[PositiveInt] = mapped_column(sa.ForeignKey(f"{User.__tablename__}.telegram_id"))
-
-    users: Mapped[list[ChatUser]] = relationship(back_populates="chat", lazy="joined")
+    owner_id: Mapped[PositiveInt] = mapped_column(
+        sa.ForeignKey(f"{User.__tablename__}.telegram_id"),
+        index=True,
+    )
+    left_at: Mapped[Optional[datetime]]
+    # Search indexes over title are dialect specific (trigram or FTS5), they live in migration only
+    title: Mapped[Optional[str]]
+
+    users: Mapped[list[ChatUser]] = relationship(back_populates="chat", lazy="raise")
     owner: Mapped[User] = relationship(back_populates="ownership_chats", lazy="joined")
 
     def __eq__(self, other: "Chat") -> bool:
         return self.telegram_id == other.telegram_id
+
+
+class ChatSync(Base):
+    __tablename__ = "chats_sync"
+
+    chat_id: Mapped[int] = mapped_column(sa.ForeignKey("chats.telegram_id"), primary_key=True)
+    cursor: Mapped[int] = mapped_column(default=0)
+    finished: Mapped[bool] = mapped_column(default=False)
+
+
+class ChatPolicy(Base):
+    __tablename__ = "chats_policies"
+
+    chat_id: Mapped[int] = mapped_column(sa.ForeignKey("chats.telegram_id"), primary_key=True)
+    permissions: Mapped[list[str]] = mapped_column(type_=sa.JSON, default=list)
+    whitelist: Mapped[list[int]] = mapped_column(type_=sa.JSON, default=list)
+    windows: Mapped[list[list[int]]] = mapped_column(type_=sa.JSON, default=list)
+    duration: Mapped[Optional[int]]
+
+
+class ChatFilterRule(Base):
+    __tablename__ = "chats_filter_rules"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    chat_id: Mapped[int] = mapped_column(sa.ForeignKey("chats.telegram_id"), index=True)
+    kind: Mapped[FilterRuleKindEnum]
+    pattern: Mapped[str]
+
+
+class ScheduledAction(Base):
+    __tablename__ = "scheduled_actions"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[ScheduledActionKindEnum]
+    chat_id: Mapped[int] = mapped_column(sa.BigInteger)
+    user_id: Mapped[int] = mapped_column(sa.BigInteger)
+    due_at: Mapped[datetime] = mapped_column(index=True)
+    bot_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger)
+
+
+class CaptchaChallenge(Base):
+    __tablename__ = "captcha_challenges"
+
+    chat_id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    answer: Mapped[str]
+    message_id: Mapped[Optional[int]]
+    expires_at: Mapped[datetime]
+    bot_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger)
+
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    holder: Mapped[str]
+    expires_at: Mapped[datetime]
+
+
+class AuditEvent(Base):
+    __tablename__ = "audit_events"
+    # Pages of one chat are read by keyset over (created_at, id), so one index range scan is needed
+    __table_args__ = (
+        sa.Index("ix_audit_events_chat_id_created_at", "chat_id", "created_at", "id"),
+    )
+
+    # No foreign keys: history is kept for removed chats and users too
+    id: Mapped[int] = mapped_column(
+        sa.BigInteger().with_variant(sa.Integer(), "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    created_at: Mapped[datetime]
+    kind: Mapped[AuditEventKindEnum]
+    chat_id: Mapped[int] = mapped_column(sa.BigInteger)
+    user_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger)
+    actor_id: Mapped[Optional[int]] = mapped_column(sa.BigInteger)
+    data: Mapped[Optional[dict[str, Any]]] = mapped_column(type_=sa.JSON)
+
+
+class ChatStatHourly(Base):
+    __tablename__ = "chats_stats_hourly"
+    # Rollup tables share kinds, so they are stored as strings instead of one native type per table
+
+    chat_id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    hour: Mapped[datetime] = mapped_column(primary_key=True)
+    kind: Mapped[ChatStatKindEnum] = mapped_column(
+        sa.Enum(ChatStatKindEnum, native_enum=False),
+        primary_key=True,
+    )
+    count: Mapped[int] = mapped_column(default=0)
+
+
+class ChatStatDaily(Base):
+    __tablename__ = "chats_stats_daily"
+
+    chat_id: Mapped[int] = mapped_column(sa.BigInteger, primary_key=True)
+    day: Mapped[date] = mapped_column(primary_key=True)
+    kind: Mapped[ChatStatKindEnum] = mapped_column(
+        sa.Enum(ChatStatKindEnum, native_enum=False),
+        primary_key=True,
+    )
+    count: Mapped[int] = mapped_column(default=0)
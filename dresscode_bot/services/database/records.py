@@ -0,0 +1,69 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Row
+
+from .models import Chat, LanguageEnum, User, UserDialog, UserSettings
+
+
+# Read models of hot paths: built from plain Core rows, so they skip identity map, change
+# tracking and joined collections of ORM entities and are cheap to keep in handler data.
+# Columns are selected in order of record fields
+
+USER_COLUMNS = (User.telegram_id, User.full_name, User.last_seen_at, UserSettings.language)
+DIALOG_COLUMNS = (UserDialog.user_id, UserDialog.state, UserDialog.data)
+CHAT_COLUMNS = (Chat.telegram_id, Chat.owner_id, Chat.title, Chat.left_at)
+
+
+@dataclass(frozen=True, slots=True)
+class UserRecord:
+    telegram_id: int
+    full_name: str
+    last_seen_at: datetime | None = None
+    language: LanguageEnum | None = None
+
+    @classmethod
+    def from_row(cls, row: Row) -> "UserRecord":
+        return cls(*row)
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserRecord":
+        return cls(
+            telegram_id=user.telegram_id,
+            full_name=user.full_name,
+            last_seen_at=user.last_seen_at,
+            language=user.settings.language if user.settings is not None else None,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class DialogRecord:
+    user_id: int
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_row(cls, row: Row) -> "DialogRecord":
+        return cls(*row)
+
+
+@dataclass(frozen=True, slots=True)
+class ChatRecord:
+    telegram_id: int
+    owner_id: int
+    title: str | None = None
+    left_at: datetime | None = None
+
+    @classmethod
+    def from_row(cls, row: Row) -> "ChatRecord":
+        return cls(*row)
+
+    @classmethod
+    def from_chat(cls, chat: Chat) -> "ChatRecord":
+        return cls(
+            telegram_id=chat.telegram_id,
+            owner_id=chat.owner_id,
+            title=chat.title,
+            left_at=chat.left_at,
+        )
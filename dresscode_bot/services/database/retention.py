@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+if TYPE_CHECKING:
+    from .service import Service
+
+
+logger = logging.getLogger(__name__)
+
+# Cleaner returns end of handled key range, which is None after the last batch
+Cleaner = Callable[..., Awaitable[tuple[Any, int]]]
+
+
+class Retention:
+    # Every cleaner handles one primary key range per transaction, so locks are short and pause
+    # between batches leaves database to regular queries
+    def __init__(
+            self,
+            database_service: "Service",
+            interval: float = 86400.0,
+            batch_size: int = 1000,
+            batch_delay: float = 0.1,
+            user_days: int | None = 365,
+            dialog_days: int | None = 30,
+            chat_days: int | None = 30,
+            stats_hourly_days: int | None = 30,
+    ):
+        self._database_service = database_service
+        self._interval = interval
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+        self._policies: list[tuple[str, Cleaner, int | None]] = [
+            ("dialogs", database_service.reset_stale_dialogs, dialog_days),
+            ("users", database_service.delete_stale_users, user_days),
+            ("chats", database_service.delete_left_chats, chat_days),
+            ("stats", database_service.delete_old_chat_stats, stats_hourly_days),
+        ]
+        self._holder = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def run(self):
+        while True:
+            try:
+                # Lease lives for the whole interval, so only one process cleans up per interval
+                if await self._database_service.acquire_lease(
+                        name="retention",
+                        holder=self._holder,
+                        ttl=self._interval,
+                ):
+                    await self.run_once()
+            except Exception:
+                logger.exception("[database] Retention failed")
+            await asyncio.sleep(self._interval)
+
+    async def run_once(self) -> dict[str, int]:
+        now = datetime.utcnow()
+        result = {}
+        for name, cleaner, days in self._policies:
+            if days is not None:
+                result[name] = await self._clean(
+                    name=name,
+                    cleaner=cleaner,
+                    before=now - timedelta(days=days),
+                )
+        return result
+
+    async def _clean(self, name: str, cleaner: Cleaner, before: datetime) -> int:
+        started_at = time.perf_counter()
+        after_id, total, batches = None, 0, 0
+        while True:
+            end_id, count = await cleaner(after_id=after_id, limit=self._batch_size, before=before)
+            total += count
+            batches += 1
+            if end_id is None:
+                break
+            after_id = end_id
+            await asyncio.sleep(self._batch_delay)
+
+        elapsed = time.perf_counter() - started_at
+        logger.info(
+            "[database] Retention of %s: %d rows in %d batches, %.1f s, %.0f rows/s",
+            name, total, batches, elapsed, total / elapsed if elapsed else 0.0,
+        )
+        return total
@@ -1,21 +1,199 @@
+import asyncio
+import dataclasses
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterable, Sequence
 
 from alembic import command
 from alembic.config import Config
 from facet import ServiceMixin
-from sqlalchemy import delete, select
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import (
+    Connection,
+    Insert,
+    Integer,
+    String,
+    Table,
+    and_,
+    cast,
+    delete,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import InstrumentedAttribute
 
-from .models import Chat, ChatUser, RoleEnum, User, UserDialog, UserSettings
+from .audit import AuditWriter
+from .batcher import WriteBatcher
+from .bus import Bus, EntityEnum, Event, PostgresBus
+from .models import (
+    AuditEvent,
+    AuditEventKindEnum,
+    CaptchaChallenge,
+    Chat,
+    ChatStatDaily,
+    ChatStatHourly,
+    ChatStatKindEnum,
+    ChatFilterRule,
+    ChatPolicy,
+    ChatSync,
+    ChatUser,
+    FilterRuleKindEnum,
+    LanguageEnum,
+    Lease,
+    RoleEnum,
+    ScheduledAction,
+    ScheduledActionKindEnum,
+    User,
+    UserDialog,
+    UserSettings,
+)
+from .records import (
+    CHAT_COLUMNS,
+    DIALOG_COLUMNS,
+    USER_COLUMNS,
+    ChatRecord,
+    DialogRecord,
+    UserRecord,
+)
+from .retention import Retention
 from .settings import Settings
 
 
+logger = logging.getLogger(__name__)
+
+# Any constant shared by all replicas, used as advisory lock key/name for migrations
+MIGRATION_LOCK_KEY = 0x64726573
+
+
 class Service(ServiceMixin):
-    def __init__(self, dsn: str):
+    def __init__(
+            self,
+            dsn: str,
+            bulk_chunk_size: int = 500,
+            write_batch_size: int | None = None,
+            write_batch_delay: float = 0.005,
+            audit_batch_size: int = 500,
+            audit_flush_interval: float = 1.0,
+            audit_max_pending: int = 100000,
+            retention_interval: float | None = None,
+            retention_batch_size: int = 1000,
+            retention_batch_delay: float = 0.1,
+            retention_user_days: int | None = 365,
+            retention_dialog_days: int | None = 30,
+            retention_chat_days: int | None = 30,
+            retention_stats_hourly_days: int | None = 30,
+            replica_dsns: Sequence[str] = (),
+            replica_stickiness: float = 5.0,
+            migrate_on_start: bool = False,
+            migration_lock_poll_interval: float = 1.0,
+            invalidation_channel: str | None = "dresscode_invalidation",
+            bus: Bus | None = None,
+    ):
         self._dsn = dsn
+        self._bulk_chunk_size = bulk_chunk_size
         self._engine = create_async_engine(self._dsn)
         self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False)
+        self._replica_engines = [create_async_engine(replica_dsn) for replica_dsn in replica_dsns]
+        self._replica_sessionmakers = itertools.cycle([
+            async_sessionmaker(engine, expire_on_commit=False)
+            for engine in self._replica_engines
+        ])
+        self._replica_stickiness = replica_stickiness
+        self._recent_writes: OrderedDict[Hashable, float] = OrderedDict()
+        self._migrate_on_start = migrate_on_start
+        self._migration_lock_poll_interval = migration_lock_poll_interval
+        self._write_batcher = None
+        if write_batch_size is not None:
+            self._write_batcher = WriteBatcher(
+                sessionmaker=self._sessionmaker,
+                max_size=write_batch_size,
+                max_delay=write_batch_delay,
+            )
+        self._audit_writer = AuditWriter(
+            sessionmaker=self._sessionmaker,
+            batch_size=audit_batch_size,
+            flush_interval=audit_flush_interval,
+            max_pending=audit_max_pending,
+        )
+        self._tasks: list[asyncio.Task] = []
+        self._retention_task: asyncio.Task | None = None
+        self._retention = None
+        if retention_interval is not None:
+            self._retention = Retention(
+                database_service=self,
+                interval=retention_interval,
+                batch_size=retention_batch_size,
+                batch_delay=retention_batch_delay,
+                user_days=retention_user_days,
+                dialog_days=retention_dialog_days,
+                chat_days=retention_chat_days,
+                stats_hourly_days=retention_stats_hourly_days,
+            )
+        self._bus = bus
+        if self._bus is None:
+            self._bus = Bus()
+            dialect = self._engine.dialect
+            if invalidation_channel and dialect.name == "postgresql" and dialect.driver == "asyncpg":
+                self._bus = PostgresBus(engine=self._engine, channel=invalidation_channel)
+
+    @property
+    def bus(self) -> Bus:
+        return self._bus
+
+    @property
+    def retention(self) -> Retention | None:
+        return self._retention
+
+    @property
+    def dependencies(self) -> list[ServiceMixin]:
+        return [
+            self._bus,
+        ]
+
+    async def start(self):
+        if self._migrate_on_start:
+            await self.migrate_async()
+        self._tasks = [self.add_task(self._audit_writer.run())]
+        if self._write_batcher is not None:
+            self._tasks.append(self.add_task(self._write_batcher.run()))
+        if self._retention is not None:
+            self._retention_task = self.add_task(self._retention.run())
+            self._tasks.append(self._retention_task)
+
+    async def stop(self):
+        # Service tasks are cancelled after stop only, so loops are stopped here before engine
+        # is disposed: writers commit what they have, retention is interrupted
+        if self._write_batcher is not None:
+            self._write_batcher.stop()
+        self._audit_writer.stop()
+        if self._retention_task is not None:
+            self._retention_task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self._retention_task = [], None
+
+        if self._write_batcher is not None:
+            await self._write_batcher.flush()
+        try:
+            await self._audit_writer.flush()
+        except Exception:
+            logger.exception("[database] Audit events were lost: %d", self._audit_writer.pending)
+
+        await self._engine.dispose()
+        for engine in self._replica_engines:
+            await engine.dispose()
 
     def get_alembic_config(self) -> Config:
         migrations_path = Path(__file__).parent / "migrations"
@@ -29,98 +207,479 @@ class Service(ServiceMixin):
     def migrate(self): 
         command.upgrade(self.get_alembic_config(), "head")
 
+    async def _try_migration_lock(self, connection) -> bool:
+        dialect = self._engine.dialect.name
+        if dialect == "postgresql":
+            query = text("SELECT pg_try_advisory_lock(:key)")
+        elif dialect in ("mysql", "mariadb"):
+            query = text("SELECT GET_LOCK(CAST(:key AS CHAR), 0)")
+        else:
+            # SQLite and others have no advisory locks, database file is used by one process
+            return True
+
+        result = await connection.execute(query, {"key": MIGRATION_LOCK_KEY})
+        return bool(result.scalar())
+
+    async def _release_migration_lock(self, connection):
+        dialect = self._engine.dialect.name
+        if dialect == "postgresql":
+            await connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"),
+                {"key": MIGRATION_LOCK_KEY},
+            )
+        elif dialect in ("mysql", "mariadb"):
+            await connection.execute(
+                text("SELECT RELEASE_LOCK(CAST(:key AS CHAR))"),
+                {"key": MIGRATION_LOCK_KEY},
+            )
+
+    def _upgrade(self, connection: Connection):
+        config = self.get_alembic_config()
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+    async def migrate_async(self):
+        async with self._engine.connect() as connection:
+            while not await self._try_migration_lock(connection=connection):
+                await connection.rollback()
+                logger.info("[database] Migrations are running by another process, wait")
+                await asyncio.sleep(self._migration_lock_poll_interval)
+
+            try:
+                logger.info("[database] Run migrations")
+                await connection.run_sync(self._upgrade)
+                await connection.commit()
+            finally:
+                # Failed migration aborts transaction on PostgreSQL, lock can be released only
+                # after rollback, otherwise its error hides the migration one
+                await connection.rollback()
+                await self._release_migration_lock(connection=connection)
+                await connection.commit()
+
     def create_migration(self, message: str | None = None):
         command.revision(self.get_alembic_config(), message=message, autogenerate=True)
 
+    def _insert_ignore(self, model: type) -> Insert:
+        dialect = self._engine.dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(model).on_conflict_do_nothing()
+        if dialect == "sqlite":
+            return sqlite.insert(model).on_conflict_do_nothing()
+        return insert(model).prefix_with("IGNORE")
+
+    def _upsert_counts(self, model: type, rows: list[dict[str, Any]]) -> Insert:
+        # Conflicting counters are added to stored ones, so flushes from several processes sum up
+        keys = [column.name for column in model.__table__.primary_key]
+        dialect = self._engine.dialect.name
+        if dialect == "postgresql":
+            statement = postgresql.insert(model).values(rows)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(model).values(rows)
+        else:
+            statement = mysql.insert(model).values(rows)
+            return statement.on_duplicate_key_update(count=model.count + statement.inserted.count)
+        return statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={"count": model.count + statement.excluded.count},
+        )
+
+    async def _write(
+            self,
+            operation: Callable[[AsyncSession], Awaitable[Any]],
+            keys: Iterable[Hashable] = (),
+            events: Sequence[Event] = (),
+    ) -> Any:
+        if events:
+            operation = self._with_events(operation=operation, events=list(events))
+
+        if self._write_batcher is not None and self._write_batcher.running:
+            result = await self._write_batcher.submit(operation)
+        else:
+            async with self._sessionmaker() as session:
+                async with session.begin():
+                    result = await operation(session)
+
+        if self._replica_engines:
+            self._mark_written(keys=keys)
+        if events:
+            self._bus.dispatch(events)
+        return result
+
+    def _with_events(
+            self,
+            operation: Callable[[AsyncSession], Awaitable[Any]],
+            events: list[Event],
+    ) -> Callable[[AsyncSession], Awaitable[Any]]:
+        async def operation_with_events(session: AsyncSession) -> Any:
+            result = await operation(session)
+            await self._bus.notify(session=session, events=events)
+            return result
+
+        return operation_with_events
+
+    def _mark_written(self, keys: Iterable[Hashable]):
+        now = time.monotonic()
+        for key in keys:
+            self._recent_writes[key] = now
+            self._recent_writes.move_to_end(key)
+
+        deadline = now - self._replica_stickiness
+        while self._recent_writes:
+            key, written_at = next(iter(self._recent_writes.items()))
+            if written_at > deadline:
+                break
+            del self._recent_writes[key]
+
+    def _read_sessionmaker(self, keys: Iterable[Hashable] = ()) -> async_sessionmaker:
+        if not self._replica_engines:
+            return self._sessionmaker
+
+        deadline = time.monotonic() - self._replica_stickiness
+        for key in keys:
+            written_at = self._recent_writes.get(key)
+            if written_at is not None and written_at > deadline:
+                return self._sessionmaker
+        return next(self._replica_sessionmakers)
+
     async def get_user(self, id: int) -> User | None:
-        async with self._sessionmaker() as session:
+        async with self._read_sessionmaker(keys=[("user", id)])() as session:
             return await session.get(User, id)
 
     async def add_new_user(self, id: int, full_name: str) -> User:
-        user = User(telegram_id=id, full_name=full_name)
+        user = User(telegram_id=id, full_name=full_name, last_seen_at=datetime.utcnow())
         user_settings = UserSettings(user=user)
         user_dialog = UserDialog(user=user)
 
-        async with self._sessionmaker() as session:
-            async with session.begin():
-                session.add_all([user, user_settings, user_dialog])
+        async def operation(session: AsyncSession):
+            session.add_all([user, user_settings, user_dialog])
+            await session.flush()
             await session.refresh(user, attribute_names=["settings", "dialog"])
+
+        await self._write(operation, keys=[("user", id)], events=[(EntityEnum.USER, id)])
         return user
 
     async def get_or_create_user(self, id: int, full_name: str) -> User:
-        return await self.get_user(id=id) or await self.add_new_user(id=id, full_name=full_name)
+        user = await self.get_user(id=id)
+        if user is not None:
+            return user
+
+        try:
+            return await self.add_new_user(id=id, full_name=full_name)
+        except IntegrityError:
+            # Concurrent update of the same new user has added it first, replica can lag behind
+            async with self._sessionmaker() as session:
+                return await session.get(User, id)
+
+    @staticmethod
+    async def _select_user_record(session: AsyncSession, id: int) -> UserRecord | None:
+        result = await session.execute(
+            select(*USER_COLUMNS)
+            .outerjoin(UserSettings, UserSettings.user_id == User.telegram_id)
+            .where(User.telegram_id == id)
+        )
+        row = result.first()
+        return UserRecord.from_row(row) if row is not None else None
+
+    async def get_user_record(self, id: int) -> UserRecord | None:
+        async with self._read_sessionmaker(keys=[("user", id)])() as session:
+            return await self._select_user_record(session=session, id=id)
+
+    async def get_or_create_user_record(self, id: int, full_name: str) -> UserRecord:
+        user = await self.get_user_record(id=id)
+        if user is not None:
+            return user
+
+        try:
+            return UserRecord.from_user(await self.add_new_user(id=id, full_name=full_name))
+        except IntegrityError:
+            # Concurrent update of the same new user has added it first, replica can lag behind
+            async with self._sessionmaker() as session:
+                return await self._select_user_record(session=session, id=id)
+
+    async def touch_user(self, user: User | UserRecord):
+        # Activity is tracked by days, so user is written once a day at most
+        now = datetime.utcnow()
+        if user.last_seen_at is not None and now - user.last_seen_at < timedelta(days=1):
+            return
+
+        async def operation(session: AsyncSession):
+            await session.execute(
+                update(User).where(User.telegram_id == user.telegram_id).values(last_seen_at=now),
+            )
+
+        await self._write(operation)
 
     async def get_chat(self, id: int) -> Chat | None:
-        async with self._sessionmaker() as session:
+        async with self._read_sessionmaker(keys=[("chat", id)])() as session:
             return await session.get(Chat, id)
 
-    async def add_new_chat(self, id: int, owner: User) -> Chat:
-        chat = Chat(telegram_id=id, owner=owner)
+    async def get_chat_record(self, id: int) -> ChatRecord | None:
+        async with self._read_sessionmaker(keys=[("chat", id)])() as session:
+            result = await session.execute(select(*CHAT_COLUMNS).where(Chat.telegram_id == id))
+            row = result.first()
+            return ChatRecord.from_row(row) if row is not None else None
 
-        async with self._sessionmaker() as session:
-            async with session.begin():
-                session.add(chat)
-            await session.refresh(chat, attribute_names=["users"])
+    async def add_new_chat(self, id: int, owner: User, title: str | None = None) -> Chat:
+        chat = Chat(telegram_id=id, owner_id=owner.telegram_id, title=title)
+
+        async def operation(session: AsyncSession):
+            session.add(chat)
+
+        await self._write(operation, keys=[("chat", id)], events=[(EntityEnum.CHAT, id)])
+        chat.owner = owner
         return chat
 
+    async def set_chat_left(self, chat: Chat, left: bool):
+        left_at = datetime.utcnow() if left else None
+
+        async def operation(session: AsyncSession):
+            await session.execute(
+                update(Chat).where(Chat.telegram_id == chat.telegram_id).values(left_at=left_at),
+            )
+
+        await self._write(
+            operation,
+            keys=[("chat", chat.telegram_id)],
+            events=[(EntityEnum.CHAT, chat.telegram_id)],
+        )
+        chat.left_at = left_at
+
     async def add_chat_user(
             self,
-            chat: Chat,
-            user: User,
+            chat: Chat | ChatRecord,
+            user: User | UserRecord,
             role: RoleEnum = RoleEnum.MEMBER,
-    ) -> Chat:
-        chat_user = ChatUser(role=role)
-        chat_user.user = user
-        chat.users.append(chat_user)
+            actor_id: int | None = None,
+    ) -> Chat | ChatRecord:
+        chat_user = ChatUser(chat_id=chat.telegram_id, user_id=user.telegram_id, role=role)
 
-        async with self._sessionmaker() as session:
-            async with session.begin():
-                session.add(chat)
+        async def operation(session: AsyncSession):
+            await session.merge(chat_user)
+
+        await self._write(
+            operation,
+            keys=[("chat", chat.telegram_id), ("user", user.telegram_id)],
+            events=[(EntityEnum.CHAT_USERS, chat.telegram_id), (EntityEnum.USER, user.telegram_id)],
+        )
+        self.record_audit_event(
+            kind=AuditEventKindEnum.ADD_CHAT_USER,
+            chat_id=chat.telegram_id,
+            user_id=user.telegram_id,
+            actor_id=actor_id,
+            data={"role": role.value},
+        )
         return chat
 
-    async def remove_chat_user(self, chat: Chat, user: User) -> Chat:
-        async with self._sessionmaker() as session:
-            async with session.begin():
-                await session.execute(
-                    delete(ChatUser).filter(
-                        ChatUser.chat_id == chat.telegram_id,
-                        ChatUser.user_id == user.telegram_id,
-                    )
+    async def add_chat_members(
+            self,
+            chat: Chat,
+            members: Sequence[tuple[int, str]],
+            role: RoleEnum = RoleEnum.MEMBER,
+    ):
+        if not members:
+            return
+
+        now = datetime.utcnow()
+
+        async def operation(session: AsyncSession):
+            for start in range(0, len(members), self._bulk_chunk_size):
+                chunk = members[start:start + self._bulk_chunk_size]
+                await session.execute(self._insert_ignore(User).values([
+                    {"telegram_id": id, "full_name": full_name, "last_seen_at": now}
+                    for id, full_name in chunk
+                ]))
+                await session.execute(self._insert_ignore(UserSettings).values([
+                    {"user_id": id} for id, _ in chunk
+                ]))
+                await session.execute(self._insert_ignore(UserDialog).values([
+                    {"user_id": id, "data": {}} for id, _ in chunk
+                ]))
+                await session.execute(self._insert_ignore(ChatUser).values([
+                    {"chat_id": chat.telegram_id, "user_id": id, "role": role}
+                    for id, _ in chunk
+                ]))
+
+        await self._write(
+            operation,
+            keys=[("chat", chat.telegram_id)],
+            events=[
+                (EntityEnum.CHAT_USERS, chat.telegram_id),
+                *((EntityEnum.USER, id) for id, _ in members),
+            ],
+        )
+
+    async def remove_chat_user(
+            self,
+            chat: Chat | ChatRecord,
+            user: User | UserRecord,
+            actor_id: int | None = None,
+    ) -> Chat | ChatRecord:
+        async def operation(session: AsyncSession):
+            await session.execute(
+                delete(ChatUser).filter(
+                    ChatUser.chat_id == chat.telegram_id,
+                    ChatUser.user_id == user.telegram_id,
                 )
+            )
+
+        await self._write(
+            operation,
+            keys=[("chat", chat.telegram_id), ("user", user.telegram_id)],
+            events=[(EntityEnum.CHAT_USERS, chat.telegram_id), (EntityEnum.USER, user.telegram_id)],
+        )
+        self.record_audit_event(
+            kind=AuditEventKindEnum.REMOVE_CHAT_USER,
+            chat_id=chat.telegram_id,
+            user_id=user.telegram_id,
+            actor_id=actor_id,
+        )
         return chat
 
-    async def set_chat_owner(self, chat: Chat, owner: User) -> Chat:
-        old_owner = ChatUser(role=RoleEnum.MANAGER, user=chat.owner)
+    async def set_chat_owner(
+            self,
+            chat: Chat | ChatRecord,
+            owner: User | UserRecord,
+            actor_id: int | None = None,
+    ) -> Chat | ChatRecord:
+        old_owner = ChatUser(
+            chat_id=chat.telegram_id,
+            user_id=chat.owner_id,
+            role=RoleEnum.MANAGER,
+        )
 
-        async with self._sessionmaker() as session:
-            async with session.begin():
-                await session.execute(
-                    delete(ChatUser).filter(
-                        ChatUser.chat_id == chat.telegram_id,
-                        ChatUser.user_id == owner.telegram_id,
-                    )
+        async def operation(session: AsyncSession):
+            await session.execute(
+                delete(ChatUser).filter(
+                    ChatUser.chat_id == chat.telegram_id,
+                    ChatUser.user_id == owner.telegram_id,
                 )
-                chat.users.append(old_owner)
-                chat.owner_id = owner.telegram_id
-                session.add(chat)
+            )
+            await session.merge(old_owner)
+            await session.execute(
+                update(Chat)
+                .where(Chat.telegram_id == chat.telegram_id)
+                .values(owner_id=owner.telegram_id)
+            )
 
+        await self._write(
+            operation,
+            keys=[
+                ("chat", chat.telegram_id),
+                ("user", chat.owner_id),
+                ("user", owner.telegram_id),
+            ],
+            events=[
+                (EntityEnum.CHAT, chat.telegram_id),
+                (EntityEnum.CHAT_USERS, chat.telegram_id),
+                (EntityEnum.USER, chat.owner_id),
+                (EntityEnum.USER, owner.telegram_id),
+            ],
+        )
+        self.record_audit_event(
+            kind=AuditEventKindEnum.SET_CHAT_OWNER,
+            chat_id=chat.telegram_id,
+            user_id=owner.telegram_id,
+            actor_id=actor_id,
+            data={"previous_owner_id": chat.owner_id},
+        )
+        if isinstance(chat, ChatRecord):
+            return dataclasses.replace(chat, owner_id=owner.telegram_id)
+        chat.owner_id = owner.telegram_id
+        chat.owner = owner
         return chat
 
-    async def can_manage_chat(self, chat: Chat, user: User) -> bool:
+    async def set_chat_title(self, chat_id: int, title: str | None):
+        async def operation(session: AsyncSession):
+            await session.execute(
+                update(Chat).where(Chat.telegram_id == chat_id).values(title=title),
+            )
+
+        await self._write(operation, keys=[("chat", chat_id)], events=[(EntityEnum.CHAT, chat_id)])
+
+    @staticmethod
+    def _managed_by(user_id: int):
+        managed = select(ChatUser.chat_id).where(
+            ChatUser.role == RoleEnum.MANAGER,
+            ChatUser.user_id == user_id,
+        )
+        # Chats bot has left are kept until retention, but can not be managed
+        return and_(
+            Chat.left_at.is_(None),
+            or_(Chat.owner_id == user_id, Chat.telegram_id.in_(managed)),
+        )
+
+    async def get_managed_chats(
+            self,
+            user_id: int,
+            offset: int = 0,
+            limit: int = 4,
+    ) -> tuple[list[tuple[int, str | None]], int]:
+        # Plain rows, list of groups does not need owners and members of every chat
+        async with self._read_sessionmaker(keys=[("user", user_id)])() as session:
+            count = await session.scalar(
+                select(func.count()).select_from(Chat).where(self._managed_by(user_id)),
+            )
+            result = await session.execute(
+                select(Chat.telegram_id, Chat.title)
+                .where(self._managed_by(user_id))
+                .order_by(Chat.title, Chat.telegram_id)
+                .offset(offset)
+                .limit(limit)
+            )
+            return [tuple(row) for row in result.all()], count
+
+    async def search_managed_chats(
+            self,
+            user_id: int,
+            query: str,
+            limit: int = 10,
+    ) -> list[tuple[int, str | None]]:
+        words = query.split()
+        if not words:
+            return []
+
+        statement = select(Chat.telegram_id, Chat.title).where(self._managed_by(user_id))
+        if self._engine.dialect.name == "sqlite":
+            # Every word of query is a prefix of some word of title
+            match = " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+            titles = (
+                select(literal_column("rowid"))
+                .select_from(table("chats_titles"))
+                .where(literal_column("chats_titles").match(match))
+            )
+            statement = statement.where(Chat.telegram_id.in_(titles)).order_by(Chat.title)
+        else:
+            # Trigram index finds words anywhere in title, titles starting with query go first
+            title = func.lower(Chat.title)
+            statement = statement.where(*(
+                title.contains(word.lower(), autoescape=True)
+                for word in words
+            )).order_by(
+                title.startswith(query.strip().lower(), autoescape=True).desc(),
+                Chat.title,
+            )
+
+        async with self._read_sessionmaker(keys=[("user", user_id)])() as session:
+            result = await session.execute(statement.limit(limit))
+            return [tuple(row) for row in result.all()]
+
+    async def can_manage_chat(self, chat: Chat | ChatRecord, user: User | UserRecord) -> bool:
         if chat.owner_id == user.telegram_id:
             return True
 
-        async with self._sessionmaker() as session:
+        keys = [("chat", chat.telegram_id), ("user", user.telegram_id)]
+        async with self._read_sessionmaker(keys=keys)() as session:
             result = await session.execute(
-                select(ChatUser).where(
+                select(ChatUser.user_id).where(
                     ChatUser.role == RoleEnum.MANAGER,
+                    ChatUser.chat_id == chat.telegram_id,
                     ChatUser.user_id == user.telegram_id,
                 ),
             )
             return result.first() is not None
 
-    async def get_chat_managers(self, chat: Chat) -> list[User]:
-        async with self._sessionmaker() as session:
+    async def get_chat_managers(self, chat: Chat | ChatRecord) -> list[User]:
+        async with self._read_sessionmaker(keys=[("chat", chat.telegram_id)])() as session:
             result = await session.execute(
                 select(ChatUser).filter(
                     ChatUser.role == RoleEnum.MANAGER,
@@ -129,28 +688,616 @@ class Service(ServiceMixin):
             )
             return [chat_user.user for chat_user in result.scalars().unique().all()]
 
-    async def set_dialog_state(self, user: User, state: str | None) -> User:
-        user.dialog.state = state
+    async def get_dialog(self, user_id: int) -> DialogRecord | None:
+        async with self._read_sessionmaker(keys=[("user", user_id)])() as session:
+            result = await session.execute(
+                select(*DIALOG_COLUMNS).where(UserDialog.user_id == user_id),
+            )
+            row = result.first()
+            return DialogRecord.from_row(row) if row is not None else None
+
+    async def set_dialog_state(self, user_id: int, state: str | None):
+        async def operation(session: AsyncSession):
+            await session.execute(
+                update(UserDialog)
+                .where(UserDialog.user_id == user_id)
+                .values(state=state)
+            )
+
+        await self._write(operation, keys=[("user", user_id)])
+
+    async def set_dialog_data(self, user_id: int, data: dict[str, Any]):
+        async def operation(session: AsyncSession):
+            await session.execute(
+                update(UserDialog)
+                .where(UserDialog.user_id == user_id)
+                .values(data=data)
+            )
+
+        await self._write(operation, keys=[("user", user_id)])
+
+    async def set_user_language(self, user_id: int, language: LanguageEnum | None):
+        async def operation(session: AsyncSession):
+            await session.execute(
+                update(UserSettings)
+                .where(UserSettings.user_id == user_id)
+                .values(language=language)
+            )
+
+        await self._write(
+            operation,
+            keys=[("user", user_id)],
+            events=[(EntityEnum.USER, user_id)],
+        )
+
+    async def get_chat_policy(self, chat_id: int) -> ChatPolicy | None:
+        async with self._read_sessionmaker(keys=[("chat", chat_id)])() as session:
+            return await session.get(ChatPolicy, chat_id)
+
+    async def set_chat_policy(
+            self,
+            chat_id: int,
+            permissions: Sequence[str] = (),
+            whitelist: Sequence[int] = (),
+            windows: Sequence[tuple[int, int]] = (),
+            duration: int | None = None,
+    ) -> ChatPolicy:
+        chat_policy = ChatPolicy(
+            chat_id=chat_id,
+            permissions=list(permissions),
+            whitelist=list(whitelist),
+            windows=[list(window) for window in windows],
+            duration=duration,
+        )
+
+        async def operation(session: AsyncSession):
+            await session.merge(chat_policy)
+
+        await self._write(
+            operation,
+            keys=[("chat", chat_id)],
+            events=[(EntityEnum.CHAT_POLICY, chat_id)],
+        )
+        return chat_policy
+
+    async def get_chat_filter_rules(self, chat_id: int) -> list[ChatFilterRule]:
+        async with self._read_sessionmaker(keys=[("chat", chat_id)])() as session:
+            result = await session.execute(
+                select(ChatFilterRule)
+                .where(ChatFilterRule.chat_id == chat_id)
+                .order_by(ChatFilterRule.id),
+            )
+            return list(result.scalars().all())
+
+    async def add_chat_filter_rule(
+            self,
+            chat_id: int,
+            kind: FilterRuleKindEnum,
+            pattern: str,
+    ) -> ChatFilterRule:
+        rule = ChatFilterRule(chat_id=chat_id, kind=kind, pattern=pattern)
+
+        async def operation(session: AsyncSession):
+            session.add(rule)
+
+        await self._write(
+            operation,
+            keys=[("chat", chat_id)],
+            events=[(EntityEnum.CHAT_FILTER, chat_id)],
+        )
+        return rule
+
+    async def remove_chat_filter_rule(self, chat_id: int, rule_id: int):
+        async def operation(session: AsyncSession):
+            await session.execute(
+                delete(ChatFilterRule).where(
+                    ChatFilterRule.chat_id == chat_id,
+                    ChatFilterRule.id == rule_id,
+                ),
+            )
+
+        await self._write(
+            operation,
+            keys=[("chat", chat_id)],
+            events=[(EntityEnum.CHAT_FILTER, chat_id)],
+        )
+
+    async def add_scheduled_action(
+            self,
+            kind: ScheduledActionKindEnum,
+            chat_id: int,
+            user_id: int,
+            due_at: datetime,
+            bot_id: int | None = None,
+    ) -> ScheduledAction:
+        action = ScheduledAction(
+            kind=kind,
+            chat_id=chat_id,
+            user_id=user_id,
+            due_at=due_at,
+            bot_id=bot_id,
+        )
+
+        async def operation(session: AsyncSession):
+            session.add(action)
+
+        await self._write(operation)
+        return action
+
+    async def get_scheduled_actions(
+            self,
+            until: datetime,
+            since: datetime | None = None,
+    ) -> list[ScheduledAction]:
+        query = select(ScheduledAction).where(ScheduledAction.due_at < until)
+        if since is not None:
+            query = query.where(ScheduledAction.due_at >= since)
 
         async with self._sessionmaker() as session:
-            async with session.begin():
-                session.add(user.dialog)
-        return user
+            result = await session.execute(query.order_by(ScheduledAction.due_at))
+            return list(result.scalars().all())
+
+    async def get_scheduled_action_ids(self, ids: Sequence[int]) -> set[int]:
+        query = select(ScheduledAction.id).where(ScheduledAction.id.in_(ids))
+
+        async with self._sessionmaker() as session:
+            result = await session.execute(query)
+            return set(result.scalars().all())
+
+    async def cancel_scheduled_actions(
+            self,
+            kind: ScheduledActionKindEnum,
+            chat_id: int,
+            user_id: int,
+    ) -> list[int]:
+        async def operation(session: AsyncSession) -> list[int]:
+            result = await session.execute(
+                select(ScheduledAction.id).where(
+                    ScheduledAction.kind == kind,
+                    ScheduledAction.chat_id == chat_id,
+                    ScheduledAction.user_id == user_id,
+                ),
+            )
+            ids = list(result.scalars().all())
+            if ids:
+                await session.execute(delete(ScheduledAction).where(ScheduledAction.id.in_(ids)))
+            return ids
+
+        return await self._write(operation)
 
-    async def get_dialog_state(self, user: User) -> str | None:
-        return user.dialog.state
+    async def remove_scheduled_actions(self, ids: Sequence[int]):
+        async def operation(session: AsyncSession):
+            await session.execute(delete(ScheduledAction).where(ScheduledAction.id.in_(ids)))
 
-    async def set_dialog_data(self, user: User, data: dict[str, Any]) -> User:
-        user.dialog.data = data
+        await self._write(operation)
+
+    async def postpone_scheduled_action(self, id: int, due_at: datetime):
+        async def operation(session: AsyncSession):
+            await session.execute(
+                update(ScheduledAction).where(ScheduledAction.id == id).values(due_at=due_at),
+            )
+
+        await self._write(operation)
+
+    async def add_captcha_challenge(
+            self,
+            chat_id: int,
+            user_id: int,
+            answer: str,
+            message_id: int | None,
+            expires_at: datetime,
+            bot_id: int | None = None,
+    ):
+        challenge = CaptchaChallenge(
+            chat_id=chat_id,
+            user_id=user_id,
+            answer=answer,
+            message_id=message_id,
+            expires_at=expires_at,
+            bot_id=bot_id,
+        )
+
+        async def operation(session: AsyncSession):
+            await session.merge(challenge)
+
+        await self._write(operation)
+
+    async def remove_captcha_challenge(self, chat_id: int, user_id: int):
+        async def operation(session: AsyncSession):
+            await session.execute(
+                delete(CaptchaChallenge).where(
+                    CaptchaChallenge.chat_id == chat_id,
+                    CaptchaChallenge.user_id == user_id,
+                ),
+            )
+
+        await self._write(operation)
+
+    async def get_captcha_challenges(self, bot_id: int | None = None) -> list[CaptchaChallenge]:
+        query = select(CaptchaChallenge)
+        if bot_id is not None:
+            # Challenges created before bots were tracked belong to any bot
+            query = query.where(or_(CaptchaChallenge.bot_id == bot_id, CaptchaChallenge.bot_id.is_(None)))
+        async with self._sessionmaker() as session:
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    async def count_users(self, after_id: int = 0) -> int:
+        async with self._sessionmaker() as session:
+            return await session.scalar(
+                select(func.count()).select_from(User).where(User.telegram_id > after_id),
+            )
+
+    async def get_users_page(self, after_id: int = 0, limit: int = 1000) -> list[tuple[int, str]]:
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(User.telegram_id, User.full_name)
+                .where(User.telegram_id > after_id)
+                .order_by(User.telegram_id)
+                .limit(limit),
+            )
+            return [tuple(row) for row in result.all()]
+
+    async def get_chat_sync(self, chat_id: int) -> ChatSync | None:
+        async with self._sessionmaker() as session:
+            return await session.get(ChatSync, chat_id)
+
+    async def set_chat_sync_cursor(self, chat_id: int, cursor: int, finished: bool = False):
+        chat_sync = ChatSync(chat_id=chat_id, cursor=cursor, finished=finished)
+
+        async def operation(session: AsyncSession):
+            await session.merge(chat_sync)
+
+        await self._write(operation)
+
+    async def get_unfinished_chat_syncs(self) -> list[int]:
+        async with self._sessionmaker() as session:
+            result = await session.execute(
+                select(ChatSync.chat_id).where(ChatSync.finished.is_(False)),
+            )
+            return list(result.scalars().all())
 
+    async def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        # Acquires free or expired lease, or prolongs lease of the same holder
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
         async with self._sessionmaker() as session:
             async with session.begin():
-                session.add(user.dialog)
-        return user
+                result = await session.execute(
+                    update(Lease)
+                    .where(Lease.name == name, or_(Lease.holder == holder, Lease.expires_at < now))
+                    .values(holder=holder, expires_at=expires_at),
+                )
+                if result.rowcount:
+                    return True
+                result = await session.execute(
+                    self._insert_ignore(Lease).values(name=name, holder=holder, expires_at=expires_at),
+                )
+                return bool(result.rowcount)
+
+    async def release_lease(self, name: str, holder: str):
+        async with self._sessionmaker() as session:
+            async with session.begin():
+                await session.execute(delete(Lease).where(Lease.name == name, Lease.holder == holder))
 
-    async def get_dialog_data(self, user: User) -> dict[str, Any]:
-        return user.dialog.data
+    def record_audit_event(
+            self,
+            kind: AuditEventKindEnum,
+            chat_id: int,
+            user_id: int | None = None,
+            actor_id: int | None = None,
+            data: dict[str, Any] | None = None,
+    ):
+        self._audit_writer.record({
+            "created_at": datetime.utcnow(),
+            "kind": kind,
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "actor_id": actor_id,
+            "data": data,
+        })
+
+    async def get_audit_events(
+            self,
+            chat_id: int,
+            since: datetime | None = None,
+            until: datetime | None = None,
+            before: tuple[datetime, int] | None = None,
+            limit: int = 50,
+    ) -> list[AuditEvent]:
+        # Newest first, next page starts before (created_at, id) of the last event of previous one
+        query = select(AuditEvent).where(AuditEvent.chat_id == chat_id)
+        if since is not None:
+            query = query.where(AuditEvent.created_at >= since)
+        if until is not None:
+            query = query.where(AuditEvent.created_at < until)
+        if before is not None:
+            query = query.where(tuple_(AuditEvent.created_at, AuditEvent.id) < tuple_(*before))
+        query = query.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(limit)
+
+        async with self._read_sessionmaker()() as session:
+            result = await session.execute(query)
+            return list(result.scalars().all())
+
+    async def add_chat_stats(self, counters: dict[tuple[int, datetime, ChatStatKindEnum], int]):
+        daily: dict[tuple[int, date, ChatStatKindEnum], int] = {}
+        for (chat_id, hour, kind), count in counters.items():
+            key = (chat_id, hour.date(), kind)
+            daily[key] = daily.get(key, 0) + count
+        # Sorted keys make concurrent upserts lock rows in the same order
+        hourly_rows = [
+            {"chat_id": chat_id, "hour": hour, "kind": kind, "count": count}
+            for (chat_id, hour, kind), count in sorted(counters.items())
+        ]
+        daily_rows = [
+            {"chat_id": chat_id, "day": day, "kind": kind, "count": count}
+            for (chat_id, day, kind), count in sorted(daily.items())
+        ]
+        if not hourly_rows:
+            return
+
+        async def operation(session: AsyncSession):
+            for model, rows in ((ChatStatHourly, hourly_rows), (ChatStatDaily, daily_rows)):
+                for start in range(0, len(rows), self._bulk_chunk_size):
+                    chunk = rows[start:start + self._bulk_chunk_size]
+                    await session.execute(self._upsert_counts(model=model, rows=chunk))
+
+        await self._write(operation)
+
+    async def get_chat_stats(self, chat_id: int, since: date, until: date) -> list[ChatStatDaily]:
+        async with self._read_sessionmaker()() as session:
+            result = await session.execute(
+                select(ChatStatDaily)
+                .where(
+                    ChatStatDaily.chat_id == chat_id,
+                    ChatStatDaily.day >= since,
+                    ChatStatDaily.day <= until,
+                )
+                .order_by(ChatStatDaily.day),
+            )
+            return list(result.scalars().all())
+
+    async def _get_range_end(
+            self,
+            session: AsyncSession,
+            column: InstrumentedAttribute,
+            after_id: int | None,
+            limit: int,
+    ) -> int | None:
+        # Batch covers ids in (after_id, end], None means the rest of table
+        query = select(column).order_by(column).offset(limit - 1).limit(1)
+        if after_id is not None:
+            query = query.where(column > after_id)
+        return (await session.execute(query)).scalar()
+
+    @staticmethod
+    def _in_range(column: InstrumentedAttribute, after_id: int | None, end_id: int | None) -> list[Any]:
+        conditions = []
+        if after_id is not None:
+            conditions.append(column > after_id)
+        if end_id is not None:
+            conditions.append(column <= end_id)
+        return conditions
+
+    @staticmethod
+    def _stale(before: datetime) -> Any:
+        # Members added by sync before they had last seen time are stale too
+        return or_(User.last_seen_at.is_(None), User.last_seen_at < before)
+
+    async def reset_stale_dialogs(
+            self,
+            after_id: int | None,
+            limit: int,
+            before: datetime,
+    ) -> tuple[int | None, int]:
+        async def operation(session: AsyncSession) -> tuple[int | None, int]:
+            end_id = await self._get_range_end(session, UserDialog.user_id, after_id, limit)
+            stale_users = select(User.telegram_id).where(self._stale(before=before))
+            result = await session.execute(
+                update(UserDialog)
+                .where(
+                    *self._in_range(UserDialog.user_id, after_id, end_id),
+                    UserDialog.user_id.in_(stale_users),
+                    or_(UserDialog.state.is_not(None), cast(UserDialog.data, String) != "{}"),
+                )
+                .values(state=None, data={}),
+            )
+            return end_id, result.rowcount
+
+        return await self._write(operation)
+
+    async def delete_stale_users(
+            self,
+            after_id: int | None,
+            limit: int,
+            before: datetime,
+    ) -> tuple[int | None, int]:
+        ids = []
+
+        async def operation(session: AsyncSession) -> int | None:
+            ids.clear()
+            end_id = await self._get_range_end(session, User.telegram_id, after_id, limit)
+            # Members and owners of chats are kept, they are needed for chat management
+            result = await session.execute(
+                select(User.telegram_id).where(
+                    *self._in_range(User.telegram_id, after_id, end_id),
+                    self._stale(before=before),
+                    ~select(ChatUser.user_id).where(ChatUser.user_id == User.telegram_id).exists(),
+                    ~select(Chat.telegram_id).where(Chat.owner_id == User.telegram_id).exists(),
+                ),
+            )
+            ids.extend(result.scalars().all())
+            if ids:
+                await session.execute(delete(UserSettings).where(UserSettings.user_id.in_(ids)))
+                await session.execute(delete(UserDialog).where(UserDialog.user_id.in_(ids)))
+                await session.execute(delete(User).where(User.telegram_id.in_(ids)))
+                await self._bus.notify(session=session, events=[(EntityEnum.USER, id) for id in ids])
+            return end_id
+
+        end_id = await self._write(operation)
+        self._bus.dispatch([(EntityEnum.USER, id) for id in ids])
+        return end_id, len(ids)
+
+    async def delete_left_chats(
+            self,
+            after_id: int | None,
+            limit: int,
+            before: datetime,
+    ) -> tuple[int | None, int]:
+        ids = []
+
+        async def operation(session: AsyncSession) -> int | None:
+            ids.clear()
+            end_id = await self._get_range_end(session, Chat.telegram_id, after_id, limit)
+            result = await session.execute(
+                select(Chat.telegram_id).where(
+                    *self._in_range(Chat.telegram_id, after_id, end_id),
+                    Chat.left_at < before,
+                ),
+            )
+            ids.extend(result.scalars().all())
+            if ids:
+                # Audit events are kept, history of removed chats is still needed
+                for model in (
+                        ChatUser,
+                        ChatPolicy,
+                        ChatFilterRule,
+                        ChatSync,
+                        ScheduledAction,
+                        CaptchaChallenge,
+                        ChatStatHourly,
+                        ChatStatDaily,
+                ):
+                    await session.execute(delete(model).where(model.chat_id.in_(ids)))
+                await session.execute(delete(Chat).where(Chat.telegram_id.in_(ids)))
+                await self._bus.notify(session=session, events=self._get_chat_events(ids=ids))
+            return end_id
+
+        end_id = await self._write(operation)
+        self._bus.dispatch(self._get_chat_events(ids=ids))
+        return end_id, len(ids)
+
+    @staticmethod
+    def _get_chat_events(ids: Sequence[int]) -> list[Event]:
+        return [
+            (entity, id)
+            for id in ids
+            for entity in (
+                EntityEnum.CHAT,
+                EntityEnum.CHAT_USERS,
+                EntityEnum.CHAT_POLICY,
+                EntityEnum.CHAT_FILTER,
+            )
+        ]
+
+    async def delete_old_chat_stats(
+            self,
+            after_id: tuple[int, datetime] | None,
+            limit: int,
+            before: datetime,
+    ) -> tuple[tuple[int, datetime] | None, int]:
+        # Daily rollups are small and kept, hourly ones are needed for recent period only. One chat
+        # can have long history, so batches are ranged by keyset over (chat_id, hour) of old rows
+        key = tuple_(ChatStatHourly.chat_id, ChatStatHourly.hour)
+
+        async def operation(session: AsyncSession) -> tuple[tuple[int, datetime] | None, int]:
+            query = (
+                select(ChatStatHourly.chat_id, ChatStatHourly.hour)
+                .where(ChatStatHourly.hour < before)
+                .order_by(ChatStatHourly.chat_id, ChatStatHourly.hour)
+                .offset(limit - 1)
+                .limit(1)
+            )
+            if after_id is not None:
+                query = query.where(key > tuple_(*after_id))
+            end = (await session.execute(query)).first()
+            end_id = tuple(end) if end is not None else None
+
+            conditions = [ChatStatHourly.hour < before]
+            if after_id is not None:
+                conditions.append(key > tuple_(*after_id))
+            if end_id is not None:
+                conditions.append(key <= tuple_(*end_id))
+            result = await session.execute(delete(ChatStatHourly).where(*conditions))
+            return end_id, result.rowcount
+
+        return await self._write(operation)
+
+    async def stream_tables(
+            self,
+            tables: Sequence[Table],
+            chunk_size: int = 1000,
+    ) -> AsyncIterator[tuple[Table, list[dict[str, Any]]]]:
+        # Server side cursors keep memory constant, one transaction gives consistent snapshot
+        async with self._engine.connect() as connection:
+            if self._engine.dialect.name == "postgresql":
+                connection = await connection.execution_options(isolation_level="REPEATABLE READ")
+            async with connection.begin():
+                for model_table in tables:
+                    result = await connection.stream(
+                        select(model_table)
+                        .order_by(*model_table.primary_key.columns)
+                        .execution_options(yield_per=chunk_size),
+                    )
+                    async for rows in result.mappings().partitions(chunk_size):
+                        yield model_table, [dict(row) for row in rows]
+
+    async def insert_rows(self, model_table: Table, rows: Sequence[dict[str, Any]]):
+        # Existing rows are skipped, so interrupted import can be repeated
+        async with self._engine.begin() as connection:
+            for start in range(0, len(rows), self._bulk_chunk_size):
+                await connection.execute(
+                    self._insert_ignore(model_table),
+                    rows[start:start + self._bulk_chunk_size],
+                )
+
+    async def reset_sequences(self, tables: Sequence[Table]):
+        # Rows were inserted with explicit ids, PostgreSQL sequences must continue after them
+        if self._engine.dialect.name != "postgresql":
+            return
+
+        async with self._engine.begin() as connection:
+            for model_table in tables:
+                for column in model_table.primary_key.columns:
+                    if column.autoincrement is not True or not isinstance(column.type, Integer):
+                        continue
+                    name = model_table.name
+                    await connection.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{name}', '{column.name}'), "
+                        f"COALESCE(MAX({column.name}), 1)) FROM {name}"
+                    ))
 
 
 def get_service(settings: Settings) -> Service:
-    return Service(dsn=str(settings.dsn))
+    parameters = {
+        "dsn": str(settings.dsn),
+        "bulk_chunk_size": settings.bulk_chunk_size,
+        "audit_batch_size": settings.audit.batch_size,
+        "audit_flush_interval": settings.audit.flush_interval,
+        "audit_max_pending": settings.audit.max_pending,
+        "migrate_on_start": settings.migrate_on_start,
+        "migration_lock_poll_interval": settings.migration_lock_poll_interval,
+        "invalidation_channel": settings.invalidation_channel,
+    }
+    if settings.write_batching is not None:
+        parameters.update({
+            "write_batch_size": settings.write_batching.max_size,
+            "write_batch_delay": settings.write_batching.max_delay,
+        })
+    if settings.retention is not None:
+        parameters.update({
+            "retention_interval": settings.retention.interval,
+            "retention_batch_size": settings.retention.batch_size,
+            "retention_batch_delay": settings.retention.batch_delay,
+            "retention_user_days": settings.retention.user_days,
+            "retention_dialog_days": settings.retention.dialog_days,
+            "retention_chat_days": settings.retention.chat_days,
+            "retention_stats_hourly_days": settings.retention.stats_hourly_days,
+        })
+    if settings.replicas:
+        parameters.update({
+            "replica_dsns": [str(replica) for replica in settings.replicas],
+            "replica_stickiness": settings.replica_stickiness,
+        })
+
+    return Service(**parameters)
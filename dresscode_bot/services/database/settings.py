@@ -1,6 +1,38 @@
-from pydantic import AnyUrl
+from pydantic import AnyUrl, PositiveInt, confloat
 from pydantic_settings import BaseSettings
 
 
+class WriteBatchingSettings(BaseSettings):
+    max_size: PositiveInt = 100
+    max_delay: confloat(gt=0) = 0.005
+
+
+class AuditSettings(BaseSettings):
+    batch_size: PositiveInt = 500
+    flush_interval: confloat(gt=0) = 1.0
+    max_pending: PositiveInt = 100000
+
+
+class RetentionSettings(BaseSettings):
+    interval: confloat(gt=0) = 86400.0
+    batch_size: PositiveInt = 1000
+    batch_delay: confloat(ge=0) = 0.1
+    # None keeps rows forever
+    user_days: PositiveInt | None = 365
+    dialog_days: PositiveInt | None = 30
+    chat_days: PositiveInt | None = 30
+    stats_hourly_days: PositiveInt | None = 30
+
+
 class Settings(BaseSettings):
     dsn: AnyUrl = "sqlite+aiosqlite:///db.sqlite3"
+    bulk_chunk_size: PositiveInt = 500
+    write_batching: WriteBatchingSettings | None = None
+    audit: AuditSettings = AuditSettings()
+    retention: RetentionSettings | None = None
+    replicas: list[AnyUrl] = []
+    replica_stickiness: confloat(ge=0) = 5.0
+    migrate_on_start: bool = False
+    migration_lock_poll_interval: confloat(gt=0) = 1.0
+    # PostgreSQL channel for cache invalidation events, None keeps them in process
+    invalidation_channel: str | None = "dresscode_invalidation"
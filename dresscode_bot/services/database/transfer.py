@@ -0,0 +1,113 @@
+import gzip
+import json
+import logging
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from sqlalchemy import Date, DateTime, Enum, Table
+
+from .models import Base
+
+if TYPE_CHECKING:
+    from .service import Service
+
+
+logger = logging.getLogger(__name__)
+
+# Parent tables go first, so import can insert rows in file order
+TABLES = (
+    "users",
+    "users_settings",
+    "users_dialog",
+    "chats",
+    "chats_users",
+    "chats_sync",
+    "chats_policies",
+    "chats_filter_rules",
+    "scheduled_actions",
+    "captcha_challenges",
+    "audit_events",
+    "chats_stats_hourly",
+    "chats_stats_daily",
+)
+# Leases belong to running processes and expire in seconds, new database starts without them
+EXCLUDED_TABLES = (
+    "leases",
+)
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_record(table: Table, row: dict[str, Any]) -> str:
+    record = {"table": table.name, "row": row}
+    return json.dumps(record, default=_encode, ensure_ascii=False) + "\n"
+
+
+def decode_row(table: Table, row: dict[str, Any]) -> dict[str, Any]:
+    for column in table.columns:
+        value = row.get(column.name)
+        if value is None:
+            continue
+        if isinstance(column.type, Enum) and column.type.enum_class is not None:
+            row[column.name] = column.type.enum_class(value)
+        elif isinstance(column.type, DateTime):
+            row[column.name] = datetime.fromisoformat(value)
+        elif isinstance(column.type, Date):
+            row[column.name] = date.fromisoformat(value)
+    return row
+
+
+async def export_data(
+        database_service: "Service",
+        path: Path,
+        chunk_size: int = 1000,
+) -> dict[str, int]:
+    tables = [Base.metadata.tables[name] for name in TABLES]
+    counts = dict.fromkeys(TABLES, 0)
+    started_at = time.perf_counter()
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        chunks = database_service.stream_tables(tables=tables, chunk_size=chunk_size)
+        async for table, rows in chunks:
+            file.writelines(encode_record(table=table, row=row) for row in rows)
+            counts[table.name] += len(rows)
+
+    logger.info(
+        "[database] Exported %d rows in %.1f s",
+        sum(counts.values()), time.perf_counter() - started_at,
+    )
+    return counts
+
+
+async def import_data(
+        database_service: "Service",
+        path: Path,
+        chunk_size: int = 1000,
+) -> dict[str, int]:
+    counts = dict.fromkeys(TABLES, 0)
+    started_at = time.perf_counter()
+    table, rows = None, []
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            if table is None or record["table"] != table.name or len(rows) >= chunk_size:
+                if rows:
+                    await database_service.insert_rows(model_table=table, rows=rows)
+                    counts[table.name] += len(rows)
+                table, rows = Base.metadata.tables[record["table"]], []
+            rows.append(decode_row(table=table, row=record["row"]))
+    if rows:
+        await database_service.insert_rows(model_table=table, rows=rows)
+        counts[table.name] += len(rows)
+
+    await database_service.reset_sequences(tables=[Base.metadata.tables[name] for name in TABLES])
+    logger.info(
+        "[database] Imported %d rows in %.1f s",
+        sum(counts.values()), time.perf_counter() - started_at,
+    )
+    return counts
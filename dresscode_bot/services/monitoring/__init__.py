@@ -0,0 +1,12 @@
+from typing import Any
+
+from .settings import Settings
+
+
+def __getattr__(name: str) -> Any:
+    # Root settings import this package, aiohttp server is loaded by telegram CLI only
+    if name in ("Service", "get_service"):
+        from . import service
+
+        return getattr(service, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
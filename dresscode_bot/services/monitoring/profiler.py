@@ -0,0 +1,63 @@
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+
+def collapse_stack(frame: FrameType | None) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_filename}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def sample(thread_id: int, duration: float, interval: float) -> Counter[str]:
+    stacks: Counter[str] = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[collapse_stack(frame)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def write_collapsed(stacks: Counter[str], path: Path) -> Path:
+    # One "frame;frame;frame count" line per stack, the format of flamegraph.pl and speedscope
+    with open(path, "w") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+    return path
+
+
+class Watchdog(threading.Thread):
+    # Event loop can not report that it is blocked, so separate thread checks loop heartbeat and
+    # takes stack of loop thread while it is stuck
+    def __init__(self, thread_id: int, timeout: float, callback):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self._thread_id = thread_id
+        self._timeout = timeout
+        self._callback = callback
+        self._heartbeat = time.monotonic()
+        self._stopped = threading.Event()
+
+    def beat(self):
+        self._heartbeat = time.monotonic()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        reported = None
+        while not self._stopped.wait(self._timeout / 2):
+            heartbeat = self._heartbeat
+            if time.monotonic() - heartbeat < self._timeout or reported == heartbeat:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                reported = heartbeat
+                self._callback(frame)
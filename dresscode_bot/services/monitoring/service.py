@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import signal
+import threading
+import traceback
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+
+from aiohttp import web
+from facet import ServiceMixin
+
+from .profiler import Watchdog, sample, write_collapsed
+from .settings import Settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class Service(ServiceMixin):
+    def __init__(
+            self,
+            lag_interval: float = 0.5,
+            lag_threshold: float = 0.1,
+            profile_directory: Path = Path("."),
+            profile_duration: int = 30,
+            profile_interval: float = 0.005,
+            profile_signal: bool = True,
+            profile_token: str | None = None,
+    ):
+        self._lag_interval = lag_interval
+        self._lag_threshold = lag_threshold
+        self._profile_directory = profile_directory
+        self._profile_duration = profile_duration
+        self._profile_interval = profile_interval
+        self._profile_signal = profile_signal
+        self._profile_token = profile_token
+        self._lag = 0.0
+        self._max_lag = 0.0
+        self._thread_id = threading.get_ident()
+        self._watchdog: Watchdog | None = None
+        self._profile_lock = asyncio.Lock()
+
+    @property
+    def lag(self) -> float:
+        return self._lag
+
+    @property
+    def max_lag(self) -> float:
+        return self._max_lag
+
+    async def start(self):
+        logger.info("[monitoring] Start service")
+
+        self._thread_id = threading.get_ident()
+        self._watchdog = Watchdog(
+            thread_id=self._thread_id,
+            timeout=self._lag_interval + self._lag_threshold,
+            callback=self._report_blocked,
+        )
+        self._watchdog.start()
+        self.add_task(self._measure_lag())
+
+        if self._profile_signal:
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGUSR2, self._on_profile_signal)
+
+    async def stop(self):
+        if self._profile_signal:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR2)
+        if self._watchdog is not None:
+            self._watchdog.stop()
+            self._watchdog = None
+
+    def _report_blocked(self, frame: FrameType):
+        stack = "".join(traceback.format_stack(frame))
+        logger.warning("[monitoring] Event loop is blocked, current stack:\n%s", stack)
+
+    async def _measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._lag_interval
+            await asyncio.sleep(self._lag_interval)
+            self._lag = max(loop.time() - expected, 0.0)
+            self._max_lag = max(self._max_lag, self._lag)
+            if self._watchdog is not None:
+                self._watchdog.beat()
+            if self._lag > self._lag_threshold:
+                logger.warning("[monitoring] Event loop lag: %.3f s", self._lag)
+
+    async def profile(self, duration: float | None = None) -> Path:
+        duration = duration or self._profile_duration
+        async with self._profile_lock:
+            logger.info("[monitoring] Start profiling for %.1f s", duration)
+            stacks = await asyncio.to_thread(
+                sample,
+                self._thread_id,
+                duration,
+                self._profile_interval,
+            )
+            path = self._profile_directory / f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded"
+            await asyncio.to_thread(write_collapsed, stacks, path)
+        logger.info("[monitoring] Profile saved: %s", path)
+        return path
+
+    def _on_profile_signal(self):
+        if self._profile_lock.locked():
+            logger.warning("[monitoring] Profiling is already running")
+            return
+        self.add_task(self.profile())
+
+    async def profile_handler(self, request: web.Request) -> web.StreamResponse:
+        if self._profile_token is None or request.headers.get("X-Profile-Token") != self._profile_token:
+            raise web.HTTPForbidden()
+        if self._profile_lock.locked():
+            raise web.HTTPConflict(text="Profiling is already running")
+
+        try:
+            duration = float(request.query.get("seconds", self._profile_duration))
+        except ValueError:
+            raise web.HTTPBadRequest(text="Parameter 'seconds' must be a number")
+        path = await self.profile(duration=min(max(duration, 1.0), 600.0))
+        return web.FileResponse(path)
+
+    def setup_application(self, app: web.Application, path: str = "/debug/profile"):
+        if self._profile_token is None:
+            return
+        app.router.add_post(path, self.profile_handler)
+
+
+def get_service(settings: Settings) -> Service:
+    return Service(
+        lag_interval=settings.lag_interval,
+        lag_threshold=settings.lag_threshold,
+        profile_directory=settings.profile_directory,
+        profile_duration=settings.profile_duration,
+        profile_interval=settings.profile_interval,
+        profile_signal=settings.profile_signal,
+        profile_token=settings.profile_token,
+    )
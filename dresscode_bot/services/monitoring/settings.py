@@ -0,0 +1,14 @@
+from pathlib import Path
+
+from pydantic import PositiveInt, confloat
+from pydantic_settings import BaseSettings
+
+
+class Settings(BaseSettings):
+    lag_interval: confloat(gt=0) = 0.5
+    lag_threshold: confloat(gt=0) = 0.1
+    profile_directory: Path = Path(".")
+    profile_duration: PositiveInt = 30
+    profile_interval: confloat(gt=0) = 0.005
+    profile_signal: bool = True
+    profile_token: str | None = None
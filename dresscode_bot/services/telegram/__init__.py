@@ -1,3 +1,13 @@
-from .cli import get_cli
-from .service import Service, get_service
-from .settings import Settings 
+from typing import Any
+
+from .cli import get_chats_cli, get_cli
+from .settings import Settings
+
+
+def __getattr__(name: str) -> Any:
+    # Database commands of CLI must not import aiogram and aiohttp
+    if name in ("Service", "Hosting", "get_service"):
+        from . import service
+
+        return getattr(service, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
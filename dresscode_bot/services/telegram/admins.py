@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from aiogram import Bot
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import ChatMember, ChatMemberUpdated
+from facet import ServiceMixin
+
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = frozenset([ChatMemberStatus.CREATOR, ChatMemberStatus.ADMINISTRATOR])
+
+
+@dataclass(frozen=True, slots=True)
+class AdminRoster:
+    admin_ids: frozenset[int] = frozenset()
+    # Owner is unknown while ownership is being transferred or for hidden anonymous owner
+    owner_id: int | None = None
+    loaded_at: float = 0.0
+
+
+def build_roster(administrators: list[ChatMember]) -> AdminRoster:
+    owner_id = None
+    for administrator in administrators:
+        if administrator.status == ChatMemberStatus.CREATOR:
+            owner_id = administrator.user.id
+    return AdminRoster(
+        admin_ids=frozenset(administrator.user.id for administrator in administrators),
+        owner_id=owner_id,
+        loaded_at=time.monotonic(),
+    )
+
+
+def apply_update(roster: AdminRoster, event: ChatMemberUpdated) -> AdminRoster:
+    user_id = event.new_chat_member.user.id
+    status = event.new_chat_member.status
+    if status in ADMIN_STATUSES:
+        admin_ids = roster.admin_ids | {user_id}
+    else:
+        admin_ids = roster.admin_ids - {user_id}
+
+    owner_id = roster.owner_id
+    if status == ChatMemberStatus.CREATOR:
+        owner_id = user_id
+    elif owner_id == user_id:
+        owner_id = None
+    return AdminRoster(admin_ids=admin_ids, owner_id=owner_id, loaded_at=roster.loaded_at)
+
+
+class AdminCache(ServiceMixin):
+    # Roster of chat is loaded from Bot API once and then follows promotion and demotion updates,
+    # slow reconciliation only repairs updates that were missed while bot was offline
+    def __init__(
+            self,
+            bot: Bot,
+            reconcile_interval: float = 3600.0,
+            reconcile_batch_size: int = 20,
+            reconcile_batch_delay: float = 1.0,
+    ):
+        self._bot = bot
+        self._reconcile_interval = reconcile_interval
+        self._reconcile_batch_size = reconcile_batch_size
+        self._reconcile_batch_delay = reconcile_batch_delay
+        self._rosters: dict[int, AdminRoster] = {}
+        self._loads: dict[int, asyncio.Task] = {}
+        # Updates applied per chat, load started before an update must not overwrite it
+        self._changes: Counter[int] = Counter()
+
+    async def __call__(
+            self,
+            handler: Callable,
+            event: ChatMemberUpdated,
+            data: dict[str, Any],
+    ) -> Any:
+        self.apply(event=event)
+        return await handler(event, data)
+
+    async def start(self):
+        logger.info("[telegram] Start admin cache")
+
+        self.add_task(self._reconciling())
+
+    def peek(self, chat_id: int) -> AdminRoster | None:
+        return self._rosters.get(chat_id)
+
+    async def get(self, chat_id: int) -> AdminRoster | None:
+        roster = self._rosters.get(chat_id)
+        if roster is None:
+            roster = await self.load(chat_id=chat_id)
+        return roster
+
+    async def is_admin(self, chat_id: int, user_id: int) -> bool:
+        roster = await self.get(chat_id=chat_id)
+        return roster is not None and user_id in roster.admin_ids
+
+    async def owner_of(self, chat_id: int) -> int | None:
+        roster = await self.get(chat_id=chat_id)
+        return roster.owner_id if roster is not None else None
+
+    def apply(self, event: ChatMemberUpdated):
+        old_status = event.old_chat_member.status
+        new_status = event.new_chat_member.status
+        if old_status not in ADMIN_STATUSES and new_status not in ADMIN_STATUSES:
+            return
+
+        chat_id = event.chat.id
+        roster = self._rosters.get(chat_id)
+        if roster is None and chat_id not in self._loads:
+            # Roster of chat is not used yet, it is loaded with fresh data on first lookup
+            return
+        self._changes[chat_id] += 1
+        if roster is not None:
+            self._rosters[chat_id] = apply_update(roster=roster, event=event)
+
+    def evict(self, chat_id: int):
+        self._rosters.pop(chat_id, None)
+        self._changes.pop(chat_id, None)
+
+    async def load(self, chat_id: int) -> AdminRoster | None:
+        # Concurrent misses of one chat share the same request
+        task = self._loads.get(chat_id)
+        if task is None:
+            task = self._loads[chat_id] = asyncio.create_task(self._load(chat_id=chat_id))
+            task.add_done_callback(lambda _: self._loads.pop(chat_id, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, chat_id: int) -> AdminRoster | None:
+        changes = self._changes[chat_id]
+        while True:
+            try:
+                administrators = await self._bot.get_chat_administrators(chat_id=chat_id)
+                break
+            except TelegramRetryAfter as exception:
+                logger.warning(
+                    "[telegram] Flood control, retry after %d seconds", exception.retry_after,
+                )
+                await asyncio.sleep(exception.retry_after)
+            except TelegramAPIError as exception:
+                # Bot is not in chat anymore or has no access to it
+                logger.warning(
+                    "[telegram] Administrators were not loaded: %d, %s", chat_id, exception,
+                )
+                self.evict(chat_id=chat_id)
+                return None
+
+        roster = build_roster(administrators=administrators)
+        if self._changes[chat_id] != changes:
+            # Update arrived during request, response can be older than it, so cached roster that
+            # already has the update is kept and missing roster is loaded again on next lookup
+            logger.info("[telegram] Administrators changed during load: %d", chat_id)
+            return self._rosters.get(chat_id, roster)
+        self._rosters[chat_id] = roster
+        return roster
+
+    async def reconcile(self) -> int:
+        deadline = time.monotonic() - self._reconcile_interval
+        chat_ids = sorted(
+            (chat_id for chat_id, roster in self._rosters.items() if roster.loaded_at <= deadline),
+            key=lambda chat_id: self._rosters[chat_id].loaded_at,
+        )
+        for i in range(0, len(chat_ids), self._reconcile_batch_size):
+            if i:
+                await asyncio.sleep(self._reconcile_batch_delay)
+            await asyncio.gather(*(
+                self.load(chat_id=chat_id)
+                for chat_id in chat_ids[i:i + self._reconcile_batch_size]
+            ))
+        return len(chat_ids)
+
+    async def _reconciling(self):
+        while True:
+            await asyncio.sleep(self._reconcile_interval)
+            try:
+                count = await self.reconcile()
+            except Exception:
+                logger.exception("[telegram] Administrators reconciliation failed")
+            else:
+                logger.info("[telegram] Administrators reconciled: %d chats", count)
@@ -0,0 +1,297 @@
+import asyncio
+import heapq
+import importlib.util
+import io
+import logging
+import random
+import string
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import BufferedInputFile, InlineKeyboardButton, InlineKeyboardMarkup
+from facet import ServiceMixin
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.models import ChatStatKindEnum, ScheduledActionKindEnum
+from .enums import CaptchaModeEnum
+from .i18n import Catalog
+from .scheduler import Scheduler
+from .stats import ChatStats
+
+
+logger = logging.getLogger(__name__)
+
+ANSWER_ALPHABET = string.ascii_uppercase + string.digits
+
+
+class CaptchaCallbackData(CallbackData, prefix="captcha"):
+    user_id: int
+    answer: str
+
+
+@dataclass(slots=True)
+class Challenge:
+    chat_id: int
+    user_id: int
+    answer: str
+    expires_at: float
+    message_id: int | None = None
+
+
+class ChallengeStore:
+    # Dict gives O(1) lookup by (chat, user), heap gives O(log n) expiration, solved challenges
+    # are removed from dict only and their heap entries are skipped lazily
+    def __init__(self):
+        self._challenges: dict[tuple[int, int], Challenge] = {}
+        self._heap: list[tuple[float, int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._challenges)
+
+    def add(self, challenge: Challenge):
+        self._challenges[(challenge.chat_id, challenge.user_id)] = challenge
+        heapq.heappush(self._heap, (challenge.expires_at, challenge.chat_id, challenge.user_id))
+
+    def get(self, chat_id: int, user_id: int) -> Challenge | None:
+        return self._challenges.get((chat_id, user_id))
+
+    def pop(self, chat_id: int, user_id: int) -> Challenge | None:
+        challenge = self._challenges.pop((chat_id, user_id), None)
+        if len(self._heap) > 2 * len(self._challenges) + 1024:
+            self._heap = [
+                (challenge.expires_at, challenge.chat_id, challenge.user_id)
+                for challenge in self._challenges.values()
+            ]
+            heapq.heapify(self._heap)
+        return challenge
+
+    def next_expiration(self) -> float | None:
+        return self._heap[0][0] if self._heap else None
+
+    def expire(self, now: float) -> list[Challenge]:
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, chat_id, user_id = heapq.heappop(self._heap)
+            challenge = self._challenges.get((chat_id, user_id))
+            if challenge is not None and challenge.expires_at == expires_at:
+                del self._challenges[(chat_id, user_id)]
+                expired.append(challenge)
+        return expired
+
+
+def render_captcha(text: str, width: int = 240, height: int = 90) -> bytes:
+    # Executed in worker process, so Pillow is imported there only
+    from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+    image = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for _ in range(8):
+        draw.line(
+            [(random.randint(0, width), random.randint(0, height)) for _ in range(2)],
+            fill=tuple(random.randint(100, 200) for _ in range(3)),
+            width=2,
+        )
+    font = ImageFont.load_default(size=height // 2)
+    step = width // (len(text) + 1)
+    for index, char in enumerate(text):
+        draw.text(
+            (step * index + step // 2, random.randint(0, height // 3)),
+            char,
+            font=font,
+            fill=tuple(random.randint(0, 90) for _ in range(3)),
+        )
+    image = image.filter(ImageFilter.SMOOTH)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Captcha(ServiceMixin):
+    def __init__(
+            self,
+            bot: Bot,
+            database_service: database.Service,
+            mode: CaptchaModeEnum = CaptchaModeEnum.BUTTON,
+            timeout: int = 120,
+            options: int = 4,
+            persistent: bool = False,
+            kick_on_fail: bool = False,
+            processes: int = 1,
+            shard: tuple[int, int] | None = None,
+            stats: ChatStats | None = None,
+            scheduler: Scheduler | None = None,
+    ):
+        self._bot = bot
+        self._shard = shard
+        self._stats = stats
+        self._scheduler = scheduler
+        self._database_service = database_service
+        self._mode = mode
+        self._timeout = timeout
+        self._options = options
+        self._persistent = persistent
+        self._kick_on_fail = kick_on_fail
+        self._processes = processes
+        self._store = ChallengeStore()
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def dependencies(self) -> list[ServiceMixin]:
+        dependencies = [
+            self._database_service,
+        ]
+        if self._stats is not None:
+            dependencies.append(self._stats)
+        return dependencies
+
+    async def start(self):
+        logger.info("[captcha] Start service")
+
+        if self._mode == CaptchaModeEnum.IMAGE:
+            if importlib.util.find_spec("PIL") is None:
+                raise RuntimeError("Image captcha requires 'captcha' extra with Pillow installed")
+            self._executor = ProcessPoolExecutor(max_workers=self._processes)
+        if self._persistent:
+            challenges = await self._database_service.get_captcha_challenges(bot_id=self._bot.id)
+            for challenge in challenges:
+                if self._shard is not None and challenge.chat_id % self._shard[1] != self._shard[0]:
+                    continue
+                self._store.add(Challenge(
+                    chat_id=challenge.chat_id,
+                    user_id=challenge.user_id,
+                    answer=challenge.answer,
+                    expires_at=(challenge.expires_at - datetime(1970, 1, 1)).total_seconds(),
+                    message_id=challenge.message_id,
+                ))
+            logger.info("[captcha] Challenges loaded: %d", len(self._store))
+
+        self.add_task(self._expiring())
+
+    async def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _generate_answers(self) -> tuple[str, list[str]]:
+        answers = set()
+        while len(answers) < self._options:
+            answers.add("".join(random.choices(ANSWER_ALPHABET, k=4)))
+        answers = list(answers)
+        return random.choice(answers), answers
+
+    async def challenge(self, chat_id: int, user_id: int, full_name: str, i18n: Catalog):
+        answer, answers = self._generate_answers()
+        keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+            InlineKeyboardButton(
+                text=option,
+                callback_data=CaptchaCallbackData(user_id=user_id, answer=option).pack(),
+            )
+            for option in answers
+        ]])
+
+        if self._mode == CaptchaModeEnum.IMAGE:
+            loop = asyncio.get_running_loop()
+            image = await loop.run_in_executor(self._executor, render_captcha, answer)
+            message = await self._bot.send_photo(
+                chat_id=chat_id,
+                photo=BufferedInputFile(image, filename="captcha.png"),
+                caption=i18n("captcha_image", name=full_name),
+                reply_markup=keyboard,
+            )
+        else:
+            message = await self._bot.send_message(
+                chat_id=chat_id,
+                text=i18n("captcha_button", name=full_name, answer=answer),
+                reply_markup=keyboard,
+            )
+
+        expires_at = time.time() + self._timeout
+        self._store.add(Challenge(
+            chat_id=chat_id,
+            user_id=user_id,
+            answer=answer,
+            expires_at=expires_at,
+            message_id=message.message_id,
+        ))
+        if self._persistent:
+            await self._database_service.add_captcha_challenge(
+                chat_id=chat_id,
+                user_id=user_id,
+                answer=answer,
+                message_id=message.message_id,
+                expires_at=datetime.utcnow() + timedelta(seconds=self._timeout),
+                bot_id=self._bot.id,
+            )
+
+    async def _close(self, challenge: Challenge):
+        # Resolved challenge decides on restriction, lifting it by policy duration is not needed
+        if self._scheduler is not None:
+            await self._scheduler.cancel(
+                kind=ScheduledActionKindEnum.UNRESTRICT,
+                chat_id=challenge.chat_id,
+                user_id=challenge.user_id,
+            )
+        if self._persistent:
+            await self._database_service.remove_captcha_challenge(
+                chat_id=challenge.chat_id,
+                user_id=challenge.user_id,
+            )
+        if challenge.message_id is not None:
+            try:
+                await self._bot.delete_message(
+                    chat_id=challenge.chat_id,
+                    message_id=challenge.message_id,
+                )
+            except TelegramAPIError as exception:
+                logger.warning("[captcha] Challenge message was not deleted: %s", exception)
+
+    async def _fail(self, challenge: Challenge):
+        if self._stats is not None:
+            self._stats.increment(chat_id=challenge.chat_id, kind=ChatStatKindEnum.CAPTCHA_FAILED)
+        await self._close(challenge=challenge)
+        if not self._kick_on_fail:
+            return
+
+        try:
+            await self._bot.ban_chat_member(chat_id=challenge.chat_id, user_id=challenge.user_id)
+            await self._bot.unban_chat_member(
+                chat_id=challenge.chat_id,
+                user_id=challenge.user_id,
+                only_if_banned=True,
+            )
+        except TelegramAPIError as exception:
+            logger.error("[captcha] User was not kicked: %s", exception)
+
+    async def solve(self, chat_id: int, user_id: int, answer: str) -> bool | None:
+        challenge = self._store.pop(chat_id=chat_id, user_id=user_id)
+        if challenge is None:
+            return None
+
+        if challenge.answer == answer:
+            if self._stats is not None:
+                self._stats.increment(chat_id=chat_id, kind=ChatStatKindEnum.CAPTCHA_PASSED)
+            await self._close(challenge=challenge)
+            return True
+
+        await self._fail(challenge=challenge)
+        return False
+
+    async def _expiring(self):
+        while True:
+            now = time.time()
+            for challenge in self._store.expire(now=now):
+                logger.info(
+                    "[captcha] [%d] Challenge expired: %d",
+                    challenge.chat_id, challenge.user_id,
+                )
+                await self._fail(challenge=challenge)
+
+            next_expiration = self._store.next_expiration()
+            delay = 1.0 if next_expiration is None else next_expiration - time.time()
+            await asyncio.sleep(min(max(delay, 0), 1.0))
@@ -1,21 +1,57 @@
 import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, List, Optional
+
 import typer
 
-from dresscode_bot.services import database
-from .service import Service, get_service
+from .enums import ChatPermissionEnum
+
+if TYPE_CHECKING:
+    from dresscode_bot.services import database
+    from .cluster import Cluster
+    from .hosting import Hosting
+    from .service import Service
+
+MINUTES_IN_DAY = 24 * 60
 
 
 def service_callback(ctx: typer.Context):
+    from dresscode_bot.services import database, monitoring
+    from .cluster import Cluster
+    from .enums import BotMethodEnum
+    from .service import get_polling_bot, get_service
+
     settings = ctx.obj["settings"]
     database_service = database.get_service(settings=settings.database)
-    telegram_service = get_service(database_service=database_service, settings=settings.telegram)
+    monitoring_service = None
+    if settings.monitoring is not None:
+        monitoring_service = monitoring.get_service(settings=settings.monitoring)
+    if settings.telegram.method == BotMethodEnum.CLUSTER:
+        # Main process only polls, handlers run in worker processes with their own services
+        bot, update_filter = get_polling_bot(settings=settings.telegram)
+        telegram_service = Cluster(
+            database_service=database_service,
+            bot=bot,
+            update_filter=update_filter,
+            settings=settings,
+            workers=settings.telegram.cluster.workers,
+            queue_size=settings.telegram.cluster.queue_size,
+            lease_ttl=settings.telegram.cluster.lease_ttl,
+            polling_timeout=settings.telegram.polling.timeout,
+            shutdown_timeout=settings.telegram.shutdown_timeout,
+            monitoring_service=monitoring_service,
+        )
+    else:
+        telegram_service = get_service(
+            database_service=database_service,
+            settings=settings.telegram,
+            monitoring_service=monitoring_service,
+        )
 
     ctx.obj["database"] = database_service
     ctx.obj["telegram"] = telegram_service
 
-
 def run(ctx: typer.Context):
-    telegram_service: Service = ctx.obj["telegram"]
+    telegram_service: "Service | Hosting | Cluster" = ctx.obj["telegram"]
 
     asyncio.run(telegram_service.run())
 
@@ -27,3 +63,178 @@ def get_cli() -> typer.Typer:
     cli.command(name="run")(run)
 
     return cli
+
+
+def parse_window(value: str) -> tuple[int, int]:
+    try:
+        start, end = (
+            int(hours) * 60 + int(minutes)
+            for hours, minutes in (part.split(":") for part in value.split("-"))
+        )
+    except ValueError:
+        start = end = -1
+    if not (0 <= start < MINUTES_IN_DAY and 0 <= end < MINUTES_IN_DAY):
+        raise typer.BadParameter(f"window must look like 09:00-18:00, got '{value}'")
+    return start, end
+
+
+def format_window(window: list[int]) -> str:
+    return "-".join(f"{minute // 60:02d}:{minute % 60:02d}" for minute in window)
+
+
+def chats_callback(ctx: typer.Context):
+    from dresscode_bot.services import database
+
+    settings = ctx.obj["settings"]
+    ctx.obj["database"] = database.get_service(settings=settings.database)
+
+
+def _run(
+        ctx: typer.Context,
+        chat_id: int,
+        command: Callable[["database.Service"], Coroutine[Any, Any, Any]],
+):
+    database_service: "database.Service" = ctx.obj["database"]
+
+    async def run():
+        try:
+            if await database_service.get_chat_record(id=chat_id) is None:
+                typer.echo(f"Chat {chat_id} is not managed by bot")
+                raise typer.Exit(code=1)
+            await command(database_service)
+        finally:
+            await database_service.stop()
+
+    asyncio.run(run())
+
+
+def show_policy(
+        ctx: typer.Context,
+        chat_id: int = typer.Option(..., "--chat", help="Chat id, negative for groups"),
+):
+    async def command(database_service: "database.Service"):
+        chat_policy = await database_service.get_chat_policy(chat_id=chat_id)
+        if chat_policy is None:
+            typer.echo("Default policy: every permission is revoked, always active")
+            return
+        typer.echo(f"permissions: {', '.join(chat_policy.permissions) or '-'}")
+        typer.echo(f"whitelist: {', '.join(map(str, chat_policy.whitelist)) or '-'}")
+        typer.echo(f"windows: {', '.join(map(format_window, chat_policy.windows)) or 'always'}")
+        duration = chat_policy.duration
+        typer.echo(f"duration: {'permanent' if duration is None else f'{duration} seconds'}")
+
+    _run(ctx, chat_id=chat_id, command=command)
+
+
+def set_policy(
+        ctx: typer.Context,
+        chat_id: int = typer.Option(..., "--chat", help="Chat id, negative for groups"),
+        permissions: Optional[List[ChatPermissionEnum]] = typer.Option(
+            None,
+            "-p", "--permission",
+            help="Permission kept by joined members, others are revoked",
+        ),
+        whitelist: Optional[List[int]] = typer.Option(
+            None,
+            "-w", "--whitelist",
+            help="User id that is never restricted",
+        ),
+        windows: Optional[List[str]] = typer.Option(
+            None,
+            "--window",
+            help="Daily UTC window of policy, e.g. 22:00-08:00, policy is always active without it",
+        ),
+        duration: Optional[int] = typer.Option(
+            None,
+            "-d", "--duration",
+            min=1,
+            help="Restriction lifetime in seconds, restriction is permanent without it",
+        ),
+):
+    parsed_windows = [parse_window(window) for window in windows or ()]
+
+    async def command(database_service: "database.Service"):
+        from .policy import PolicyCache
+
+        policies = PolicyCache(database_service=database_service)
+        await policies.set(
+            chat_id=chat_id,
+            permissions=set(permissions or ()),
+            whitelist=set(whitelist or ()),
+            windows=parsed_windows,
+            duration=duration,
+        )
+        typer.echo(f"Policy of chat {chat_id} is set")
+
+    _run(ctx, chat_id=chat_id, command=command)
+
+
+def list_rules(
+        ctx: typer.Context,
+        chat_id: int = typer.Option(..., "--chat", help="Chat id, negative for groups"),
+):
+    async def command(database_service: "database.Service"):
+        for rule in await database_service.get_chat_filter_rules(chat_id=chat_id):
+            typer.echo(f"{rule.id}\t{rule.kind.value}\t{rule.pattern}")
+
+    _run(ctx, chat_id=chat_id, command=command)
+
+
+def add_rule(
+        ctx: typer.Context,
+        chat_id: int = typer.Option(..., "--chat", help="Chat id, negative for groups"),
+        kind: str = typer.Argument(..., help="Rule kind: word, domain or regex"),
+        pattern: str = typer.Argument(..., help="Banned word, link domain or regular expression"),
+):
+    async def command(database_service: "database.Service"):
+        import re
+
+        from dresscode_bot.services.database.models import FilterRuleKindEnum
+        from .functions.filter import FilterCache
+
+        try:
+            rule_kind = FilterRuleKindEnum(kind)
+        except ValueError:
+            raise typer.BadParameter(f"kind must be one of word, domain, regex, got '{kind}'")
+        filters = FilterCache(database_service=database_service)
+        try:
+            rule = await filters.add_rule(chat_id=chat_id, kind=rule_kind, pattern=pattern)
+        except re.error as exception:
+            raise typer.BadParameter(f"incorrect regular expression: {exception}")
+        typer.echo(f"Rule {rule.id} is added")
+
+    _run(ctx, chat_id=chat_id, command=command)
+
+
+def remove_rule(
+        ctx: typer.Context,
+        chat_id: int = typer.Option(..., "--chat", help="Chat id, negative for groups"),
+        rule_id: int = typer.Argument(..., help="Rule id from list command"),
+):
+    async def command(database_service: "database.Service"):
+        from .functions.filter import FilterCache
+
+        filters = FilterCache(database_service=database_service)
+        await filters.remove_rule(chat_id=chat_id, rule_id=rule_id)
+        typer.echo(f"Rule {rule_id} is removed")
+
+    _run(ctx, chat_id=chat_id, command=command)
+
+
+def get_chats_cli() -> typer.Typer:
+    # Running bots get changes through PostgreSQL invalidation channel, other databases need restart
+    cli = typer.Typer(name="Chats")
+    cli.callback()(chats_callback)
+
+    policy_cli = typer.Typer(name="Policy")
+    policy_cli.command(name="show")(show_policy)
+    policy_cli.command(name="set")(set_policy)
+    cli.add_typer(policy_cli, name="policy")
+
+    filter_cli = typer.Typer(name="Filter")
+    filter_cli.command(name="list")(list_rules)
+    filter_cli.command(name="add")(add_rule)
+    filter_cli.command(name="remove")(remove_rule)
+    cli.add_typer(filter_cli, name="filter")
+
+    return cli
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+import multiprocessing.queues
+import os
+import queue
+import signal
+import socket
+import uuid
+from typing import TYPE_CHECKING, Any
+
+from aiogram import Bot
+import aiohttp
+from facet import ServiceMixin
+
+from dresscode_bot.services import database, monitoring
+from .prefilter import UpdatePreFilter
+
+if TYPE_CHECKING:
+    from dresscode_bot.settings import Settings as RootSettings
+
+
+logger = logging.getLogger(__name__)
+
+
+def shard_key(update: dict[str, Any]) -> int:
+    # Updates of one chat go to one worker, so they are processed in order and chat state (captcha
+    # challenges, scheduled actions) lives in one process
+    for update_type, event in update.items():
+        if update_type == "update_id" or not isinstance(event, dict):
+            continue
+        message = event.get("message") if "chat" not in event else event
+        if isinstance(message, dict) and isinstance(message.get("chat"), dict):
+            return message["chat"]["id"]
+        if isinstance(event.get("from"), dict):
+            return event["from"]["id"]
+    return update["update_id"]
+
+
+def run_worker(
+        settings: "RootSettings",
+        index: int,
+        count: int,
+        updates: multiprocessing.queues.Queue,
+):
+    from dresscode_bot.__main__ import setup_logging
+    from dresscode_bot.services import telegram
+
+    # Worker can be stopped while it is still starting
+    try:
+        setup_logging()
+        database_service = database.get_service(settings=settings.database)
+        telegram_service = telegram.get_service(
+            database_service=database_service,
+            settings=settings.telegram,
+            shard=(index, count),
+            updates_queue=updates,
+        )
+        asyncio.run(telegram_service.run())
+    except KeyboardInterrupt:
+        pass
+
+
+class Cluster(ServiceMixin):
+    # Every node tries to take polling lease, the leader polls Telegram and shares updates between
+    # local worker processes, other nodes wait for lease to expire
+    def __init__(
+            self,
+            database_service: database.Service,
+            bot: Bot,
+            update_filter: UpdatePreFilter,
+            settings: "RootSettings",
+            workers: int = 2,
+            queue_size: int = 10000,
+            lease_ttl: float = 15.0,
+            polling_timeout: int = 10,
+            shutdown_timeout: float = 5.0,
+            monitoring_service: monitoring.Service | None = None,
+    ):
+        self._database_service = database_service
+        self._bot = bot
+        self._update_filter = update_filter
+        self._settings = settings
+        self._workers = workers
+        self._queue_size = queue_size
+        self._lease_ttl = lease_ttl
+        self._polling_timeout = polling_timeout
+        self._shutdown_timeout = shutdown_timeout
+        self._monitoring_service = monitoring_service
+        self._lease_name = f"polling:{bot.id}"
+        self._holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._context = multiprocessing.get_context("spawn")
+        self._queues: list[multiprocessing.queues.Queue] = []
+        self._processes: list[multiprocessing.Process | None] = []
+        self._offset: int | None = None
+        self._leading_task: asyncio.Task | None = None
+
+    @property
+    def dependencies(self) -> list[ServiceMixin]:
+        dependencies = [
+            self._database_service,
+        ]
+        if self._monitoring_service is not None:
+            dependencies.append(self._monitoring_service)
+        return dependencies
+
+    @property
+    def graceful_shutdown_timeout(self) -> int:
+        # Workers drain their updates in parallel
+        return int(self._shutdown_timeout) + 20
+
+    async def start(self):
+        logger.info("[cluster] Start service: %s", self._holder)
+
+        self._leading_task = self.add_task(self._leading())
+
+    async def stop(self):
+        if self._leading_task is not None:
+            self._leading_task.cancel()
+            await asyncio.gather(self._leading_task, return_exceptions=True)
+            self._leading_task = None
+        await self._stop_workers()
+        try:
+            await self._database_service.release_lease(name=self._lease_name, holder=self._holder)
+        except Exception:
+            logger.exception("[cluster] Lease was not released")
+        await self._bot.session.close()
+
+    async def _leading(self):
+        while True:
+            try:
+                acquired = await self._database_service.acquire_lease(
+                    name=self._lease_name,
+                    holder=self._holder,
+                    ttl=self._lease_ttl,
+                )
+            except Exception:
+                logger.exception("[cluster] Lease was not acquired")
+                acquired = False
+            if not acquired:
+                await asyncio.sleep(self._lease_ttl / 3)
+                continue
+
+            logger.info("[cluster] Polling leadership acquired")
+            self._start_workers()
+            polling = asyncio.create_task(self._polling())
+            renewing = asyncio.create_task(self._renewing())
+            try:
+                await asyncio.wait([polling, renewing], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in (polling, renewing):
+                    task.cancel()
+                await asyncio.gather(polling, renewing, return_exceptions=True)
+            if not polling.cancelled() and polling.exception() is not None:
+                logger.error("[cluster] Polling failed", exc_info=polling.exception())
+            logger.warning("[cluster] Polling leadership lost")
+            await self._stop_workers()
+
+    async def _renewing(self):
+        while True:
+            await asyncio.sleep(self._lease_ttl / 3)
+            try:
+                acquired = await self._database_service.acquire_lease(
+                    name=self._lease_name,
+                    holder=self._holder,
+                    ttl=self._lease_ttl,
+                )
+            except Exception:
+                logger.exception("[cluster] Lease was not prolonged")
+                acquired = False
+            if not acquired:
+                return
+
+    def _start_worker(self, index: int):
+        process = self._context.Process(
+            target=run_worker,
+            args=(self._settings, index, self._workers, self._queues[index]),
+            name=f"dresscode-worker-{index}",
+            daemon=False,
+        )
+        process.start()
+        self._processes[index] = process
+        logger.info("[cluster] Worker %d started: %d", index, process.pid)
+
+    def _start_workers(self):
+        self._queues = [self._context.Queue(maxsize=self._queue_size) for _ in range(self._workers)]
+        self._processes = [None] * self._workers
+        for index in range(self._workers):
+            self._start_worker(index=index)
+
+    def _check_workers(self):
+        for index, process in enumerate(self._processes):
+            if process is not None and not process.is_alive():
+                logger.error("[cluster] Worker %d exited with code %s", index, process.exitcode)
+                self._start_worker(index=index)
+
+    async def _stop_workers(self):
+        processes = [process for process in self._processes if process is not None]
+        self._processes = []
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGINT)
+
+        loop = asyncio.get_running_loop()
+        timeout = self._shutdown_timeout + 15
+        for process in processes:
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                logger.error("[cluster] Worker was not stopped in time: %d", process.pid)
+                process.kill()
+        for updates in self._queues:
+            updates.cancel_join_thread()
+        self._queues = []
+
+    async def _get_updates(self) -> dict[str, Any]:
+        # Raw updates are sent to workers, so leader does not spend time on model validation
+        session = await self._bot.session.create_session()
+        url = self._bot.session.api.api_url(token=self._bot.token, method="getUpdates")
+        data = {"timeout": self._polling_timeout}
+        if self._offset is not None:
+            data["offset"] = self._offset
+        if self._update_filter.allowed_updates is not None:
+            data["allowed_updates"] = json.dumps(self._update_filter.allowed_updates)
+
+        async with session.post(url, data=data, timeout=self._polling_timeout + 10) as response:
+            return await response.json(loads=self._bot.session.json_loads, content_type=None)
+
+    async def _distribute(self, update: dict[str, Any]):
+        index = shard_key(update) % self._workers
+        while True:
+            try:
+                self._queues[index].put_nowait(update)
+                return
+            except queue.Full:
+                # Worker is overloaded, hold polling instead of blocking event loop
+                await asyncio.sleep(0.05)
+
+    async def _polling(self):
+        delay = 1.0
+        while True:
+            self._check_workers()
+            try:
+                result = await self._get_updates()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exception:
+                result = {"ok": False, "description": f"{type(exception).__name__}: {exception}"}
+            if not result.get("ok"):
+                retry_after = (result.get("parameters") or {}).get("retry_after")
+                logger.error("[cluster] Updates were not received: %s", result.get("description"))
+                await asyncio.sleep(retry_after or delay)
+                delay = min(delay * 2, 30.0)
+                continue
+
+            delay = 1.0
+            for update in result["result"]:
+                self._offset = update["update_id"] + 1
+                if self._update_filter(update):
+                    await self._distribute(update)
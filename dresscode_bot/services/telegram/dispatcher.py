@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+
+class TrackingDispatcher(Dispatcher):
+    # Polling, webhook and cluster consumer all feed updates here, so update is counted from its
+    # arrival, before outer middlewares like FSM context which loads state from database
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._last_update_id: int | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def last_update_id(self) -> int | None:
+        return self._last_update_id
+
+    async def wait_idle(self):
+        await self._idle.wait()
+
+    async def feed_update(self, bot: Bot, update: Update, **kwargs: Any) -> Any:
+        self._in_flight += 1
+        self._idle.clear()
+        try:
+            return await super().feed_update(bot, update, **kwargs)
+        finally:
+            self._in_flight -= 1
+            if self._last_update_id is None or update.update_id > self._last_update_id:
+                self._last_update_id = update.update_id
+            if self._in_flight == 0:
+                self._idle.set()
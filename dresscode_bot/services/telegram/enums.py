@@ -20,3 +20,20 @@ class ChatPermissionEnum(str, Enum):
 class BotMethodEnum(str, Enum):
     POLLING = "polling"
     WEBHOOK = "webhook"
+    CLUSTER = "cluster"
+
+
+class CaptchaModeEnum(str, Enum):
+    BUTTON = "button"
+    IMAGE = "image"
+
+
+class JsonLibraryEnum(str, Enum):
+    JSON = "json"
+    ORJSON = "orjson"
+
+
+class LaneEnum(str, Enum):
+    MODERATION = "moderation"
+    DIALOG = "dialog"
+    OTHER = "other"
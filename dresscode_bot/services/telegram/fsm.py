@@ -5,47 +5,47 @@ from aiogram.fsm.state import State
 from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StateType, StorageKey
 
 from dresscode_bot.services import database
-from dresscode_bot.services.database.models import User
 
 
 class DatabaseStorage(BaseStorage):
     def __init__(self, database_service: database.Service):
         self._database_service = database_service
 
-    async def get_user_by_key(self, key: StorageKey) -> User | None:
-        return await self._database_service.get_user(id=key.user_id)
+    @staticmethod
+    def is_dialog(key: StorageKey) -> bool:
+        # Dialog runs in private chat only, updates of groups do not need to read it
+        return key.chat_id == key.user_id
 
     async def set_state(self, key: StorageKey, state: StateType | None = None):
-        user = await self.get_user_by_key(key=key)
-        if user is None:
+        if not self.is_dialog(key=key):
             return
 
         if isinstance(state, State):
             state = state.state
-        await self._database_service.set_dialog_state(user=user, state=state)
+        await self._database_service.set_dialog_state(user_id=key.user_id, state=state)
 
     async def get_state(self, key: StorageKey) -> str | None:
-        user = await self.get_user_by_key(key=key)
-        if user is None:
+        if not self.is_dialog(key=key):
             return
 
-        return await self._database_service.get_dialog_state(user=user)
+        dialog = await self._database_service.get_dialog(user_id=key.user_id)
+        return dialog.state if dialog is not None else None
 
     async def set_data(self, key: StorageKey, data: dict[str, Any]):
-        user = await self.get_user_by_key(key=key)
-        if user is None:
+        if not self.is_dialog(key=key):
             return
 
-        await self._database_service.set_dialog_data(user=user, data=data)
+        await self._database_service.set_dialog_data(user_id=key.user_id, data=data)
 
     async def get_data(self, key: StorageKey) -> dict[str, Any]:
-        user = await self.get_user_by_key(key=key)
-        if user is None:
+        if not self.is_dialog(key=key):
             return {}
 
-        return await self._database_service.get_dialog_data(user=user)
+        dialog = await self._database_service.get_dialog(user_id=key.user_id)
+        return dict(dialog.data or {}) if dialog is not None else {}
 
     async def close(self):
+        # Engine is owned by database service, it is disposed when that service stops
         pass
 
 
@@ -1,4 +1,7 @@
+from typing import Any
+
+
 class BaseFunction:
     @classmethod
-    async def handle(cls):
+    async def handle(cls, event: Any, service) -> Any:
         pass
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import re
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Sequence
+from urllib.parse import urlsplit
+
+from aiogram.enums import MessageEntityType
+from aiogram.types import Message
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.bus import EntityEnum
+from dresscode_bot.services.database.models import ChatFilterRule, FilterRuleKindEnum
+from .base import BaseFunction
+
+
+logger = logging.getLogger(__name__)
+
+
+# Aho-Corasick automaton, search cost is linear in text length for any number of patterns
+class Automaton:
+    __slots__ = ("_goto", "_fail", "_output")
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._output: list[tuple[int, ...]] = [()]
+        for pattern in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = self._goto[node][char] = len(self._goto)
+                    self._goto.append({})
+                    self._output.append(())
+                node = next_node
+            self._output[node] += (len(pattern),)
+
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_node] = fail if fail != next_node else 0
+                self._output[next_node] += self._output[self._fail[next_node]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def search(self, text: str) -> Iterator[tuple[int, int]]:
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for length in output[node]:
+                yield index - length + 1, index + 1
+
+
+def is_word_boundary(text: str, index: int) -> bool:
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledFilter:
+    words: Automaton | None = None
+    domains: frozenset[str] = frozenset()
+    # Rules are not joined into one alternation: inline global flags would break it and numbered
+    # backreferences would point to groups of other rules
+    regexes: tuple[re.Pattern, ...] = ()
+
+    def __bool__(self) -> bool:
+        return self.words is not None or bool(self.domains) or bool(self.regexes)
+
+    def match_text(self, text: str) -> bool:
+        if self.words is not None:
+            folded = text.casefold()
+            for start, end in self.words.search(folded):
+                if is_word_boundary(folded, start - 1) and is_word_boundary(folded, end):
+                    return True
+        return any(regex.search(text) is not None for regex in self.regexes)
+
+    def match_host(self, host: str) -> bool:
+        labels = host.casefold().rstrip(".").split(".")
+        return any(".".join(labels[index:]) in self.domains for index in range(len(labels)))
+
+
+def compile_filter(rules: Sequence[ChatFilterRule]) -> CompiledFilter:
+    words, domains, regexes = [], set(), []
+    for rule in rules:
+        if rule.kind == FilterRuleKindEnum.WORD:
+            words.append(rule.pattern.casefold())
+        elif rule.kind == FilterRuleKindEnum.DOMAIN:
+            domains.add(rule.pattern.casefold().strip(".").removeprefix("www."))
+        elif rule.kind == FilterRuleKindEnum.REGEX:
+            try:
+                regexes.append(re.compile(rule.pattern, re.IGNORECASE))
+            except re.error:
+                logger.error("Incorrect regex in rule %d: %s", rule.id, rule.pattern)
+
+    return CompiledFilter(
+        words=Automaton(words) if words else None,
+        domains=frozenset(domains),
+        regexes=tuple(regexes),
+    )
+
+
+EMPTY_FILTER = CompiledFilter()
+
+
+class FilterCache:
+    def __init__(self, database_service: database.Service):
+        self._database_service = database_service
+        self._filters: dict[int, CompiledFilter] = {}
+        self._rebuilds: dict[int, asyncio.Task] = {}
+        self._changes: Counter[int] = Counter()
+        self._resets = 0
+        self._database_service.bus.subscribe(
+            EntityEnum.CHAT_FILTER,
+            self.invalidate,
+            reset=self.reset,
+        )
+
+    async def _build(self, chat_id: int) -> CompiledFilter:
+        rules = await self._database_service.get_chat_filter_rules(chat_id=chat_id)
+        if not rules:
+            return EMPTY_FILTER
+        # Building automaton for thousands of rules is CPU work, keep it out of event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, compile_filter, rules)
+
+    async def get(self, chat_id: int) -> CompiledFilter:
+        compiled_filter = self._filters.get(chat_id)
+        if compiled_filter is None:
+            changes = (self._resets, self._changes[chat_id])
+            compiled_filter = await self._build(chat_id=chat_id)
+            # Invalidation arrived during build, rules can be older than it, so they are not cached
+            if (self._resets, self._changes[chat_id]) == changes:
+                self._filters[chat_id] = compiled_filter
+        return compiled_filter
+
+    def peek(self, chat_id: int) -> CompiledFilter | None:
+        return self._filters.get(chat_id)
+
+    async def _rebuild(self, chat_id: int):
+        try:
+            self._filters[chat_id] = await self._build(chat_id=chat_id)
+        except Exception:
+            logger.exception("Filter rebuild failed: %d", chat_id)
+            self._filters.pop(chat_id, None)
+        finally:
+            # Cancelled rebuild must not drop the newer one from tracking
+            if self._rebuilds.get(chat_id) is asyncio.current_task():
+                del self._rebuilds[chat_id]
+
+    def invalidate(self, chat_id: int):
+        self._changes[chat_id] += 1
+        if chat_id not in self._filters:
+            return
+        # Old filter keeps serving messages until new one is ready
+        task = self._rebuilds.pop(chat_id, None)
+        if task is not None:
+            task.cancel()
+        self._rebuilds[chat_id] = asyncio.create_task(self._rebuild(chat_id=chat_id))
+
+    def reset(self):
+        for task in self._rebuilds.values():
+            task.cancel()
+        self._rebuilds.clear()
+        self._filters.clear()
+        self._resets += 1
+
+    async def add_rule(self, chat_id: int, kind: FilterRuleKindEnum, pattern: str) -> ChatFilterRule:
+        if kind == FilterRuleKindEnum.REGEX:
+            re.compile(pattern)
+        rule = await self._database_service.add_chat_filter_rule(
+            chat_id=chat_id,
+            kind=kind,
+            pattern=pattern,
+        )
+        return rule
+
+    async def remove_rule(self, chat_id: int, rule_id: int):
+        await self._database_service.remove_chat_filter_rule(chat_id=chat_id, rule_id=rule_id)
+
+
+def extract_hosts(message: Message) -> Iterator[str]:
+    text = message.text or message.caption or ""
+    for entity in message.entities or message.caption_entities or ():
+        if entity.type == MessageEntityType.URL:
+            url = entity.extract_from(text)
+        elif entity.type == MessageEntityType.TEXT_LINK:
+            url = entity.url
+        else:
+            continue
+        if "://" not in url:
+            url = f"http://{url}"
+        host = urlsplit(url).hostname
+        if host:
+            yield host
+
+
+class MessageFilterFunction(BaseFunction):
+    @classmethod
+    async def handle(cls, event: Message, service) -> bool:
+        compiled_filter = await service.filters.get(chat_id=event.chat.id)
+        if not compiled_filter:
+            return False
+        if event.from_user is not None:
+            policy = await service.policies.get(chat_id=event.chat.id)
+            if event.from_user.id in policy.whitelist:
+                return False
+
+        text = event.text or event.caption
+        if text and compiled_filter.match_text(text):
+            return True
+        if compiled_filter.domains:
+            return any(compiled_filter.match_host(host) for host in extract_hosts(event))
+        return False
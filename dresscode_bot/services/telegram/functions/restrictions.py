@@ -1,5 +1,93 @@
+from typing import Any
+
+from aiogram.types import ChatMemberUpdated
+
+from dresscode_bot.services.database.models import (
+    AuditEventKindEnum,
+    ScheduledAction,
+    ScheduledActionKindEnum,
+)
+from ..enums import ChatPermissionEnum
+from ..policy import build_permissions
 from .base import BaseFunction
 
 
+# Telegram lifts restrictions when all permissions are passed as True
+UNRESTRICTED_PERMISSIONS = build_permissions(grants=set(ChatPermissionEnum))
+
+
 class MemberRestrictionFunction(BaseFunction):
-    pass
+    @classmethod
+    async def restrict(
+            cls,
+            service,
+            chat_id: int,
+            user_id: int,
+            audit_data: dict[str, Any] | None = None,
+    ) -> bool | None:
+        policy = await service.policies.get(chat_id=chat_id)
+        permissions = policy.decide(user_id=user_id)
+        if permissions is None:
+            return None
+
+        result = await service.bot.restrict_chat_member(
+            chat_id=chat_id,
+            user_id=user_id,
+            permissions=permissions,
+        )
+        if not result:
+            return result
+
+        service.database.record_audit_event(
+            kind=AuditEventKindEnum.RESTRICT_CHAT_MEMBER,
+            chat_id=chat_id,
+            user_id=user_id,
+            data={
+                "permissions": permissions.model_dump(exclude_none=True),
+                "duration": policy.duration,
+                **(audit_data or {}),
+            },
+        )
+        # New restriction replaces the previous one, its pending lifting must not apply
+        await service.scheduler.cancel(
+            kind=ScheduledActionKindEnum.UNRESTRICT,
+            chat_id=chat_id,
+            user_id=user_id,
+        )
+        if policy.duration is not None:
+            await service.scheduler.schedule(
+                kind=ScheduledActionKindEnum.UNRESTRICT,
+                chat_id=chat_id,
+                user_id=user_id,
+                delay=policy.duration,
+                bot_id=service.bot.id,
+            )
+        return result
+
+    @classmethod
+    async def unrestrict(cls, service, chat_id: int, user_id: int) -> bool:
+        result = await service.bot.restrict_chat_member(
+            chat_id=chat_id,
+            user_id=user_id,
+            permissions=UNRESTRICTED_PERMISSIONS,
+        )
+        if result:
+            service.database.record_audit_event(
+                kind=AuditEventKindEnum.RESTRICT_CHAT_MEMBER,
+                chat_id=chat_id,
+                user_id=user_id,
+                data={"permissions": UNRESTRICTED_PERMISSIONS.model_dump(exclude_none=True)},
+            )
+        return result
+
+    @classmethod
+    async def handle_scheduled(cls, action: ScheduledAction, service) -> bool:
+        return await cls.unrestrict(service=service, chat_id=action.chat_id, user_id=action.user_id)
+
+    @classmethod
+    async def handle(cls, event: ChatMemberUpdated, service) -> bool | None:
+        return await cls.restrict(
+            service=service,
+            chat_id=event.chat.id,
+            user_id=event.new_chat_member.user.id,
+        )
@@ -0,0 +1,53 @@
+import logging
+
+from aiogram.types import CallbackQuery
+
+from ..captcha import CaptchaCallbackData
+from ..functions.restrictions import MemberRestrictionFunction
+from ..i18n import get_user_catalog
+
+
+logger = logging.getLogger(__name__)
+
+
+async def captcha_callback_handler(
+        callback: CallbackQuery,
+        callback_data: CaptchaCallbackData,
+        service,
+):
+    if callback.message is None:
+        logger.error("Field 'message' is None")
+        return
+    i18n = await get_user_catalog(database_service=service.database, user=callback.from_user)
+    if service.captcha is None:
+        # Buttons of messages sent before captcha was disabled
+        await callback.answer(text=i18n("captcha_finished"))
+        return
+    if callback.from_user.id != callback_data.user_id:
+        await callback.answer(text=i18n("captcha_not_yours"), show_alert=True)
+        return
+
+    parameters = [
+        callback.message.chat.full_name,
+        callback.message.chat.id,
+        callback.from_user.full_name,
+        callback.from_user.id,
+    ]
+    result = await service.captcha.solve(
+        chat_id=callback.message.chat.id,
+        user_id=callback.from_user.id,
+        answer=callback_data.answer,
+    )
+    if result is None:
+        await callback.answer(text=i18n("captcha_finished"))
+    elif result:
+        await MemberRestrictionFunction.unrestrict(
+            service=service,
+            chat_id=callback.message.chat.id,
+            user_id=callback.from_user.id,
+        )
+        logger.info("[%s (%d)] Captcha passed: [%s (%d)]", *parameters)
+        await callback.answer(text=i18n("captcha_passed"))
+    else:
+        logger.info("[%s (%d)] Captcha failed: [%s (%d)]", *parameters)
+        await callback.answer(text=i18n("captcha_wrong"), show_alert=True)
@@ -1 +1 @@
-from .handlers import router
+from .handlers import get_router
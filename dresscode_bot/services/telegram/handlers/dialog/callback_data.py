@@ -9,6 +9,10 @@ class GroupsCallbackData(PaginationCallbackData, prefix="groups"):
     pass
 
 
+class GroupSearchCallbackData(CallbackData, prefix="group_search"):
+    pass
+
+
 class GroupCallbackData(CallbackData, prefix="group"):
     group_id: int
 
@@ -1,7 +1,9 @@
 import logging
+from datetime import date, datetime, timedelta
 
 from aiogram import F, Router
 from aiogram.enums import ChatType
+from aiogram.exceptions import TelegramAPIError
 from aiogram.filters import Command, CommandStart
 from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
@@ -9,12 +11,17 @@ from aiogram.types import (
     CallbackQuery,
     InlineKeyboardButton,
     InlineKeyboardMarkup,
-    KeyboardButton,
     Message,
-    ReplyKeyboardMarkup,
 )
 
-from dresscode_bot.services.database.models import Chat, RoleEnum, User
+from dresscode_bot.services.database.models import (
+    ChatStatDaily,
+    ChatStatKindEnum,
+    RoleEnum,
+    User,
+)
+from dresscode_bot.services.database.records import ChatRecord, UserRecord
+from ...i18n import Catalog, LanguageCallbackData, get_catalog, get_texts
 from .callback_data import (
     GroupCallbackData,
     GroupChangeOwnerCallbackData,
@@ -23,6 +30,7 @@ from .callback_data import (
     GroupManagerCallbackData,
     GroupManagerRemoveCallbackData,
     GroupManagersCallbackData,
+    GroupSearchCallbackData,
     GroupsCallbackData,
 )
 from .middlewares import user_middleware
@@ -30,133 +38,208 @@ from .state import DialogState
 from .utils import generate_full_name, inline_keyboard_pagination
 
 
-router = Router()
-router.message.filter(F.chat.type == ChatType.PRIVATE)
-router.message.middleware(user_middleware)
-router.callback_query.middleware(user_middleware)
-
-
-async def generate_menu_keyboard() -> ReplyKeyboardMarkup:
-    keyboard = [
-        [KeyboardButton(text="Мои группы")],
-    ]
-    return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
+logger = logging.getLogger(__name__)
 
 
-@router.message(CommandStart())
-@router.message(Command("menu"))
-async def menu(message: Message, state: FSMContext, service, user: User, logger: logging.Logger):
-    keyboard = await generate_menu_keyboard()
-    await message.reply(text="Меню", reply_markup=keyboard)
+async def menu(
+        message: Message,
+        state: FSMContext,
+        service,
+        user: UserRecord,
+        i18n: Catalog,
+        logger: logging.Logger,
+):
+    await message.reply(text=i18n("menu"), reply_markup=i18n.menu_keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
+SEARCH_LIMIT = 10
+
+
+async def generate_group_buttons(
+        service,
+        groups: list[tuple[int, str | None]],
+) -> list[InlineKeyboardButton]:
+    buttons = []
+    for group_id, title in groups:
+        if title is None:
+            # Chats added before titles were stored get them on first show
+            try:
+                title = (await service.bot.get_chat(group_id)).full_name
+            except TelegramAPIError as exception:
+                # Bot was removed from chat, one such chat must not break the whole list
+                logger.warning("Chat title was not loaded: %d, %s", group_id, exception)
+                title = str(group_id)
+            else:
+                await service.database.set_chat_title(chat_id=group_id, title=title)
+        buttons.append(InlineKeyboardButton(
+            text=title,
+            callback_data=GroupCallbackData(group_id=group_id).pack(),
+        ))
+    return buttons
+
+
 async def generate_groups_keyboard(
         service,
-        user: User,
+        user: UserRecord,
         page: int,
+        i18n: Catalog,
 ) -> InlineKeyboardMarkup | None:
     limit = 4
-    groups = user.ownership_chats + user.chats
-    page_count = len(groups) // limit + int(bool(len(groups) % limit))
-    groups = groups[(page - 1) * limit:page * limit]
+    groups, count = await service.database.get_managed_chats(
+        user_id=user.telegram_id,
+        offset=(page - 1) * limit,
+        limit=limit,
+    )
+    page_count = count // limit + int(bool(count % limit))
     if not groups:
         return
 
-    groups = [await service.bot.get_chat(group.telegram_id) for group in groups]
-    buttons = [
-        InlineKeyboardButton(
-            text=group.full_name,
-            callback_data=GroupCallbackData(group_id=group.id).pack(),
-        )
-        for group in groups
-    ]
-    return inline_keyboard_pagination(
-        elements=buttons,
+    keyboard = inline_keyboard_pagination(
+        elements=await generate_group_buttons(service=service, groups=groups),
         page=page,
         page_count=page_count,
         callback_type=GroupsCallbackData,
+        i18n=i18n,
     )
+    if page_count > 1:
+        keyboard.inline_keyboard.insert(0, [i18n.button("search", callback_data=GroupSearchCallbackData())])
+    return keyboard
 
 
-@router.message(F.text == "Мои группы")
 async def groups_message_handler(
         message: Message,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
-    keyboard = await generate_groups_keyboard(service=service, user=user, page=1)
+    keyboard = await generate_groups_keyboard(service=service, user=user, page=1, i18n=i18n)
     if keyboard is None:
-        await message.reply(text="У Вас нет групп")
+        await message.reply(text=i18n("no_groups"))
     else:
-        await message.reply(text="Мои группы", reply_markup=keyboard)
+        await message.reply(text=i18n("my_groups"), reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-@router.callback_query(GroupsCallbackData.filter())
 async def groups_callback_handler(
         callback: CallbackQuery,
         callback_data: GroupsCallbackData,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if callback.message is None:
         logger.error("Field 'message' is None")
         return
 
-    keyboard = await generate_groups_keyboard(service=service, user=user, page=callback_data.page)
+    keyboard = await generate_groups_keyboard(
+        service=service,
+        user=user,
+        page=callback_data.page,
+        i18n=i18n,
+    )
     if keyboard is None:
-        await callback.answer(text="У Вас нет групп", alert=True)
+        await callback.answer(text=i18n("no_groups"), alert=True)
     else:
-        await callback.message.edit_text(text="Группы")
+        await callback.message.edit_text(text=i18n("groups"))
         await callback.message.edit_reply_markup(reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-async def generate_group_keyboard(chat: Chat, user: User) -> InlineKeyboardMarkup:
+async def group_search(
+        callback: CallbackQuery,
+        callback_data: GroupSearchCallbackData,
+        state: FSMContext,
+        service,
+        user: UserRecord,
+        i18n: Catalog,
+        logger: logging.Logger,
+):
+    if callback.message is None:
+        logger.error("Field 'message' is None")
+        return
+
+    await callback.message.edit_text(text=i18n("send_group_search"))
+
+    await state.set_state(DialogState.search_group)
+    await state.set_data({})
+
+
+async def group_search_handler(
+        message: Message,
+        state: FSMContext,
+        service,
+        user: UserRecord,
+        i18n: Catalog,
+        logger: logging.Logger,
+):
+    if not message.text:
+        await message.reply(text=i18n("send_group_search"))
+        return
+
+    groups = await service.database.search_managed_chats(
+        user_id=user.telegram_id,
+        query=message.text,
+        limit=SEARCH_LIMIT,
+    )
+    if not groups:
+        # State is kept, so user can send another query right away
+        await message.reply(text=i18n("nothing_found"))
+        return
+
+    keyboard = [
+        [button]
+        for button in await generate_group_buttons(service=service, groups=groups)
+    ]
+    keyboard.append([i18n.button("back", callback_data=GroupsCallbackData(page=1))])
+    await message.reply(
+        text=i18n("search_results"),
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
+    )
+
+
+async def generate_group_keyboard(
+        chat: ChatRecord,
+        user: UserRecord,
+        i18n: Catalog,
+) -> InlineKeyboardMarkup:
     if chat.owner_id == user.telegram_id:
         keyboard = [
-            [InlineKeyboardButton(
-                text="Сменить владельца",
-                callback_data=GroupChangeOwnerCallbackData(group_id=chat.telegram_id).pack(),
+            [i18n.button(
+                "change_owner",
+                callback_data=GroupChangeOwnerCallbackData(group_id=chat.telegram_id),
             )],
-            [InlineKeyboardButton(
-                text="Менеджеры",
-                callback_data=GroupManagersCallbackData(group_id=chat.telegram_id).pack(),
+            [i18n.button(
+                "managers",
+                callback_data=GroupManagersCallbackData(group_id=chat.telegram_id),
             )],
         ]
     else:
         keyboard = []
     keyboard.extend([
-        [InlineKeyboardButton(
-            text="Функции",
-            callback_data=GroupFunctionsCallbackData(group_id=chat.telegram_id).pack(),
-        )],
-        [InlineKeyboardButton(
-            text="Назад",
-            callback_data=GroupsCallbackData(page=1).pack(),
-        )],
+        [i18n.button("stats", callback_data=GroupFunctionsCallbackData(group_id=chat.telegram_id))],
+        [i18n.button("back", callback_data=GroupsCallbackData(page=1))],
     ])
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-@router.callback_query(GroupCallbackData.filter())
 async def group(
         callback: CallbackQuery,
         callback_data: GroupCallbackData,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if callback.message is None:
@@ -171,21 +254,21 @@ async def group(
         logger.error("Have no access to chat: %d", chat.telegram_id)
         return
 
-    keyboard = await generate_group_keyboard(chat=chat, user=user)
-    await callback.message.edit_text(text="Группа")
+    keyboard = await generate_group_keyboard(chat=chat, user=user, i18n=i18n)
+    await callback.message.edit_text(text=i18n("group"))
     await callback.message.edit_reply_markup(reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-@router.callback_query(GroupChangeOwnerCallbackData.filter())
 async def change_group_owner(
         callback: CallbackQuery,
         callback_data: GroupChangeOwnerCallbackData,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if callback.message is None:
@@ -200,32 +283,22 @@ async def change_group_owner(
         logger.error("Have no access to chat: %d", chat.telegram_id)
         return
 
-    await callback.message.edit_text(
-        text=(
-            "Перешлите любое сообщение или отправьте контакт человека, которому хотите передать "
-            "права управления"
-        ),
-    )
+    await callback.message.edit_text(text=i18n("send_new_owner"))
 
     await state.set_state(DialogState.change_owner)
     await state.set_data({"chat_id": chat.telegram_id})
 
 
-@router.message(DialogState.change_owner)
 async def change_group_owner_handler(
         message: Message,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if not message.contact and not message.forward_from and not message.forward_sender_name:
-        await message.reply(
-            text=(
-                "Перешлите любое сообщение или отправьте контакт человека, которому хотите "
-                "передать права управления"
-            ),
-        )
+        await message.reply(text=i18n("send_new_owner"))
         return
 
     data = await state.get_data()
@@ -250,21 +323,28 @@ async def change_group_owner_handler(
             full_name=message.forward_from.full_name,
         )
     else:
-        await message.reply(
-            text="Этот пользователь закрыл свои данные, его нельзя сделать управляющим",
-        )
+        await message.reply(text=i18n("owner_hidden"))
         return
 
-    await service.database.set_chat_owner(chat=chat, owner=new_owner)
+    chat = await service.database.set_chat_owner(
+        chat=chat,
+        owner=new_owner,
+        actor_id=user.telegram_id,
+    )
 
-    keyboard = await generate_group_keyboard(chat=chat, user=user)
-    await message.answer(text="Меню группы", reply_markup=keyboard)
+    keyboard = await generate_group_keyboard(chat=chat, user=user, i18n=i18n)
+    await message.answer(text=i18n("group_menu"), reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-async def generate_group_managers_keyboard(service, chat: Chat, page: int) -> InlineKeyboardMarkup:
+async def generate_group_managers_keyboard(
+        service,
+        chat: ChatRecord,
+        page: int,
+        i18n: Catalog,
+) -> InlineKeyboardMarkup:
     limit = 4
     managers = await service.database.get_chat_managers(chat=chat)
     page_count = len(managers) // limit + int(bool(len(managers) % limit))
@@ -285,19 +365,20 @@ async def generate_group_managers_keyboard(service, chat: Chat, page: int) -> In
         page=page,
         page_count=page_count,
         callback_type=GroupManagersCallbackData,
+        i18n=i18n,
         callback_extra_args={"group_id": chat.telegram_id},
         back_callback=GroupCallbackData(group_id=chat.telegram_id),
         add_callback=GroupManagerAddCallbackData(group_id=chat.telegram_id),
     )
 
 
-@router.callback_query(GroupManagersCallbackData.filter())
 async def group_managers(
         callback: CallbackQuery,
         callback_data: GroupManagersCallbackData,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if callback.message is None:
@@ -313,21 +394,21 @@ async def group_managers(
         logger.error("Have no access to chat: %d", chat.telegram_id)
         return
 
-    keyboard = await generate_group_managers_keyboard(service=service, chat=chat, page=1)
-    await callback.message.edit_text(text="Менеджеры")
+    keyboard = await generate_group_managers_keyboard(service=service, chat=chat, page=1, i18n=i18n)
+    await callback.message.edit_text(text=i18n("managers"))
     await callback.message.edit_reply_markup(reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-@router.callback_query(GroupManagerAddCallbackData.filter())
 async def group_add_manager(
         callback: CallbackQuery,
         callback_data: GroupManagerAddCallbackData,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if callback.message is None:
@@ -343,32 +424,22 @@ async def group_add_manager(
         logger.error("Have no access to chat: %d", chat.telegram_id)
         return
 
-    await callback.message.edit_text(
-        text=(
-            "Перешлите любое сообщение или отправьте контакт человека, которого хотите сделать "
-            "менеджером"
-        ),
-    )
+    await callback.message.edit_text(text=i18n("send_new_manager"))
 
     await state.set_state(DialogState.add_manager)
     await state.set_data({"chat_id": chat.telegram_id})
 
 
-@router.message(DialogState.add_manager)
 async def group_add_manager_handler(
         message: Message,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if not message.contact and not message.forward_from and not message.forward_sender_name:
-        await message.reply(
-            text=(
-                "Перешлите любое сообщение или отправьте контакт человека, которого хотите сделать "
-                "менеджером"
-            ),
-        )
+        await message.reply(text=i18n("send_new_manager"))
         return
 
     data = await state.get_data()
@@ -394,45 +465,50 @@ async def group_add_manager_handler(
             full_name=message.forward_from.full_name,
         )
     else:
-        await message.reply(
-            text="Этот пользователь скрыл свои данные, его нельзя сделать менеджером",
-        )
+        await message.reply(text=i18n("manager_hidden"))
         return
 
-    await service.database.add_chat_user(chat=chat, user=new_manager, role=RoleEnum.MANAGER)
+    await service.database.add_chat_user(
+        chat=chat,
+        user=new_manager,
+        role=RoleEnum.MANAGER,
+        actor_id=user.telegram_id,
+    )
 
-    keyboard = await generate_group_managers_keyboard(service=service, chat=chat, page=1)
-    await message.reply(text=f"Менеджеры группы", reply_markup=keyboard)
+    keyboard = await generate_group_managers_keyboard(service=service, chat=chat, page=1, i18n=i18n)
+    await message.reply(text=i18n("group_managers"), reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-async def generate_group_manager_keyboard(chat: Chat, manager: User, back_callback: CallbackData):
+async def generate_group_manager_keyboard(
+        chat: ChatRecord,
+        manager: User,
+        back_callback: CallbackData,
+        i18n: Catalog,
+):
     keyboard = [
-        [InlineKeyboardButton(
-            text="Удалить",
+        [i18n.button(
+            "remove",
             callback_data=GroupManagerRemoveCallbackData(
                 group_id=chat.telegram_id,
                 manager_id=manager.telegram_id,
-            ).pack(),
-        )],
-        [InlineKeyboardButton(
-            text="Назад",
-            callback_data=back_callback.pack(),
+            ),
         )],
+        [i18n.button("back", callback_data=back_callback)],
     ]
 
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
-@router.callback_query(GroupManagerCallbackData.filter())
 async def group_manager(
         callback: CallbackQuery,
         callback_data: GroupManagerCallbackData,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if callback.message is None:
@@ -460,21 +536,22 @@ async def group_manager(
             group_id=chat.telegram_id,
             manager_id=manager.telegram_id,
         ),
+        i18n=i18n,
     )
-    await callback.message.edit_text(text=f"Менеджер {manager.full_name}")
+    await callback.message.edit_text(text=i18n("manager", name=manager.full_name))
     await callback.message.edit_reply_markup(reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-@router.callback_query(GroupManagerRemoveCallbackData.filter())
 async def group_manager_remove(
         callback: CallbackQuery,
         callback_data: GroupManagerRemoveCallbackData,
         state: FSMContext,
         service,
-        user: User,
+        user: UserRecord,
+        i18n: Catalog,
         logger: logging.Logger,
 ):
     if callback.message is None:
@@ -495,16 +572,167 @@ async def group_manager_remove(
         logger.error("Have no user: %d", callback_data.manager_id)
         return
 
-    await service.database.remove_chat_user(chat=chat, user=manager)
+    await service.database.remove_chat_user(chat=chat, user=manager, actor_id=user.telegram_id)
 
-    keyboard = await generate_group_managers_keyboard(service=service, chat=chat, page=1)
-    await callback.message.edit_text(text="Меню группы")
+    keyboard = await generate_group_managers_keyboard(service=service, chat=chat, page=1, i18n=i18n)
+    await callback.message.edit_text(text=i18n("group_menu"))
     await callback.message.edit_reply_markup(reply_markup=keyboard)
 
     await state.set_state(None)
     await state.set_data({})
 
 
-@router.callback_query(GroupFunctionsCallbackData.filter())
-async def group_functions(callback: CallbackQuery):
-    await callback.answer(text="Ещё не реализовано", alert=True)
+# Stats are shown by weeks, older pages are not kept in menu
+STATS_DAYS = 7
+STATS_PAGES = 52
+
+
+def generate_group_stats_text(
+        stats: list[ChatStatDaily],
+        since: date,
+        until: date,
+        i18n: Catalog,
+) -> str:
+    days: dict[date, dict[ChatStatKindEnum, int]] = {}
+    totals = dict.fromkeys(ChatStatKindEnum, 0)
+    for stat in stats:
+        days.setdefault(stat.day, {})[stat.kind] = stat.count
+        totals[stat.kind] += stat.count
+
+    lines = [i18n("stats_title", since=since, until=until), ""]
+    day = until
+    while day >= since:
+        counts = days.get(day, {})
+        lines.append(i18n(
+            "stats_day",
+            day=day,
+            joins=counts.get(ChatStatKindEnum.JOINS, 0),
+            restrictions=counts.get(ChatStatKindEnum.RESTRICTIONS, 0),
+            failures=counts.get(ChatStatKindEnum.RESTRICTION_FAILURES, 0),
+        ))
+        day -= timedelta(days=1)
+    lines.extend([
+        "",
+        i18n(
+            "stats_captcha",
+            passed=totals[ChatStatKindEnum.CAPTCHA_PASSED],
+            failed=totals[ChatStatKindEnum.CAPTCHA_FAILED],
+        ),
+        i18n("stats_deleted", count=totals[ChatStatKindEnum.MESSAGES_DELETED]),
+    ])
+    return "\n".join(lines)
+
+
+async def group_functions(
+        callback: CallbackQuery,
+        callback_data: GroupFunctionsCallbackData,
+        state: FSMContext,
+        service,
+        user: UserRecord,
+        i18n: Catalog,
+        logger: logging.Logger,
+):
+    if callback.message is None:
+        logger.error("Field 'message' is None")
+        return
+
+    chat = await service.get_chat(id=callback_data.group_id)
+    if chat is None:
+        logger.error("Have no chat: %d", callback_data.group_id)
+        return
+    if not await service.database.can_manage_chat(chat=chat, user=user):
+        logger.error("Have no access to chat: %d", chat.telegram_id)
+        return
+
+    # Rollups are kept in UTC days
+    until = datetime.utcnow().date() - timedelta(days=STATS_DAYS * (callback_data.page - 1))
+    since = until - timedelta(days=STATS_DAYS - 1)
+    stats = await service.database.get_chat_stats(
+        chat_id=chat.telegram_id,
+        since=since,
+        until=until,
+    )
+    keyboard = inline_keyboard_pagination(
+        elements=[],
+        page=callback_data.page,
+        page_count=STATS_PAGES,
+        callback_type=GroupFunctionsCallbackData,
+        i18n=i18n,
+        callback_extra_args={"group_id": chat.telegram_id},
+        back_callback=GroupCallbackData(group_id=chat.telegram_id),
+    )
+    await callback.message.edit_text(
+        text=generate_group_stats_text(stats=stats, since=since, until=until, i18n=i18n),
+    )
+    await callback.message.edit_reply_markup(reply_markup=keyboard)
+
+    await state.set_state(None)
+    await state.set_data({})
+
+
+async def language_message_handler(
+        message: Message,
+        state: FSMContext,
+        service,
+        user: UserRecord,
+        i18n: Catalog,
+        logger: logging.Logger,
+):
+    await message.reply(text=i18n("choose_language"), reply_markup=i18n.language_keyboard)
+
+    await state.set_state(None)
+    await state.set_data({})
+
+
+async def language_callback_handler(
+        callback: CallbackQuery,
+        callback_data: LanguageCallbackData,
+        state: FSMContext,
+        service,
+        user: UserRecord,
+        i18n: Catalog,
+        logger: logging.Logger,
+):
+    if callback.message is None:
+        logger.error("Field 'message' is None")
+        return
+
+    await service.database.set_user_language(
+        user_id=user.telegram_id,
+        language=callback_data.language,
+    )
+    i18n = get_catalog(callback_data.language)
+    await callback.message.edit_text(text=i18n("language_changed"))
+    # Reply keyboard can be replaced with new message only
+    await callback.message.answer(text=i18n("menu"), reply_markup=i18n.menu_keyboard)
+
+    await state.set_state(None)
+    await state.set_data({})
+
+
+def get_router() -> Router:
+    # Router can be attached to one dispatcher only, so every bot gets its own one
+    router = Router()
+    router.message.filter(F.chat.type == ChatType.PRIVATE)
+    router.message.middleware(user_middleware)
+    router.callback_query.middleware(user_middleware)
+
+    router.message.register(menu, Command("menu"))
+    router.message.register(menu, CommandStart())
+    router.message.register(groups_message_handler, F.text.in_(get_texts("my_groups")))
+    router.message.register(language_message_handler, F.text.in_(get_texts("language")))
+    router.callback_query.register(language_callback_handler, LanguageCallbackData.filter())
+    router.callback_query.register(groups_callback_handler, GroupsCallbackData.filter())
+    router.callback_query.register(group_search, GroupSearchCallbackData.filter())
+    router.message.register(group_search_handler, DialogState.search_group)
+    router.callback_query.register(group, GroupCallbackData.filter())
+    router.callback_query.register(change_group_owner, GroupChangeOwnerCallbackData.filter())
+    router.message.register(change_group_owner_handler, DialogState.change_owner)
+    router.callback_query.register(group_managers, GroupManagersCallbackData.filter())
+    router.callback_query.register(group_add_manager, GroupManagerAddCallbackData.filter())
+    router.message.register(group_add_manager_handler, DialogState.add_manager)
+    router.callback_query.register(group_manager, GroupManagerCallbackData.filter())
+    router.callback_query.register(group_manager_remove, GroupManagerRemoveCallbackData.filter())
+    router.callback_query.register(group_functions, GroupFunctionsCallbackData.filter())
+
+    return router
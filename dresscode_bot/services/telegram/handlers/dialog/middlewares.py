@@ -3,6 +3,8 @@ from typing import Any, Callable
 
 from aiogram.types import Message, CallbackQuery
 
+from ...i18n import detect_language, get_catalog
+
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +19,13 @@ async def user_middleware(
         return
 
     service = data["service"]
-    user = await service.database.get_or_create_user(
+    user = await service.database.get_or_create_user_record(
         id=event.from_user.id,
         full_name=event.from_user.full_name,
     )
+    await service.database.touch_user(user=user)
     data["user"] = user
+    data["i18n"] = get_catalog(detect_language(user.language, event.from_user.language_code))
 
     custom_logger = logging.getLogger("dialog")
     custom_handler = logging.StreamHandler()
@@ -3,6 +3,7 @@ from typing import Any, Sequence, Type
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+from ...i18n import Catalog
 from .callback_data import PaginationCallbackData
 
 
@@ -11,6 +12,7 @@ def inline_keyboard_pagination(
         page: int,
         page_count: int,
         callback_type: Type[PaginationCallbackData],
+        i18n: Catalog,
         callback_extra_args: dict[str, Any] | None = None,
         columns: int = 1,
         back_callback: CallbackData | None = None,
@@ -19,7 +21,7 @@ def inline_keyboard_pagination(
     callback_extra_args = callback_extra_args or {}
     keyboard = [list(elements[i:i + columns]) for i in range(0, len(elements), columns)]
     if add_callback is not None:
-        keyboard.insert(0, [InlineKeyboardButton(text="Добавить", callback_data=add_callback.pack())])
+        keyboard.insert(0, [i18n.button("add", callback_data=add_callback)])
     pagination_row = [InlineKeyboardButton(
         text=str(page),
         callback_data=callback_type(**callback_extra_args, page=page).pack(),
@@ -42,7 +44,7 @@ def inline_keyboard_pagination(
     if len(pagination_row) > 1:
         keyboard.append(pagination_row)
     if back_callback is not None:
-        keyboard.append([InlineKeyboardButton(text="Назад", callback_data=back_callback.pack())])
+        keyboard.append([i18n.button("back", callback_data=back_callback)])
 
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
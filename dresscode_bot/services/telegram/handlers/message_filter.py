@@ -0,0 +1,29 @@
+import logging
+
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import Message
+
+from dresscode_bot.services.database.models import ChatStatKindEnum
+from ..functions.filter import MessageFilterFunction
+
+
+logger = logging.getLogger(__name__)
+
+
+async def message_filter_handler(message: Message, service):
+    if not await MessageFilterFunction.handle(event=message, service=service):
+        return
+
+    parameters = [
+        message.chat.full_name,
+        message.chat.id,
+        message.from_user.full_name if message.from_user else "",
+        message.from_user.id if message.from_user else 0,
+    ]
+    try:
+        await message.delete()
+    except TelegramAPIError as exception:
+        logger.error("[%s (%d)] Message was not deleted: [%s (%d)]: %s", *parameters, exception)
+    else:
+        logger.info("[%s (%d)] Message deleted by filter: [%s (%d)]", *parameters)
+        service.stats.increment(chat_id=message.chat.id, kind=ChatStatKindEnum.MESSAGES_DELETED)
@@ -1,15 +1,13 @@
 import logging
 
 from aiogram.enums import ChatMemberStatus
-from aiogram.types import ChatMemberUpdated
-
-from dresscode_bot.services.database.models import User
+from aiogram.types import ChatMemberUpdated, Message
 
 
 logger = logging.getLogger(__name__)
 
 
-async def new_chat_handler(event: ChatMemberUpdated, service, user: User):
+async def new_chat_handler(event: ChatMemberUpdated, service):
     parameters = [
         event.chat.full_name,
         event.chat.id,
@@ -26,10 +24,38 @@ async def new_chat_handler(event: ChatMemberUpdated, service, user: User):
             *parameters[:2], event.new_chat_member.status,
         )
 
-    chat = await service.get_chat(id=event.chat.id)
+    chat = await service.database.get_chat(id=event.chat.id)
     if chat is not None:
         logger.warning("[%s (%d)] Chat already exists", *parameters[:2])
+        if chat.left_at is not None:
+            await service.database.set_chat_left(chat=chat, left=False)
+        if chat.title != event.chat.title:
+            await service.database.set_chat_title(chat_id=chat.telegram_id, title=event.chat.title)
+    else:
+        chat = await service.get_chat(id=event.chat.id, title=event.chat.title)
+        if chat is None:
+            logger.error("[%s (%d)] Chat was not added", *parameters[:2])
+            return
+        logger.info("[%s (%d)] New chat added", *parameters[:2])
+
+    service.sync_chat_members(chat=chat)
+
+
+async def left_chat_handler(event: ChatMemberUpdated, service):
+    service.admins.evict(chat_id=event.chat.id)
+    chat = await service.database.get_chat(id=event.chat.id)
+    if chat is None:
+        return
+
+    # Chat is kept for a while, bot can be added back
+    await service.database.set_chat_left(chat=chat, left=True)
+    logger.info("[%s (%d)] Bot was removed from chat", event.chat.full_name, event.chat.id)
+
+
+async def chat_title_handler(message: Message, service):
+    chat = await service.database.get_chat(id=message.chat.id)
+    if chat is None:
         return
 
-    await service.database.create_chat(id=event.chat.id, owner=user)
-    logger.info("[%s (%d)] New chat added")
+    await service.database.set_chat_title(chat_id=chat.telegram_id, title=message.new_chat_title)
+    logger.info("[%s (%d)] Chat title changed", message.chat.full_name, message.chat.id)
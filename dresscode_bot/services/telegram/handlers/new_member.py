@@ -1,11 +1,55 @@
 import logging
 
-from aiogram.types import ChatMemberUpdated, ChatPermissions
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import ChatMemberUpdated
+
+from dresscode_bot.services.database.models import ChatStatKindEnum, ScheduledActionKindEnum
+from ..functions.restrictions import MemberRestrictionFunction
+from ..i18n import get_user_catalog
 
 
 logger = logging.getLogger(__name__)
 
 
+async def challenge_member(event: ChatMemberUpdated, service, parameters: list):
+    try:
+        await service.captcha.challenge(
+            chat_id=event.chat.id,
+            user_id=event.new_chat_member.user.id,
+            full_name=event.new_chat_member.user.full_name,
+            i18n=await get_user_catalog(
+                database_service=service.database,
+                user=event.new_chat_member.user,
+            ),
+        )
+        return
+    except TelegramAPIError as exception:
+        # Bot can not post in chat or hit flood limit
+        logger.warning("[%s (%d)] Telegram API error: %s", *parameters[:2], exception)
+    except Exception:
+        logger.exception("[%s (%d)] Captcha was not rendered: [%s (%d)]", *parameters)
+
+    # Without challenge member could never lift restrictions, so they are lifted at once
+    try:
+        result = await MemberRestrictionFunction.unrestrict(
+            service=service,
+            chat_id=event.chat.id,
+            user_id=event.new_chat_member.user.id,
+        )
+    except TelegramAPIError as exception:
+        logger.warning("[%s (%d)] Telegram API error: %s", *parameters[:2], exception)
+        result = False
+    if result:
+        await service.scheduler.cancel(
+            kind=ScheduledActionKindEnum.UNRESTRICT,
+            chat_id=event.chat.id,
+            user_id=event.new_chat_member.user.id,
+        )
+        logger.info("[%s (%d)] Restrictions lifted without captcha: [%s (%d)]", *parameters)
+    else:
+        logger.error("[%s (%d)] Restrictions was not lifted: [%s (%d)]", *parameters)
+
+
 async def new_member_handler(event: ChatMemberUpdated, service):
     parameters = [
         event.chat.full_name,
@@ -14,18 +58,26 @@ async def new_member_handler(event: ChatMemberUpdated, service):
         event.new_chat_member.user.id,
     ]
 
-    chat = await service.get_chat(id=event.chat.id)
+    chat = await service.get_chat(id=event.chat.id, title=event.chat.title)
     if chat is None:
         logger.info("[%s (%d)] Inactive chat", *parameters[:2])
         return
 
     logger.info("[%s (%d)] Chat member joined: [%s (%d)]", *parameters)
-    result = await service.bot.restrict_chat_member(
-        chat_id=event.chat.id,
-        user_id=event.new_chat_member.user.id,
-        permissions=ChatPermissions(),
-    )
-    if result:
+    service.stats.increment(chat_id=event.chat.id, kind=ChatStatKindEnum.JOINS)
+    try:
+        result = await MemberRestrictionFunction.handle(event=event, service=service)
+    except TelegramAPIError as exception:
+        # Bot API reports failed restriction by error, e.g. bot has no rights anymore
+        logger.warning("[%s (%d)] Telegram API error: %s", *parameters[:2], exception)
+        result = False
+    if result is None:
+        logger.info("[%s (%d)] Restrictions skipped by policy: [%s (%d)]", *parameters)
+    elif result:
         logger.info("[%s (%d)] Restrictions added: [%s (%d)]", *parameters)
+        service.stats.increment(chat_id=event.chat.id, kind=ChatStatKindEnum.RESTRICTIONS)
+        if service.captcha is not None:
+            await challenge_member(event=event, service=service, parameters=parameters)
     else:
         logger.error("[%s (%d)] Restrictions was not added: [%s (%d)]", *parameters)
+        service.stats.increment(chat_id=event.chat.id, kind=ChatStatKindEnum.RESTRICTION_FAILURES)
@@ -0,0 +1,141 @@
+import functools
+import logging
+import math
+import ssl
+from pathlib import Path
+from typing import TYPE_CHECKING, Sequence
+
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from facet import ServiceMixin
+
+from dresscode_bot.services import database, monitoring
+from dresscode_bot.services.database.models import ScheduledAction, ScheduledActionKindEnum
+from .enums import BotMethodEnum
+from .functions.restrictions import MemberRestrictionFunction
+from .scheduler import Scheduler
+
+if TYPE_CHECKING:
+    from .service import Service
+
+
+logger = logging.getLogger(__name__)
+
+
+class Hosting(ServiceMixin):
+    # Runs several bots in one process: every bot has own Bot and Dispatcher, while database,
+    # caches, scheduler and webhook server are shared
+    def __init__(
+            self,
+            database_service: database.Service,
+            services: Sequence["Service"],
+            scheduler: Scheduler,
+            method: BotMethodEnum,
+            server_port: int = 8443,
+            ssl_certificate: Path | None = None,
+            ssl_private_key: Path | None = None,
+            shutdown_timeout: float = 5.0,
+            monitoring_service: monitoring.Service | None = None,
+    ):
+        self._database_service = database_service
+        self._services = {service.bot.id: service for service in services}
+        self._scheduler = scheduler
+        self._method = method
+        self._server_port = server_port
+        self._ssl_certificate = ssl_certificate
+        self._ssl_private_key = ssl_private_key
+        self._shutdown_timeout = shutdown_timeout
+        self._monitoring_service = monitoring_service
+        self._runner: web.AppRunner | None = None
+
+        self._scheduler.register(ScheduledActionKindEnum.UNRESTRICT, self._handle_unrestrict)
+
+    @property
+    def services(self) -> list["Service"]:
+        return list(self._services.values())
+
+    @property
+    def dependencies(self) -> list[ServiceMixin | list[ServiceMixin]]:
+        dependencies = [
+            self._database_service,
+            self._scheduler,
+        ]
+        if self._monitoring_service is not None:
+            dependencies.append(self._monitoring_service)
+        dependencies.append(self.services)
+        return dependencies
+
+    @property
+    def graceful_shutdown_timeout(self) -> int:
+        return math.ceil(self._shutdown_timeout) + 10
+
+    def get_service(self, bot_id: int | None) -> "Service | None":
+        if bot_id is None:
+            # Actions scheduled before bots were tracked are executed by the first bot
+            return self.services[0]
+        return self._services.get(bot_id)
+
+    async def _handle_unrestrict(self, action: ScheduledAction) -> bool:
+        service = self.get_service(bot_id=action.bot_id)
+        if service is None:
+            logger.error("[telegram] Have no bot %d for action %d", action.bot_id, action.id)
+            return False
+        return await MemberRestrictionFunction.handle_scheduled(action=action, service=service)
+
+    async def start(self):
+        logger.info("[telegram] Start hosting, bots: %d", len(self._services))
+
+        if self._method == BotMethodEnum.WEBHOOK:
+            await self._webhook()
+
+    def setup_application(self, app: web.Application):
+        routes: dict[str, dict[str | None, SimpleRequestHandler]] = {}
+        for service in self._services.values():
+            request_handler = service.setup_application(app, register=False)
+            routes.setdefault(service.webhook_path, {})[service.webhook_secret] = request_handler
+
+        for path, request_handlers in routes.items():
+            if len(request_handlers) == 1:
+                request_handler, = request_handlers.values()
+                request_handler.register(app, path=path)
+            else:
+                app.router.add_post(path, functools.partial(self._route, request_handlers=request_handlers))
+
+    @staticmethod
+    async def _route(
+            request: web.Request,
+            request_handlers: dict[str | None, SimpleRequestHandler],
+    ) -> web.Response:
+        request_handler = request_handlers.get(request.headers.get("X-Telegram-Bot-Api-Secret-Token"))
+        if request_handler is None:
+            return web.Response(body="Unauthorized", status=401)
+        return await request_handler.handle(request)
+
+    async def _webhook(self):
+        app = web.Application()
+        self.setup_application(app)
+        if self._monitoring_service is not None:
+            self._monitoring_service.setup_application(app)
+
+        context = None
+        if self._ssl_certificate and self._ssl_private_key:
+            logger.info("[telegram] Load SSL certificate and private key")
+            context = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
+            context.load_cert_chain(self._ssl_certificate, self._ssl_private_key)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(
+            self._runner,
+            port=self._server_port,
+            ssl_context=context,
+            shutdown_timeout=self._shutdown_timeout,
+        )
+        await site.start()
+
+    async def stop(self):
+        # Bots are stopped after hosting, so server stops receiving updates first and then every
+        # bot drains its own updates
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,266 @@
+import string
+from types import MappingProxyType
+from typing import Mapping
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    KeyboardButton,
+    ReplyKeyboardMarkup,
+    User,
+)
+
+from dresscode_bot.services.database.models import LanguageEnum
+
+
+DEFAULT_LANGUAGE = LanguageEnum.RUSSIAN
+
+# Telegram client language is used until user chooses language explicitly
+LANGUAGE_CODES = {
+    "ru": LanguageEnum.RUSSIAN,
+    "en": LanguageEnum.ENGLISH,
+}
+
+LANGUAGE_NAMES = {
+    LanguageEnum.RUSSIAN: "Русский",
+    LanguageEnum.ENGLISH: "English",
+}
+
+MESSAGES: dict[str, dict[LanguageEnum, str]] = {
+    "menu": {
+        LanguageEnum.RUSSIAN: "Меню",
+        LanguageEnum.ENGLISH: "Menu",
+    },
+    "my_groups": {
+        LanguageEnum.RUSSIAN: "Мои группы",
+        LanguageEnum.ENGLISH: "My groups",
+    },
+    "language": {
+        LanguageEnum.RUSSIAN: "Язык",
+        LanguageEnum.ENGLISH: "Language",
+    },
+    "choose_language": {
+        LanguageEnum.RUSSIAN: "Выберите язык",
+        LanguageEnum.ENGLISH: "Choose language",
+    },
+    "no_groups": {
+        LanguageEnum.RUSSIAN: "У Вас нет групп",
+        LanguageEnum.ENGLISH: "You have no groups",
+    },
+    "groups": {
+        LanguageEnum.RUSSIAN: "Группы",
+        LanguageEnum.ENGLISH: "Groups",
+    },
+    "search": {
+        LanguageEnum.RUSSIAN: "Поиск",
+        LanguageEnum.ENGLISH: "Search",
+    },
+    "send_group_search": {
+        LanguageEnum.RUSSIAN: "Отправьте начало названия группы",
+        LanguageEnum.ENGLISH: "Send the beginning of group title",
+    },
+    "search_results": {
+        LanguageEnum.RUSSIAN: "Найденные группы",
+        LanguageEnum.ENGLISH: "Found groups",
+    },
+    "nothing_found": {
+        LanguageEnum.RUSSIAN: "Ничего не найдено, попробуйте другое название",
+        LanguageEnum.ENGLISH: "Nothing found, try another title",
+    },
+    "group": {
+        LanguageEnum.RUSSIAN: "Группа",
+        LanguageEnum.ENGLISH: "Group",
+    },
+    "group_menu": {
+        LanguageEnum.RUSSIAN: "Меню группы",
+        LanguageEnum.ENGLISH: "Group menu",
+    },
+    "change_owner": {
+        LanguageEnum.RUSSIAN: "Сменить владельца",
+        LanguageEnum.ENGLISH: "Change owner",
+    },
+    "managers": {
+        LanguageEnum.RUSSIAN: "Менеджеры",
+        LanguageEnum.ENGLISH: "Managers",
+    },
+    "group_managers": {
+        LanguageEnum.RUSSIAN: "Менеджеры группы",
+        LanguageEnum.ENGLISH: "Group managers",
+    },
+    "manager": {
+        LanguageEnum.RUSSIAN: "Менеджер {name}",
+        LanguageEnum.ENGLISH: "Manager {name}",
+    },
+    "stats": {
+        LanguageEnum.RUSSIAN: "Статистика",
+        LanguageEnum.ENGLISH: "Statistics",
+    },
+    "back": {
+        LanguageEnum.RUSSIAN: "Назад",
+        LanguageEnum.ENGLISH: "Back",
+    },
+    "add": {
+        LanguageEnum.RUSSIAN: "Добавить",
+        LanguageEnum.ENGLISH: "Add",
+    },
+    "remove": {
+        LanguageEnum.RUSSIAN: "Удалить",
+        LanguageEnum.ENGLISH: "Remove",
+    },
+    "send_new_owner": {
+        LanguageEnum.RUSSIAN: (
+            "Перешлите любое сообщение или отправьте контакт человека, которому хотите передать "
+            "права управления"
+        ),
+        LanguageEnum.ENGLISH: (
+            "Forward any message or send a contact of the person you want to transfer management "
+            "rights to"
+        ),
+    },
+    "owner_hidden": {
+        LanguageEnum.RUSSIAN: (
+            "Этот пользователь закрыл свои данные, его нельзя сделать управляющим"
+        ),
+        LanguageEnum.ENGLISH: "This user hides their data, they can not become an owner",
+    },
+    "send_new_manager": {
+        LanguageEnum.RUSSIAN: (
+            "Перешлите любое сообщение или отправьте контакт человека, которого хотите сделать "
+            "менеджером"
+        ),
+        LanguageEnum.ENGLISH: (
+            "Forward any message or send a contact of the person you want to make a manager"
+        ),
+    },
+    "manager_hidden": {
+        LanguageEnum.RUSSIAN: "Этот пользователь скрыл свои данные, его нельзя сделать менеджером",
+        LanguageEnum.ENGLISH: "This user hides their data, they can not become a manager",
+    },
+    "stats_title": {
+        LanguageEnum.RUSSIAN: "Статистика за {since:%d.%m}–{until:%d.%m}",
+        LanguageEnum.ENGLISH: "Statistics for {since:%d.%m}–{until:%d.%m}",
+    },
+    "stats_day": {
+        LanguageEnum.RUSSIAN: (
+            "{day:%d.%m}: вступили {joins}, ограничены {restrictions}, ошибок {failures}"
+        ),
+        LanguageEnum.ENGLISH: (
+            "{day:%d.%m}: joined {joins}, restricted {restrictions}, failed {failures}"
+        ),
+    },
+    "stats_captcha": {
+        LanguageEnum.RUSSIAN: "Капча: пройдена {passed}, не пройдена {failed}",
+        LanguageEnum.ENGLISH: "Captcha: passed {passed}, failed {failed}",
+    },
+    "stats_deleted": {
+        LanguageEnum.RUSSIAN: "Удалено сообщений: {count}",
+        LanguageEnum.ENGLISH: "Messages deleted: {count}",
+    },
+    "language_changed": {
+        LanguageEnum.RUSSIAN: "Язык изменён",
+        LanguageEnum.ENGLISH: "Language changed",
+    },
+    "captcha_button": {
+        LanguageEnum.RUSSIAN: "{name}, нажмите кнопку «{answer}», чтобы подтвердить, что вы не бот",
+        LanguageEnum.ENGLISH: "{name}, press «{answer}» button to confirm that you are not a bot",
+    },
+    "captcha_image": {
+        LanguageEnum.RUSSIAN: "{name}, нажмите кнопку с кодом с картинки",
+        LanguageEnum.ENGLISH: "{name}, press the button with the code from the picture",
+    },
+    "captcha_not_yours": {
+        LanguageEnum.RUSSIAN: "Эта проверка не для Вас",
+        LanguageEnum.ENGLISH: "This check is not for you",
+    },
+    "captcha_finished": {
+        LanguageEnum.RUSSIAN: "Проверка уже завершена",
+        LanguageEnum.ENGLISH: "Check is already finished",
+    },
+    "captcha_passed": {
+        LanguageEnum.RUSSIAN: "Проверка пройдена",
+        LanguageEnum.ENGLISH: "Check passed",
+    },
+    "captcha_wrong": {
+        LanguageEnum.RUSSIAN: "Неверный ответ",
+        LanguageEnum.ENGLISH: "Wrong answer",
+    },
+}
+
+
+class LanguageCallbackData(CallbackData, prefix="language"):
+    language: LanguageEnum
+
+
+class Catalog:
+    # Messages and static keyboards of one language, built once on import and shared by updates
+    __slots__ = ("language", "_messages", "menu_keyboard", "language_keyboard")
+
+    def __init__(self, language: LanguageEnum, messages: Mapping[str, str]):
+        self.language = language
+        self._messages = MappingProxyType(dict(messages))
+        self.menu_keyboard = ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text=self._messages["my_groups"])],
+                [KeyboardButton(text=self._messages["language"])],
+            ],
+            resize_keyboard=True,
+        )
+        self.language_keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(
+                text=name,
+                callback_data=LanguageCallbackData(language=language).pack(),
+            )]
+            for language, name in LANGUAGE_NAMES.items()
+        ])
+
+    def __call__(self, key: str, **parameters) -> str:
+        text = self._messages[key]
+        return text.format(**parameters) if parameters else text
+
+    def button(self, key: str, callback_data: CallbackData) -> InlineKeyboardButton:
+        return InlineKeyboardButton(text=self._messages[key], callback_data=callback_data.pack())
+
+
+def _get_fields(text: str) -> set[str]:
+    return {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+
+
+def _compile() -> Mapping[LanguageEnum, Catalog]:
+    catalogs = {}
+    for language in LanguageEnum:
+        messages = {}
+        for key, translations in MESSAGES.items():
+            default = translations[DEFAULT_LANGUAGE]
+            text = translations.get(language, default)
+            # Broken translation must fail on start, not on update of some user
+            if _get_fields(text) != _get_fields(default):
+                raise ValueError(f"Message '{key}' has other fields in '{language.value}' language")
+            messages[key] = text
+        catalogs[language] = Catalog(language=language, messages=messages)
+    return MappingProxyType(catalogs)
+
+
+CATALOGS = _compile()
+
+
+def get_catalog(language: LanguageEnum | None) -> Catalog:
+    return CATALOGS[language or DEFAULT_LANGUAGE]
+
+
+def detect_language(language: LanguageEnum | None, language_code: str | None) -> LanguageEnum:
+    if language is not None:
+        return language
+    return LANGUAGE_CODES.get((language_code or "").split("-")[0], DEFAULT_LANGUAGE)
+
+
+async def get_user_catalog(database_service, user: User) -> Catalog:
+    # Chat updates have no dialog middleware, so language saved by user is loaded here
+    record = await database_service.get_user_record(id=user.id)
+    language = record.language if record is not None else None
+    return get_catalog(detect_language(language, user.language_code))
+
+
+def get_texts(key: str) -> frozenset[str]:
+    # Reply keyboard buttons come back as text, so filters must accept text of any language
+    return frozenset(catalog(key) for catalog in CATALOGS.values())
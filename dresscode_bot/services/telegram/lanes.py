@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable
+
+from aiogram.enums import ChatType
+from aiogram.types import Update
+from facet import ServiceMixin
+
+from .enums import LaneEnum
+
+
+logger = logging.getLogger(__name__)
+
+
+def classify(update: Update) -> LaneEnum:
+    if update.chat_member is not None or update.my_chat_member is not None:
+        return LaneEnum.MODERATION
+
+    message = update.message or update.edited_message
+    if message is None and update.callback_query is not None:
+        message = update.callback_query.message
+    if message is not None:
+        # Private chat is the dialog with bot, anything in groups is moderation work
+        return LaneEnum.DIALOG if message.chat.type == ChatType.PRIVATE else LaneEnum.MODERATION
+
+    return LaneEnum.OTHER
+
+
+def percentile(values: list[float], rank: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * rank), len(values) - 1)]
+
+
+class Lane:
+    def __init__(self, name: LaneEnum, concurrency: int, queue_size: int | None = None):
+        self._name = name
+        self._queue_size = queue_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._waiting = 0
+        self._active = 0
+        self._processed = 0
+        self._dropped = 0
+        self._waits: deque[float] = deque(maxlen=1024)
+        self._durations: deque[float] = deque(maxlen=1024)
+
+    @property
+    def name(self) -> LaneEnum:
+        return self._name
+
+    async def run(self, handler: Callable, event: Update, data: dict[str, Any]) -> Any:
+        if self._queue_size is not None and self._waiting >= self._queue_size:
+            self._dropped += 1
+            logger.warning("[telegram] Lane %s is full, update dropped: %d", self._name.value, event.update_id)
+            return None
+
+        received = time.monotonic()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        started = time.monotonic()
+        self._active += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+            self._processed += 1
+            self._waits.append(started - received)
+            self._durations.append(time.monotonic() - received)
+
+    def stats(self) -> dict[str, Any]:
+        waits, durations = sorted(self._waits), sorted(self._durations)
+        return {
+            "waiting": self._waiting,
+            "active": self._active,
+            "processed": self._processed,
+            "dropped": self._dropped,
+            "wait_p50": percentile(waits, 0.5),
+            "wait_p95": percentile(waits, 0.95),
+            "latency_p50": percentile(durations, 0.5),
+            "latency_p95": percentile(durations, 0.95),
+            "latency_max": durations[-1] if durations else 0.0,
+        }
+
+
+class Lanes(ServiceMixin):
+    # Update middleware: every update waits for a slot of its lane, so flood in one lane can not
+    # take all handlers, database connections and API calls from others. Moderation lane has no
+    # queue limit: dropped join updates are not redelivered and joiners would stay unmoderated
+    def __init__(
+            self,
+            limits: dict[LaneEnum, tuple[int, int | None]] | None = None,
+            report_interval: float | None = 60.0,
+    ):
+        limits = limits or {}
+        if limits.get(LaneEnum.MODERATION, (16, None))[1] is not None:
+            raise ValueError("Moderation lane can not drop updates, queue size must be None")
+        self._lanes = {
+            name: Lane(name, *limits.get(name, (16, None)))
+            for name in LaneEnum
+        }
+        self._report_interval = report_interval
+
+    def __getitem__(self, name: LaneEnum) -> Lane:
+        return self._lanes[name]
+
+    async def __call__(self, handler: Callable, event: Update, data: dict[str, Any]) -> Any:
+        return await self._lanes[classify(event)].run(handler, event, data)
+
+    async def start(self):
+        if self._report_interval is not None:
+            self.add_task(self._reporting())
+
+    def report(self):
+        for lane in self._lanes.values():
+            stats = lane.stats()
+            logger.info(
+                "[telegram] Lane %s: processed %d, dropped %d, waiting %d, active %d, "
+                "wait p50/p95 %.3f/%.3f s, latency p50/p95/max %.3f/%.3f/%.3f s",
+                lane.name.value, stats["processed"], stats["dropped"], stats["waiting"],
+                stats["active"], stats["wait_p50"], stats["wait_p95"], stats["latency_p50"],
+                stats["latency_p95"], stats["latency_max"],
+            )
+
+    async def _reporting(self):
+        while True:
+            await asyncio.sleep(self._report_interval)
+            self.report()
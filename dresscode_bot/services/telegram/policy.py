@@ -0,0 +1,121 @@
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from aiogram.types import ChatPermissions
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.bus import EntityEnum
+from dresscode_bot.services.database.models import ChatPolicy
+from .enums import ChatPermissionEnum
+
+
+MINUTES_IN_DAY = 24 * 60
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledPolicy:
+    permissions: ChatPermissions
+    whitelist: frozenset[int] = frozenset()
+    # Daily UTC windows as (start minute, end minute), policy is always active if empty
+    windows: tuple[tuple[int, int], ...] = ()
+    # Restriction lifetime in seconds, restriction is permanent if None
+    duration: int | None = None
+
+    def is_active(self, now: datetime) -> bool:
+        if not self.windows:
+            return True
+
+        minute = now.hour * 60 + now.minute
+        for start, end in self.windows:
+            if start <= end:
+                if start <= minute < end:
+                    return True
+            elif minute >= start or minute < end:
+                return True
+        return False
+
+    def decide(self, user_id: int, now: datetime | None = None) -> ChatPermissions | None:
+        if user_id in self.whitelist:
+            return None
+        if not self.is_active(now or datetime.now(tz=timezone.utc)):
+            return None
+        return self.permissions
+
+
+def build_permissions(grants: set[ChatPermissionEnum]) -> ChatPermissions:
+    return ChatPermissions(**{
+        permission.value: permission in grants
+        for permission in ChatPermissionEnum
+    })
+
+
+def compile_policy(chat_policy: ChatPolicy | None) -> CompiledPolicy:
+    if chat_policy is None:
+        return DEFAULT_POLICY
+
+    grants = {ChatPermissionEnum(permission) for permission in chat_policy.permissions}
+    windows = tuple(
+        (start % MINUTES_IN_DAY, end % MINUTES_IN_DAY)
+        for start, end in chat_policy.windows
+    )
+    return CompiledPolicy(
+        permissions=build_permissions(grants=grants),
+        whitelist=frozenset(chat_policy.whitelist),
+        windows=windows,
+        duration=chat_policy.duration,
+    )
+
+
+DEFAULT_POLICY = CompiledPolicy(permissions=build_permissions(grants=set()))
+
+
+class PolicyCache:
+    def __init__(self, database_service: database.Service):
+        self._database_service = database_service
+        self._policies: dict[int, CompiledPolicy] = {}
+        self._changes: Counter[int] = Counter()
+        self._resets = 0
+        self._database_service.bus.subscribe(
+            EntityEnum.CHAT_POLICY,
+            self.invalidate,
+            reset=self.reset,
+        )
+
+    async def get(self, chat_id: int) -> CompiledPolicy:
+        policy = self._policies.get(chat_id)
+        if policy is None:
+            changes = (self._resets, self._changes[chat_id])
+            chat_policy = await self._database_service.get_chat_policy(chat_id=chat_id)
+            policy = compile_policy(chat_policy=chat_policy)
+            # Invalidation arrived during read, row can be older than it, so it is not cached
+            if (self._resets, self._changes[chat_id]) == changes:
+                self._policies[chat_id] = policy
+        return policy
+
+    def invalidate(self, chat_id: int):
+        self._policies.pop(chat_id, None)
+        self._changes[chat_id] += 1
+
+    def reset(self):
+        self._policies.clear()
+        self._resets += 1
+
+    async def set(
+            self,
+            chat_id: int,
+            permissions: set[ChatPermissionEnum],
+            whitelist: set[int],
+            windows: list[tuple[int, int]],
+            duration: int | None = None,
+    ) -> CompiledPolicy:
+        chat_policy = await self._database_service.set_chat_policy(
+            chat_id=chat_id,
+            permissions=[permission.value for permission in permissions],
+            whitelist=whitelist,
+            windows=windows,
+            duration=duration,
+        )
+        # Old policy is already evicted by invalidation bus
+        policy = self._policies[chat_id] = compile_policy(chat_policy=chat_policy)
+        return policy
@@ -0,0 +1,93 @@
+import logging
+from typing import Any, Callable, Iterable
+
+from aiogram import Bot
+from aiogram.enums import ChatType
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+from .functions.filter import FilterCache
+
+
+logger = logging.getLogger(__name__)
+
+RawCheck = Callable[[dict[str, Any]], bool]
+
+
+class UpdatePreFilter:
+    # Checks raw update dicts before pydantic validation. Dropped update is never seen by any
+    # handler, so every check must return False only when no handler could match the update
+    def __init__(self):
+        self._allowed_updates: frozenset[str] | None = None
+        self._checks: dict[str, list[RawCheck]] = {}
+        self._dropped = 0
+
+    @property
+    def allowed_updates(self) -> list[str] | None:
+        if self._allowed_updates is None:
+            return None
+        return sorted(self._allowed_updates)
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped
+
+    def allow(self, update_types: Iterable[str]):
+        self._allowed_updates = frozenset(update_types)
+
+    def register(self, update_type: str, check: RawCheck):
+        self._checks.setdefault(update_type, []).append(check)
+
+    def _accept(self, update: dict[str, Any]) -> bool:
+        for update_type, event in update.items():
+            if update_type == "update_id":
+                continue
+            if self._allowed_updates is not None and update_type not in self._allowed_updates:
+                return False
+            if not isinstance(event, dict):
+                return True
+            return all(check(event) for check in self._checks.get(update_type, ()))
+        return True
+
+    def __call__(self, update: dict[str, Any]) -> bool:
+        if self._accept(update):
+            return True
+        self._dropped += 1
+        return False
+
+
+def check_message(
+        message: dict[str, Any],
+        filters: FilterCache | None,
+        private: bool,
+) -> bool:
+    chat = message.get("chat")
+    if not isinstance(chat, dict):
+        return True
+    chat_type = chat.get("type")
+    if chat_type == ChatType.PRIVATE:
+        return private
+    if chat_type not in (ChatType.GROUP, ChatType.SUPERGROUP):
+        return False
+
+    # Title changes are kept for search over groups of user
+    if "new_chat_title" in message:
+        return True
+    # Other group messages are consumed by message filter only, it looks at text, caption and
+    # their entities, and does nothing for chats without rules
+    if "text" not in message and "caption" not in message:
+        return False
+    if filters is None:
+        # Cluster leader has no rules, workers check messages with their own caches
+        return True
+    compiled_filter = filters.peek(chat_id=chat.get("id"))
+    return compiled_filter is None or bool(compiled_filter)
+
+
+class PreFilteredRequestHandler(SimpleRequestHandler):
+    def __init__(self, *args: Any, update_filter: UpdatePreFilter, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._update_filter = update_filter
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]):
+        if self._update_filter(update):
+            await super()._background_feed_update(bot=bot, update=update)
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from facet import ServiceMixin
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.models import ScheduledAction, ScheduledActionKindEnum
+
+
+logger = logging.getLogger(__name__)
+
+ActionHandler = Callable[[ScheduledAction], Awaitable[bool]]
+
+
+class TimingWheel:
+    # Two level hierarchical wheel: items for later rounds wait on outer level and are moved to
+    # inner level when their round comes, so advancing costs only the items that are due
+    def __init__(self, inner_slots: int = 60, outer_slots: int = 60):
+        self._inner_slots = inner_slots
+        self._outer_slots = outer_slots
+        self._inner: list[list[Any]] = [[] for _ in range(inner_slots)]
+        self._outer: list[list[tuple[int, Any]]] = [[] for _ in range(outer_slots)]
+        self._tick = 0
+        self._size = 0
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    @property
+    def capacity(self) -> int:
+        return self._inner_slots * (self._outer_slots - 1)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, tick: int, item: Any) -> bool:
+        tick = max(tick, self._tick + 1)
+        if tick // self._inner_slots == self._tick // self._inner_slots:
+            self._inner[tick % self._inner_slots].append(item)
+        elif tick // self._inner_slots - self._tick // self._inner_slots < self._outer_slots:
+            self._outer[tick // self._inner_slots % self._outer_slots].append((tick, item))
+        else:
+            return False
+        self._size += 1
+        return True
+
+    def advance(self) -> list[Any]:
+        self._tick += 1
+        if self._tick % self._inner_slots == 0:
+            slot = self._tick // self._inner_slots % self._outer_slots
+            items, self._outer[slot] = self._outer[slot], []
+            for tick, item in items:
+                self._inner[tick % self._inner_slots].append(item)
+
+        slot = self._tick % self._inner_slots
+        due, self._inner[slot] = self._inner[slot], []
+        self._size -= len(due)
+        return due
+
+
+class Scheduler(ServiceMixin):
+    def __init__(
+            self,
+            database_service: database.Service,
+            tick: float = 1.0,
+            reload_interval: float = 600.0,
+            batch_size: int = 20,
+            batch_delay: float = 1.0,
+            retry_delay: float = 10.0,
+            max_attempts: int = 5,
+            shard: tuple[int, int] | None = None,
+    ):
+        self._database_service = database_service
+        self._shard = shard
+        self._tick = tick
+        self._reload_interval = reload_interval
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+        self._retry_delay = retry_delay
+        self._max_attempts = max_attempts
+        self._attempts: dict[int, int] = {}
+        self._handlers: dict[ScheduledActionKindEnum, ActionHandler] = {}
+        self._wheel = TimingWheel()
+        self._loaded: set[int] = set()
+        self._loaded_until: datetime | None = None
+        self._epoch = time.time()
+        self._due: asyncio.Queue[ScheduledAction] = asyncio.Queue()
+
+    @property
+    def dependencies(self) -> list[ServiceMixin]:
+        return [
+            self._database_service,
+        ]
+
+    @property
+    def horizon(self) -> timedelta:
+        return timedelta(seconds=self._wheel.capacity * self._tick)
+
+    def register(self, kind: ScheduledActionKindEnum, handler: ActionHandler):
+        self._handlers[kind] = handler
+
+    async def start(self):
+        logger.info("[scheduler] Start service")
+
+        self._wheel = TimingWheel()
+        self._epoch = time.time()
+        await self._load()
+
+        self.add_task(self._ticking())
+        self.add_task(self._firing())
+
+    async def schedule(
+            self,
+            kind: ScheduledActionKindEnum,
+            chat_id: int,
+            user_id: int,
+            delay: float,
+            bot_id: int | None = None,
+    ) -> ScheduledAction:
+        action = await self._database_service.add_scheduled_action(
+            kind=kind,
+            chat_id=chat_id,
+            user_id=user_id,
+            due_at=datetime.utcnow() + timedelta(seconds=delay),
+            bot_id=bot_id,
+        )
+        if self._loaded_until is not None and action.due_at < self._loaded_until:
+            self._add(action=action)
+        return action
+
+    async def cancel(self, kind: ScheduledActionKindEnum, chat_id: int, user_id: int) -> int:
+        ids = await self._database_service.cancel_scheduled_actions(
+            kind=kind,
+            chat_id=chat_id,
+            user_id=user_id,
+        )
+        # Cancelled actions stay in wheel and are skipped on firing, as their rows are gone
+        self._loaded.difference_update(ids)
+        for id in ids:
+            self._attempts.pop(id, None)
+        return len(ids)
+
+    def _add(self, action: ScheduledAction):
+        if action.id in self._loaded:
+            return
+        if self._shard is not None and action.chat_id % self._shard[1] != self._shard[0]:
+            return
+
+        # due_at is naive UTC, so compare it with epoch through UTC timestamp
+        timestamp = (action.due_at - datetime(1970, 1, 1)).total_seconds()
+        if self._wheel.add(math.ceil((timestamp - self._epoch) / self._tick), action):
+            self._loaded.add(action.id)
+
+    async def _load(self):
+        until = datetime.utcnow() + self.horizon - timedelta(seconds=self._reload_interval)
+        actions = await self._database_service.get_scheduled_actions(
+            until=until,
+            since=self._loaded_until,
+        )
+        for action in actions:
+            self._add(action=action)
+        self._loaded_until = until
+        logger.info("[scheduler] Actions loaded: %d, pending: %d", len(actions), len(self._wheel))
+
+    async def _ticking(self):
+        next_reload = time.time() + self._reload_interval
+        while True:
+            next_tick = self._epoch + (self._wheel.tick + 1) * self._tick
+            await asyncio.sleep(max(next_tick - time.time(), 0))
+
+            # Catch up if loop was busy for several ticks
+            while self._epoch + (self._wheel.tick + 1) * self._tick <= time.time():
+                for action in self._wheel.advance():
+                    self._due.put_nowait(action)
+
+            if time.time() >= next_reload:
+                next_reload = time.time() + self._reload_interval
+                await self._load()
+
+    async def _fire(self, action: ScheduledAction) -> bool:
+        handler = self._handlers.get(action.kind)
+        if handler is None:
+            logger.error("[scheduler] Have no handler for action: %s", action.kind)
+            return False
+
+        try:
+            result = await handler(action)
+        except Exception:
+            logger.exception("[scheduler] Action %d failed", action.id)
+            return False
+        # Handlers report failure without exception by False, like Bot API methods do
+        if not result:
+            logger.error("[scheduler] Action %d was not done", action.id)
+            return False
+        return True
+
+    async def _retry(self, action: ScheduledAction) -> bool:
+        attempts = self._attempts.get(action.id, 0) + 1
+        if attempts >= self._max_attempts:
+            logger.error("[scheduler] Action %d dropped after %d attempts", action.id, attempts)
+            return False
+
+        # Delay doubles with every attempt, stored due time keeps it after restart
+        delay = self._retry_delay * 2 ** (attempts - 1)
+        action.due_at = datetime.utcnow() + timedelta(seconds=delay)
+        try:
+            await self._database_service.postpone_scheduled_action(
+                id=action.id,
+                due_at=action.due_at,
+            )
+        except Exception:
+            logger.exception("[scheduler] Action %d was not postponed", action.id)
+        self._attempts[action.id] = attempts
+        logger.info("[scheduler] Action %d retries in %.0f seconds", action.id, delay)
+
+        self._loaded.discard(action.id)
+        if self._loaded_until is not None and action.due_at < self._loaded_until:
+            self._add(action=action)
+        return True
+
+    async def _firing(self):
+        while True:
+            batch = [await self._due.get()]
+            while len(batch) < self._batch_size and not self._due.empty():
+                batch.append(self._due.get_nowait())
+
+            # Action may be cancelled by any process after it was loaded
+            existing = await self._database_service.get_scheduled_action_ids(
+                ids=[action.id for action in batch],
+            )
+            cancelled = [action.id for action in batch if action.id not in existing]
+            self._loaded.difference_update(cancelled)
+            batch = [action for action in batch if action.id in existing]
+            if not batch:
+                continue
+
+            fired = await asyncio.gather(*(self._fire(action=action) for action in batch))
+            # Failed actions stay stored and come back after backoff
+            ids = []
+            for action, success in zip(batch, fired):
+                if success or not await self._retry(action=action):
+                    ids.append(action.id)
+            if ids:
+                await self._database_service.remove_scheduled_actions(ids=ids)
+                self._loaded.difference_update(ids)
+                for id in ids:
+                    self._attempts.pop(id, None)
+            await asyncio.sleep(self._batch_delay)
@@ -1,27 +1,49 @@
+import asyncio
+import functools
 import logging
+import math
+import multiprocessing.queues
+import queue
 import ssl
 from pathlib import Path
 from typing import Any, Callable
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.enums import ChatMemberStatus, ChatType
+from aiogram.exceptions import TelegramAPIError
+from aiogram.enums import ChatType
 from aiogram.filters.chat_member_updated import (
     ChatMemberUpdatedFilter,
     JOIN_TRANSITION,
+    LEAVE_TRANSITION,
     PROMOTED_TRANSITION,
 )
 from aiogram.methods import delete_webhook
 from aiogram.types import Update
-from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiogram.webhook.aiohttp_server import setup_application
 from aiohttp import web
 from facet import ServiceMixin
 
-from dresscode_bot.services import database
-from dresscode_bot.services.database.models import Chat
-from .enums import BotMethodEnum
+from dresscode_bot.services import database, monitoring
+from dresscode_bot.services.database.models import Chat, ScheduledActionKindEnum
+from dresscode_bot.services.database.records import ChatRecord
+from .admins import AdminCache
+from .captcha import Captcha, CaptchaCallbackData
+from .cluster import shard_key
+from .dispatcher import TrackingDispatcher
+from .enums import BotMethodEnum, CaptchaModeEnum, JsonLibraryEnum
 from .fsm import DatabaseStorage
-from .handlers import dialog, new_chat, new_member
+from .functions.filter import FilterCache
+from .functions.restrictions import MemberRestrictionFunction
+from .hosting import Hosting
+from .lanes import Lanes
+from .handlers import captcha, dialog, message_filter, new_chat, new_member
+from .policy import PolicyCache
+from .prefilter import PreFilteredRequestHandler, UpdatePreFilter, check_message
+from .scheduler import Scheduler
+from .session import PooledSession
 from .settings import Settings
+from .stats import ChatStats
+from .sync import ChatMembersSync
 
 
 logger = logging.getLogger(__name__)
@@ -41,8 +63,44 @@ class Service(ServiceMixin):
             server_port: int = 8443,
             ssl_certificate: Path | None = None,
             ssl_private_key: Path | None = None,
+            session_limit: int = 100,
+            session_limit_per_host: int = 0,
+            session_keepalive_timeout: float = 15.0,
+            session_dns_cache_ttl: int | None = 10,
+            session_timeout: float = 60.0,
+            session_json_library: JsonLibraryEnum = JsonLibraryEnum.JSON,
+            sync_batch_size: int = 20,
+            sync_batch_delay: float = 1.0,
+            sync_page_size: int = 500,
+            sync_max_users: int | None = 10000,
+            scheduler_tick: float = 1.0,
+            scheduler_reload_interval: float = 600.0,
+            scheduler_batch_size: int = 20,
+            scheduler_batch_delay: float = 1.0,
+            scheduler_retry_delay: float = 10.0,
+            scheduler_max_attempts: int = 5,
+            stats_flush_interval: float = 60.0,
+            admins_reconcile_interval: float = 3600.0,
+            admins_reconcile_batch_size: int = 20,
+            admins_reconcile_batch_delay: float = 1.0,
+            captcha_mode: CaptchaModeEnum | None = None,
+            captcha_timeout: int = 120,
+            captcha_options: int = 4,
+            captcha_persistent: bool = False,
+            captcha_kick_on_fail: bool = False,
+            captcha_processes: int = 1,
+            shutdown_timeout: float = 5.0,
+            monitoring_service: monitoring.Service | None = None,
+            policies: PolicyCache | None = None,
+            filters: FilterCache | None = None,
+            scheduler: Scheduler | None = None,
+            lanes: Lanes | None = None,
+            hosted: bool = False,
+            shard: tuple[int, int] | None = None,
+            updates_queue: multiprocessing.queues.Queue | None = None,
     ):
         self._database_service = database_service
+        self._monitoring_service = monitoring_service
         self._token = token
         self._method = method
         self._polling_timeout = polling_timeout
@@ -53,15 +111,102 @@ class Service(ServiceMixin):
         self._ssl_certificate = ssl_certificate
         self._ssl_private_key = ssl_private_key
         self._me_id = None
-
-        self._bot = Bot(token=self._token)
-        self._dispatcher = Dispatcher(
+        self._shutdown_timeout = shutdown_timeout
+        self._runner: web.AppRunner | None = None
+        self._sync_tasks: dict[int, asyncio.Task] = {}
+        self._hosted = hosted
+        self._shard = shard
+        self._updates_queue = updates_queue
+        self._consuming_stopped = False
+        self._chains: dict[int, asyncio.Task] = {}
+
+        self._prefilter = UpdatePreFilter()
+        self._bot = Bot(
+            token=self._token,
+            session=PooledSession(
+                limit=session_limit,
+                limit_per_host=session_limit_per_host,
+                keepalive_timeout=session_keepalive_timeout,
+                dns_cache_ttl=session_dns_cache_ttl,
+                timeout=session_timeout,
+                json_library=session_json_library,
+                update_filter=self._prefilter,
+            ),
+        )
+        # Hosting passes caches and scheduler shared by all bots
+        self._policies = policies
+        if self._policies is None:
+            self._policies = PolicyCache(database_service=self._database_service)
+        self._filters = filters
+        if self._filters is None:
+            self._filters = FilterCache(database_service=self._database_service)
+        self._lanes = lanes
+        if self._lanes is None:
+            self._lanes = Lanes()
+        self._scheduler = scheduler
+        if self._scheduler is None:
+            self._scheduler = Scheduler(
+                database_service=self._database_service,
+                tick=scheduler_tick,
+                reload_interval=scheduler_reload_interval,
+                batch_size=scheduler_batch_size,
+                batch_delay=scheduler_batch_delay,
+                retry_delay=scheduler_retry_delay,
+                max_attempts=scheduler_max_attempts,
+                shard=self._shard,
+            )
+            self._scheduler.register(
+                ScheduledActionKindEnum.UNRESTRICT,
+                functools.partial(MemberRestrictionFunction.handle_scheduled, service=self),
+            )
+        self._stats = ChatStats(
+            database_service=self._database_service,
+            flush_interval=stats_flush_interval,
+        )
+        self._admins = AdminCache(
+            bot=self._bot,
+            reconcile_interval=admins_reconcile_interval,
+            reconcile_batch_size=admins_reconcile_batch_size,
+            reconcile_batch_delay=admins_reconcile_batch_delay,
+        )
+        self._captcha = None
+        if captcha_mode is not None:
+            self._captcha = Captcha(
+                bot=self._bot,
+                database_service=self._database_service,
+                mode=captcha_mode,
+                timeout=captcha_timeout,
+                options=captcha_options,
+                persistent=captcha_persistent,
+                kick_on_fail=captcha_kick_on_fail,
+                processes=captcha_processes,
+                shard=self._shard,
+                stats=self._stats,
+                scheduler=self._scheduler,
+            )
+        self._members_sync = ChatMembersSync(
+            bot=self._bot,
+            database_service=self._database_service,
+            policies=self._policies,
+            restrict=functools.partial(
+                MemberRestrictionFunction.restrict,
+                service=self,
+                audit_data={"sync": True},
+            ),
+            batch_size=sync_batch_size,
+            batch_delay=sync_batch_delay,
+            page_size=sync_page_size,
+            max_users=sync_max_users,
+        )
+        self._dispatcher = TrackingDispatcher(
             storage=DatabaseStorage(database_service=self._database_service),
         )
         if self._method == BotMethodEnum.POLLING:
             self._background_task = self._polling
         elif self._method == BotMethodEnum.WEBHOOK:
             self._background_task = self._webhook
+        elif self._method == BotMethodEnum.CLUSTER:
+            self._background_task = self._consuming
         else:
             available_methods = ", ".join(f"'{method.value}'" for method in BotMethodEnum)
             raise ValueError(
@@ -82,11 +227,65 @@ class Service(ServiceMixin):
     def bot(self) -> Bot:
         return self._bot
 
+    @property
+    def webhook_path(self) -> str:
+        return self._webhook_path
+
+    @property
+    def webhook_secret(self) -> str | None:
+        return self._webhook_secret
+
+    @property
+    def prefilter(self) -> UpdatePreFilter:
+        return self._prefilter
+
+    @property
+    def policies(self) -> PolicyCache:
+        return self._policies
+
+    @property
+    def filters(self) -> FilterCache:
+        return self._filters
+
+    @property
+    def scheduler(self) -> Scheduler:
+        return self._scheduler
+
+    @property
+    def captcha(self) -> Captcha | None:
+        return self._captcha
+
+    @property
+    def lanes(self) -> Lanes:
+        return self._lanes
+
+    @property
+    def stats(self) -> ChatStats:
+        return self._stats
+
+    @property
+    def admins(self) -> AdminCache:
+        return self._admins
+
     @property
     def dependencies(self) -> list[ServiceMixin]:
-        return [
+        dependencies = [
             self._database_service,
+            self._scheduler,
+            self._lanes,
+            self._stats,
+            self._admins,
         ]
+        if self._captcha is not None:
+            dependencies.append(self._captcha)
+        if self._monitoring_service is not None:
+            dependencies.append(self._monitoring_service)
+        return dependencies
+
+    @property
+    def graceful_shutdown_timeout(self) -> int:
+        # Draining updates is only a part of shutdown, dependencies must be stopped in time too
+        return math.ceil(self._shutdown_timeout) + 10
 
     async def service_middleware(
             self,
@@ -99,18 +298,18 @@ class Service(ServiceMixin):
 
     def setup_dispatcher(self):
         self._dispatcher.update.middleware()(self.service_middleware)
-
-        self._dispatcher.my_chat_member.register(
-            new_chat.new_chat_handler,
-            F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
-            ChatMemberUpdatedFilter(PROMOTED_TRANSITION),
-        )
-        self._dispatcher.chat_member.register(
-            new_member.new_member_handler,
-            F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
-            ChatMemberUpdatedFilter(JOIN_TRANSITION),
+        self._dispatcher.update.middleware()(self._lanes)
+        # Rosters follow every promotion and demotion, whatever handler the update goes to
+        self._dispatcher.chat_member.outer_middleware(self._admins)
+        self._dispatcher.my_chat_member.outer_middleware(self._admins)
+
+        register_handlers(dispatcher=self._dispatcher)
+        # Raw checks mirror registered handlers, Telegram sends only update types that are handled
+        setup_prefilter(
+            prefilter=self._prefilter,
+            dispatcher=self._dispatcher,
+            filters=self._filters,
         )
-        self._dispatcher.include_router(dialog.router)
 
     async def start(self):
         logger.info("[telegram] Start service")
@@ -118,7 +317,31 @@ class Service(ServiceMixin):
         me = await self._bot.me()
         self._me_id = me.id
 
-        self.add_task(self._background_task())
+        for chat_id in await self._database_service.get_unfinished_chat_syncs():
+            if self._shard is not None and chat_id % self._shard[1] != self._shard[0]:
+                continue
+            chat = await self._database_service.get_chat(id=chat_id)
+            if chat is not None:
+                self.sync_chat_members(chat=chat)
+
+        # Hosted webhook bots receive updates through application of hosting
+        if not (self._hosted and self._method == BotMethodEnum.WEBHOOK):
+            self.add_task(self._background_task())
+
+    def sync_chat_members(self, chat: Chat | ChatRecord):
+        if chat.telegram_id in self._sync_tasks:
+            logger.info("[telegram] Members sync already running: %d", chat.telegram_id)
+            return
+
+        self._sync_tasks[chat.telegram_id] = self.add_task(self._sync_chat_members(chat=chat))
+
+    async def _sync_chat_members(self, chat: Chat | ChatRecord):
+        try:
+            await self._members_sync.run(chat=chat)
+        except Exception:
+            logger.exception("[telegram] Members sync failed: %d", chat.telegram_id)
+        finally:
+            self._sync_tasks.pop(chat.telegram_id, None)
 
     async def _polling(self):
         logger.info("[telegram] Start bot")
@@ -127,23 +350,32 @@ class Service(ServiceMixin):
         await self._dispatcher.start_polling(
             self._bot,
             polling_timeout=self._polling_timeout,
+            allowed_updates=self._prefilter.allowed_updates,
             handle_signals=False,
+            close_bot_session=False,
         )
 
-    async def _webhook(self):
-        logger.info("[telegram] Start bot")
-
+    def setup_application(self, app: web.Application, register: bool = True) -> PreFilteredRequestHandler:
         self._dispatcher.startup.register(self._webhook_on_startup)
-        self._dispatcher.shutdown.register(self._webhook_on_shutdown)
 
-        app = web.Application()
-        request_handler = SimpleRequestHandler(
+        request_handler = PreFilteredRequestHandler(
             dispatcher=self._dispatcher,
             bot=self._bot,
             secret_token=self._webhook_secret,
+            update_filter=self._prefilter,
         )
-        request_handler.register(app, path=self._webhook_path)
+        if register:
+            request_handler.register(app, path=self._webhook_path)
         setup_application(app, self._dispatcher, bot=self._bot)
+        return request_handler
+
+    async def _webhook(self):
+        logger.info("[telegram] Start bot")
+
+        app = web.Application()
+        self.setup_application(app)
+        if self._monitoring_service is not None:
+            self._monitoring_service.setup_application(app)
 
         context = None
         if self._ssl_certificate and self._ssl_private_key:
@@ -151,59 +383,321 @@ class Service(ServiceMixin):
             context = ssl.SSLContext(ssl.PROTOCOL_TLSv1_2)
             context.load_cert_chain(self._ssl_certificate, self._ssl_private_key)
 
-        await web._run_app(app, port=self._server_port, ssl_context=context)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(
+            self._runner,
+            port=self._server_port,
+            ssl_context=context,
+            shutdown_timeout=self._shutdown_timeout,
+        )
+        await site.start()
+        await asyncio.Event().wait()
+
+    async def _consuming(self):
+        logger.info("[telegram] Start consuming updates of shard %d/%d", *self._shard)
+
+        loop = asyncio.get_running_loop()
+        while not self._consuming_stopped:
+            try:
+                # Short timeout lets executor thread finish soon after stop
+                update = await loop.run_in_executor(None, self._updates_queue.get, True, 0.5)
+            except queue.Empty:
+                continue
+            self._feed_in_order(update=update)
+
+    def _feed_in_order(self, update: dict[str, Any]):
+        # Updates of one chat wait for previous one, updates of different chats run concurrently
+        key = shard_key(update)
+        task = asyncio.create_task(self._feed(update=update, previous=self._chains.get(key)))
+        self._chains[key] = task
+        task.add_done_callback(functools.partial(self._release_chain, key))
+
+    async def _feed(self, update: dict[str, Any], previous: asyncio.Task | None):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await self._dispatcher.feed_raw_update(self._bot, update)
+        except Exception:
+            logger.exception("[telegram] Update processing failed: %d", update["update_id"])
+
+    def _release_chain(self, key: int, task: asyncio.Task):
+        if self._chains.get(key) is task:
+            del self._chains[key]
 
     async def _webhook_on_startup(self, bot: Bot):
         url = f"{self._webhook_url}{self._webhook_path}"
         logger.info("[telegram] Set webhook: %s", url)
 
-        await bot.set_webhook(url, secret_token=self._webhook_secret)
-
-    async def _webhook_on_shutdown(self, bot: Bot):
-        logger.info("[telegram] Delete webhook")
+        await bot.set_webhook(
+            url,
+            secret_token=self._webhook_secret,
+            allowed_updates=self._prefilter.allowed_updates,
+        )
 
-        await bot.delete_webhook()
+    async def stop(self):
+        logger.info("[telegram] Stop service")
 
-    async def get_chat(self, id: int) -> Chat | None:
-        chat = await self._database_service.get_chat(id=id)
-     
-        if chat is not None:
-            return chat
+        await self._stop_intake()
+        drained = await self._drain()
+        if drained and self._method == BotMethodEnum.POLLING:
+            await self._commit_offset()
 
-        admins = await self._bot.get_chat_administrators(chat_id=id)
-        in_admins, owner = False, None
-        for admin in admins:
-            if admin.user.id == self._me_id:
-                in_admins = True
-            if admin.status == ChatMemberStatus.CREATOR:
-                owner = admin.user
+        await self._bot.session.close()
 
-            if not in_admins or not owner:
-                continue
+    async def _stop_intake(self):
+        logger.info("[telegram] Stop receiving updates")
 
-            owner = await self._database_service.get_or_create_user(
-                id=owner.id,
-                full_name=owner.full_name,
+        if self._method == BotMethodEnum.POLLING:
+            try:
+                await self._dispatcher.stop_polling()
+            except RuntimeError:
+                pass
+        elif self._method == BotMethodEnum.CLUSTER:
+            # Leader has already confirmed queued updates, so process them before exit
+            self._consuming_stopped = True
+            while True:
+                try:
+                    update = self._updates_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._feed_in_order(update=update)
+        elif self._runner is not None:
+            # Webhook is left registered: during rolling deploy it already points to new replica
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _drain(self) -> bool:
+        if self._chains:
+            await asyncio.wait(list(self._chains.values()), timeout=self._shutdown_timeout)
+        # Let update tasks created right before stop reach the dispatcher
+        await asyncio.sleep(0)
+        if self._dispatcher.in_flight:
+            logger.info("[telegram] Wait for %d updates in progress", self._dispatcher.in_flight)
+        try:
+            await asyncio.wait_for(self._dispatcher.wait_idle(), timeout=self._shutdown_timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                "[telegram] Updates were not processed in time: %d", self._dispatcher.in_flight,
             )
-            return await self._database_service.add_new_chat(id=id, owner=owner)
+            return False
+        return True
+
+    async def _commit_offset(self):
+        # Telegram confirms updates on next getUpdates call only, confirm processed ones now so
+        # next instance does not receive them again
+        last_update_id = self._dispatcher.last_update_id
+        if last_update_id is None:
+            return
+
+        try:
+            await self._bot.get_updates(offset=last_update_id + 1, limit=1, timeout=0)
+        except TelegramAPIError as exception:
+            logger.error("[telegram] Polling offset was not committed: %s", exception)
+
+    async def get_chat(self, id: int, title: str | None = None) -> ChatRecord | None:
+        chat = await self._database_service.get_chat_record(id=id)
+     
+        if chat is not None:
+            return chat
 
+        roster = await self._admins.get(chat_id=id)
+        if roster is None or self._me_id not in roster.admin_ids or roster.owner_id is None:
+            return None
 
-def get_service(database_service: database.Service, settings: Settings) -> Service:
+        owner = await self._bot.get_chat_member(chat_id=id, user_id=roster.owner_id)
+        owner = await self._database_service.get_or_create_user(
+            id=owner.user.id,
+            full_name=owner.user.full_name,
+        )
+        chat = await self._database_service.add_new_chat(id=id, owner=owner, title=title)
+        return ChatRecord.from_chat(chat)
+
+
+def register_handlers(dispatcher: Dispatcher):
+    dispatcher.my_chat_member.register(
+        new_chat.new_chat_handler,
+        F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
+        ChatMemberUpdatedFilter(PROMOTED_TRANSITION),
+    )
+    dispatcher.my_chat_member.register(
+        new_chat.left_chat_handler,
+        F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
+        ChatMemberUpdatedFilter(LEAVE_TRANSITION),
+    )
+    dispatcher.chat_member.register(
+        new_member.new_member_handler,
+        F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
+        ChatMemberUpdatedFilter(JOIN_TRANSITION),
+    )
+    dispatcher.callback_query.register(
+        captcha.captcha_callback_handler,
+        CaptchaCallbackData.filter(),
+    )
+    dispatcher.message.register(
+        new_chat.chat_title_handler,
+        F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
+        F.new_chat_title,
+    )
+    dispatcher.message.register(
+        message_filter.message_filter_handler,
+        F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
+    )
+    dispatcher.edited_message.register(
+        message_filter.message_filter_handler,
+        F.chat.type.in_([ChatType.GROUP, ChatType.SUPERGROUP]),
+    )
+    dispatcher.include_router(dialog.get_router())
+
+
+def setup_prefilter(
+        prefilter: UpdatePreFilter,
+        dispatcher: Dispatcher,
+        filters: FilterCache | None = None,
+):
+    prefilter.allow(dispatcher.resolve_used_update_types())
+    prefilter.register(
+        "message",
+        functools.partial(check_message, filters=filters, private=True),
+    )
+    prefilter.register(
+        "edited_message",
+        functools.partial(check_message, filters=filters, private=False),
+    )
+
+
+def get_polling_bot(settings: Settings) -> tuple[Bot, UpdatePreFilter]:
+    # Cluster leader only polls, so it needs neither handlers nor caches, scheduler and captcha
+    # of a full service: dispatcher is built to know which update types are handled
+    dispatcher = Dispatcher()
+    register_handlers(dispatcher=dispatcher)
+    prefilter = UpdatePreFilter()
+    setup_prefilter(prefilter=prefilter, dispatcher=dispatcher)
+    bot = Bot(
+        token=settings.token,
+        session=PooledSession(
+            limit=settings.session.limit,
+            limit_per_host=settings.session.limit_per_host,
+            keepalive_timeout=settings.session.keepalive_timeout,
+            dns_cache_ttl=settings.session.dns_cache_ttl,
+            timeout=settings.session.timeout,
+            json_library=settings.session.json_library,
+            update_filter=prefilter,
+        ),
+    )
+    return bot, prefilter
+
+
+def _get_parameters(settings: Settings) -> dict[str, Any]:
     parameters = {
-        "database_service": database_service,
-        "token": settings.token,
         "method": settings.method,
+        "session_limit": settings.session.limit,
+        "session_limit_per_host": settings.session.limit_per_host,
+        "session_keepalive_timeout": settings.session.keepalive_timeout,
+        "session_dns_cache_ttl": settings.session.dns_cache_ttl,
+        "session_timeout": settings.session.timeout,
+        "session_json_library": settings.session.json_library,
+        "sync_batch_size": settings.sync.batch_size,
+        "sync_batch_delay": settings.sync.batch_delay,
+        "sync_page_size": settings.sync.page_size,
+        "sync_max_users": settings.sync.max_users,
+        "scheduler_tick": settings.scheduler.tick,
+        "scheduler_reload_interval": settings.scheduler.reload_interval,
+        "scheduler_batch_size": settings.scheduler.batch_size,
+        "scheduler_batch_delay": settings.scheduler.batch_delay,
+        "scheduler_retry_delay": settings.scheduler.retry_delay,
+        "scheduler_max_attempts": settings.scheduler.max_attempts,
+        "stats_flush_interval": settings.stats.flush_interval,
+        "admins_reconcile_interval": settings.admins.reconcile_interval,
+        "admins_reconcile_batch_size": settings.admins.reconcile_batch_size,
+        "admins_reconcile_batch_delay": settings.admins.reconcile_batch_delay,
+        "shutdown_timeout": settings.shutdown_timeout,
     }
     if settings.polling is not None:
         parameters.update({
             "polling_timeout": settings.polling.timeout,
         })
+    if settings.captcha is not None:
+        parameters.update({
+            "captcha_mode": settings.captcha.mode,
+            "captcha_timeout": settings.captcha.timeout,
+            "captcha_options": settings.captcha.options,
+            "captcha_persistent": settings.captcha.persistent,
+            "captcha_kick_on_fail": settings.captcha.kick_on_fail,
+            "captcha_processes": settings.captcha.processes,
+        })
     if settings.webhook is not None:
         parameters.update({
             "webhook_url": settings.webhook.url,
             "webhook_path": settings.webhook.path,
             "webhook_secret": settings.webhook.secret,
             "server_port": settings.webhook.server_port,
+            "ssl_certificate": settings.webhook.ssl_certificate,
+            "ssl_private_key": settings.webhook.ssl_private_key,
         })
-    
-    return Service(**parameters)
+    return parameters
+
+
+def get_service(
+        database_service: database.Service,
+        settings: Settings,
+        monitoring_service: monitoring.Service | None = None,
+        shard: tuple[int, int] | None = None,
+        updates_queue: multiprocessing.queues.Queue | None = None,
+) -> Service | Hosting:
+    parameters = _get_parameters(settings=settings)
+    lanes = Lanes(
+        limits=settings.lanes.get_limits(),
+        report_interval=settings.lanes.report_interval,
+    )
+    if settings.token is not None:
+        return Service(
+            database_service=database_service,
+            monitoring_service=monitoring_service,
+            token=settings.token,
+            lanes=lanes,
+            shard=shard,
+            updates_queue=updates_queue,
+            **parameters,
+        )
+
+    policies = PolicyCache(database_service=database_service)
+    filters = FilterCache(database_service=database_service)
+    scheduler = Scheduler(
+        database_service=database_service,
+        tick=settings.scheduler.tick,
+        reload_interval=settings.scheduler.reload_interval,
+        batch_size=settings.scheduler.batch_size,
+        batch_delay=settings.scheduler.batch_delay,
+        retry_delay=settings.scheduler.retry_delay,
+        max_attempts=settings.scheduler.max_attempts,
+    )
+    services = []
+    for bot in settings.bots:
+        bot_parameters = dict(parameters)
+        if bot.webhook_path is not None:
+            bot_parameters["webhook_path"] = bot.webhook_path
+        if bot.webhook_secret is not None:
+            bot_parameters["webhook_secret"] = bot.webhook_secret
+        services.append(Service(
+            database_service=database_service,
+            token=bot.token,
+            policies=policies,
+            filters=filters,
+            scheduler=scheduler,
+            lanes=lanes,
+            hosted=True,
+            **bot_parameters,
+        ))
+
+    return Hosting(
+        database_service=database_service,
+        services=services,
+        scheduler=scheduler,
+        method=settings.method,
+        server_port=parameters.get("server_port", 8443),
+        ssl_certificate=parameters.get("ssl_certificate"),
+        ssl_private_key=parameters.get("ssl_private_key"),
+        shutdown_timeout=settings.shutdown_timeout,
+        monitoring_service=monitoring_service,
+    )
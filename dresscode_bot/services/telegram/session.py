@@ -0,0 +1,73 @@
+import json
+from http import HTTPStatus
+from typing import Any, Callable
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import ClientDecodeError
+from aiogram.methods import GetUpdates, Response, TelegramMethod
+from aiogram.types import Update
+from pydantic import ValidationError
+
+from .enums import JsonLibraryEnum
+
+
+def get_json_functions(library: JsonLibraryEnum) -> tuple[Callable[..., Any], Callable[..., str]]:
+    if library == JsonLibraryEnum.ORJSON:
+        import orjson
+
+        # aiogram puts dumped values into form fields and web responses, so it expects str
+        return orjson.loads, lambda value: orjson.dumps(value).decode()
+    return json.loads, json.dumps
+
+
+class PooledSession(AiohttpSession):
+    def __init__(
+            self,
+            limit: int = 100,
+            limit_per_host: int = 0,
+            keepalive_timeout: float = 15.0,
+            dns_cache_ttl: int | None = 10,
+            timeout: float = 60.0,
+            json_library: JsonLibraryEnum = JsonLibraryEnum.JSON,
+            update_filter: Callable[[dict[str, Any]], bool] | None = None,
+    ):
+        self._update_filter = update_filter
+        json_loads, json_dumps = get_json_functions(library=json_library)
+        super().__init__(json_loads=json_loads, json_dumps=json_dumps, timeout=timeout)
+
+        # Connector is created lazily by aiogram from these parameters
+        self._connector_init.update({
+            "limit": limit,
+            "limit_per_host": limit_per_host,
+            "keepalive_timeout": keepalive_timeout,
+            "ttl_dns_cache": dns_cache_ttl,
+            "use_dns_cache": dns_cache_ttl is not None,
+        })
+
+    def check_response(
+            self,
+            bot: Bot,
+            method: TelegramMethod,
+            status_code: int,
+            content: str,
+    ) -> Response:
+        if self._update_filter is None or not isinstance(method, GetUpdates) or status_code != HTTPStatus.OK:
+            return super().check_response(bot=bot, method=method, status_code=status_code, content=content)
+
+        try:
+            json_data = self.json_loads(content)
+        except Exception:
+            return super().check_response(bot=bot, method=method, status_code=status_code, content=content)
+        updates = json_data.get("result") if isinstance(json_data, dict) else None
+        if not isinstance(updates, list) or not json_data.get("ok"):
+            return super().check_response(bot=bot, method=method, status_code=status_code, content=content)
+
+        # Polling offset is taken from the last yielded update, so the last one is always kept,
+        # otherwise dropped tail would be received again and again
+        json_data["result"] = [update for update in updates[:-1] if self._update_filter(update)]
+        json_data["result"].extend(updates[-1:])
+        try:
+            return Response[list[Update]].model_validate(json_data, context={"bot": bot})
+        except ValidationError as exception:
+            raise ClientDecodeError("Failed to deserialize object", exception, json_data)
@@ -1,9 +1,10 @@
+import importlib.util
 from pathlib import Path
 
-from pydantic import PositiveInt, conint, model_validator
+from pydantic import PositiveInt, confloat, conint, model_validator
 from pydantic_settings import BaseSettings
 
-from .enums import BotMethodEnum
+from .enums import BotMethodEnum, CaptchaModeEnum, JsonLibraryEnum, LaneEnum
 
 
 class WebhookSettings(BaseSettings):
@@ -19,15 +20,146 @@ class PollingSettings(BaseSettings):
     timeout: PositiveInt = 10
 
 
-class Settings(BaseSettings):
+class ClusterSettings(BaseSettings):
+    workers: PositiveInt = 2
+    queue_size: PositiveInt = 10000
+    lease_ttl: confloat(gt=0) = 15.0
+
+
+class SessionSettings(BaseSettings):
+    limit: conint(ge=0) = 100
+    limit_per_host: conint(ge=0) = 0
+    keepalive_timeout: confloat(gt=0) = 15.0
+    dns_cache_ttl: conint(ge=0) | None = 10
+    timeout: confloat(gt=0) = 60.0
+    json_library: JsonLibraryEnum = JsonLibraryEnum.JSON
+
+
+class LaneSettings(BaseSettings):
+    concurrency: PositiveInt = 16
+    queue_size: PositiveInt | None = None
+
+
+class LanesSettings(BaseSettings):
+    moderation: LaneSettings = LaneSettings(concurrency=16)
+    dialog: LaneSettings = LaneSettings(concurrency=8, queue_size=1000)
+    other: LaneSettings = LaneSettings(concurrency=4, queue_size=1000)
+    report_interval: confloat(gt=0) | None = 60.0
+
+    @model_validator(mode="after")
+    def model_validator(cls, values: "LanesSettings"):
+        # Dropped join updates are never redelivered, so joiners would stay unmoderated
+        if values.moderation.queue_size is not None:
+            raise ValueError("field 'moderation' can not have a 'queue_size' limit")
+
+        return values
+
+    def get_limits(self) -> dict[LaneEnum, tuple[int, int | None]]:
+        return {
+            name: (lane.concurrency, lane.queue_size)
+            for name, lane in (
+                (LaneEnum.MODERATION, self.moderation),
+                (LaneEnum.DIALOG, self.dialog),
+                (LaneEnum.OTHER, self.other),
+            )
+        }
+
+
+class SyncSettings(BaseSettings):
+    batch_size: PositiveInt = 20
+    batch_delay: confloat(ge=0) = 1.0
+    page_size: PositiveInt = 500
+    max_users: PositiveInt | None = 10000
+
+
+class SchedulerSettings(BaseSettings):
+    tick: confloat(gt=0) = 1.0
+    reload_interval: confloat(gt=0) = 600.0
+    batch_size: PositiveInt = 20
+    batch_delay: confloat(ge=0) = 1.0
+    retry_delay: confloat(gt=0) = 10.0
+    max_attempts: PositiveInt = 5
+
+    @model_validator(mode="after")
+    def model_validator(cls, values: "SchedulerSettings"):
+        # Timing wheel of scheduler covers 59 rounds of 60 ticks, actions are loaded for horizon
+        # minus reload interval ahead, so interval must leave a part of horizon to load
+        horizon = values.tick * 60 * 59
+        if values.reload_interval > horizon / 2:
+            raise ValueError(
+                f"field 'reload_interval' must not exceed half of scheduler horizon: {horizon / 2}",
+            )
+
+        return values
+
+
+class StatsSettings(BaseSettings):
+    flush_interval: confloat(gt=0) = 60.0
+
+
+class AdminsSettings(BaseSettings):
+    reconcile_interval: confloat(gt=0) = 3600.0
+    reconcile_batch_size: PositiveInt = 20
+    reconcile_batch_delay: confloat(ge=0) = 1.0
+
+
+class CaptchaSettings(BaseSettings):
+    mode: CaptchaModeEnum = CaptchaModeEnum.BUTTON
+    timeout: PositiveInt = 120
+    options: conint(ge=2, le=8) = 4
+    persistent: bool = False
+    kick_on_fail: bool = False
+    processes: PositiveInt = 1
+
+    @model_validator(mode="after")
+    def model_validator(cls, values: "CaptchaSettings"):
+        # Images are rendered in worker processes, missing Pillow would fail every join there
+        if values.mode == CaptchaModeEnum.IMAGE and importlib.util.find_spec("PIL") is None:
+            raise ValueError(
+                "field 'mode' with 'image' value requires 'captcha' extra to be installed",
+            )
+
+        return values
+
+
+class BotSettings(BaseSettings):
     token: str
+    webhook_path: str | None = None
+    webhook_secret: str | None = None
+
+
+class Settings(BaseSettings):
+    token: str | None = None
+    bots: list[BotSettings] = []
     method: BotMethodEnum = BotMethodEnum.POLLING
     webhook: WebhookSettings | None = None
     polling: PollingSettings = PollingSettings()
+    cluster: ClusterSettings = ClusterSettings()
+    session: SessionSettings = SessionSettings()
+    lanes: LanesSettings = LanesSettings()
+    sync: SyncSettings = SyncSettings()
+    scheduler: SchedulerSettings = SchedulerSettings()
+    stats: StatsSettings = StatsSettings()
+    admins: AdminsSettings = AdminsSettings()
+    captcha: CaptchaSettings | None = None
+    shutdown_timeout: confloat(gt=0) = 5.0
 
     @model_validator(mode="after")
     def model_validator(cls, values: "Settings"):
         if values.method == BotMethodEnum.WEBHOOK and values.webhook is None:
             raise ValueError("field 'method' with 'webhook' value must have a 'webhook' settings")
+        if (values.token is None) == (not values.bots):
+            raise ValueError("one of fields 'token' and 'bots' must be set")
+        if values.method == BotMethodEnum.CLUSTER and values.bots:
+            raise ValueError("field 'method' with 'cluster' value can be used with 'token' only")
+        if values.method == BotMethodEnum.WEBHOOK and values.bots:
+            # Bots on the same path are told apart by secret token only
+            routes = {}
+            for bot in values.bots:
+                path = bot.webhook_path or values.webhook.path
+                routes.setdefault(path, []).append(bot.webhook_secret or values.webhook.secret)
+            for path, secrets in routes.items():
+                if len(secrets) > 1 and (None in secrets or len(set(secrets)) != len(secrets)):
+                    raise ValueError(f"bots on webhook path '{path}' must have different secrets")
 
         return values
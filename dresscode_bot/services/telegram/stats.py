@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+
+from facet import ServiceMixin
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.models import ChatStatKindEnum
+
+
+logger = logging.getLogger(__name__)
+
+
+class ChatStats(ServiceMixin):
+    # Counters are kept per hour in memory and added to rollup tables periodically, so handlers do
+    # not touch database and stats screen reads prepared daily rows only
+    def __init__(self, database_service: database.Service, flush_interval: float = 60.0):
+        self._database_service = database_service
+        self._flush_interval = flush_interval
+        self._counters: Counter[tuple[int, datetime, ChatStatKindEnum]] = Counter()
+
+    @property
+    def dependencies(self) -> list[ServiceMixin]:
+        return [
+            self._database_service,
+        ]
+
+    def increment(self, chat_id: int, kind: ChatStatKindEnum, value: int = 1):
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        self._counters[(chat_id, hour, kind)] += value
+
+    async def start(self):
+        logger.info("[stats] Start service")
+
+        self.add_task(self._flushing())
+
+    async def stop(self):
+        await self.flush()
+
+    async def flush(self):
+        counters, self._counters = self._counters, Counter()
+        if not counters:
+            return
+
+        try:
+            await self._database_service.add_chat_stats(counters=counters)
+        except Exception:
+            # Keep counters to add them with the next flush
+            logger.exception("[stats] Counters were not saved: %d", len(counters))
+            self._counters.update(counters)
+
+    async def _flushing(self):
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self.flush()
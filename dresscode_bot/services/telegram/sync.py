@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.enums import ChatMemberStatus
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import ChatMember
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.models import Chat
+from dresscode_bot.services.database.records import ChatRecord
+from .policy import DEFAULT_POLICY, PolicyCache
+
+
+logger = logging.getLogger(__name__)
+
+# Called with chat_id and user_id, restricts member by policy of chat
+RestrictMember = Callable[..., Awaitable[bool | None]]
+
+
+class ChatMembersSync:
+    def __init__(
+            self,
+            bot: Bot,
+            database_service: database.Service,
+            policies: PolicyCache,
+            restrict: RestrictMember,
+            batch_size: int = 20,
+            batch_delay: float = 1.0,
+            page_size: int = 500,
+            max_users: int | None = 10000,
+    ):
+        self._bot = bot
+        self._database_service = database_service
+        self._policies = policies
+        self._restrict_member = restrict
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+        self._page_size = page_size
+        self._max_users = max_users
+
+    async def _call(self, method: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            try:
+                return await method()
+            except TelegramRetryAfter as exception:
+                logger.warning("[sync] Flood control, retry after %d seconds", exception.retry_after)
+                await asyncio.sleep(exception.retry_after)
+            except TelegramAPIError as exception:
+                logger.warning("[sync] Telegram API error: %s", exception)
+                return None
+
+    async def _get_chat_member(self, chat: Chat | ChatRecord, user_id: int) -> ChatMember | None:
+        return await self._call(lambda: self._bot.get_chat_member(
+            chat_id=chat.telegram_id,
+            user_id=user_id,
+        ))
+
+    async def _restrict(self, chat: Chat | ChatRecord, user_id: int) -> bool:
+        # Same path as for joined members: audit event and scheduled lifting of restriction
+        return bool(await self._call(lambda: self._restrict_member(
+            chat_id=chat.telegram_id,
+            user_id=user_id,
+        )))
+
+    async def import_administrators(self, chat: Chat | ChatRecord):
+        administrators = await self._call(
+            lambda: self._bot.get_chat_administrators(chat_id=chat.telegram_id),
+        ) or []
+        members = [
+            (administrator.user.id, administrator.user.full_name)
+            for administrator in administrators
+            if not administrator.user.is_bot and administrator.user.id != chat.owner_id
+        ]
+        await self._database_service.add_chat_members(chat=chat, members=members)
+        logger.info("[sync] [%d] Administrators imported: %d", chat.telegram_id, len(members))
+
+    async def sync_batch(self, chat: Chat | ChatRecord, users: list[tuple[int, str]]) -> int:
+        chat_members = await asyncio.gather(*(
+            self._get_chat_member(chat=chat, user_id=user_id)
+            for user_id, _ in users
+        ))
+        policy = await self._policies.get(chat_id=chat.telegram_id)
+        # Join time default mutes everybody for good, it is not applied to people already in chat
+        restrict = policy is not DEFAULT_POLICY
+        members, to_restrict = [], []
+        for (user_id, full_name), chat_member in zip(users, chat_members):
+            if chat_member is None or user_id == chat.owner_id:
+                continue
+            if chat_member.status in (ChatMemberStatus.LEFT, ChatMemberStatus.KICKED):
+                continue
+            if chat_member.status == ChatMemberStatus.RESTRICTED and not chat_member.is_member:
+                continue
+            members.append((user_id, full_name))
+            if chat_member.status != ChatMemberStatus.MEMBER:
+                continue
+            if restrict and policy.decide(user_id=user_id) is not None:
+                to_restrict.append(user_id)
+
+        await self._database_service.add_chat_members(chat=chat, members=members)
+        results = await asyncio.gather(*(
+            self._restrict(chat=chat, user_id=user_id)
+            for user_id in to_restrict
+        ))
+        restricted = sum(results)
+        if restricted != len(to_restrict):
+            logger.error(
+                "[sync] [%d] Restrictions was not added: %d",
+                chat.telegram_id, len(to_restrict) - restricted,
+            )
+        return len(members)
+
+    async def run(self, chat: Chat | ChatRecord):
+        chat_sync = await self._database_service.get_chat_sync(chat_id=chat.telegram_id)
+        cursor = 0 if chat_sync is None or chat_sync.finished else chat_sync.cursor
+        # Every known user costs one getChatMember call, so one promotion checks limited number
+        expected = await self._database_service.count_users(after_id=cursor)
+        if self._max_users is not None:
+            expected = min(expected, self._max_users)
+        logger.info(
+            "[sync] [%d] Start members sync from cursor %d, expected calls: %d",
+            chat.telegram_id, cursor, expected,
+        )
+        await self._database_service.set_chat_sync_cursor(chat_id=chat.telegram_id, cursor=cursor)
+
+        await self.import_administrators(chat=chat)
+
+        imported, checked = 0, 0
+        while checked < expected and (users := await self._database_service.get_users_page(
+                after_id=cursor,
+                limit=min(self._page_size, expected - checked),
+        )):
+            for start in range(0, len(users), self._batch_size):
+                batch = users[start:start + self._batch_size]
+                checked += len(batch)
+                imported += await self.sync_batch(chat=chat, users=batch)
+                cursor = batch[-1][0]
+                await self._database_service.set_chat_sync_cursor(
+                    chat_id=chat.telegram_id,
+                    cursor=cursor,
+                )
+                await asyncio.sleep(self._batch_delay)
+
+        await self._database_service.set_chat_sync_cursor(
+            chat_id=chat.telegram_id,
+            cursor=cursor,
+            finished=True,
+        )
+        logger.info("[sync] [%d] Members sync finished, imported: %d", chat.telegram_id, imported)
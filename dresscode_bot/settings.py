@@ -4,11 +4,13 @@ import yaml
 from pydantic_settings import BaseSettings
 
 from .services import database, telegram
+from .services.monitoring import Settings as MonitoringSettings
 
 
 class Settings(BaseSettings):
     database: database.Settings
     telegram: telegram.Settings
+    monitoring: MonitoringSettings | None = None
 
 
 def get_settings(config_path: Path | None = None) -> Settings:
@@ -0,0 +1,99 @@
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import RestrictChatMember
+from aiogram.types import ChatPermissions
+
+from dresscode_bot.services.database.models import ChatStatKindEnum, ScheduledActionKindEnum
+
+
+class Policy:
+    def __init__(self, duration: int | None = None):
+        self.duration = duration
+
+    def decide(self, user_id: int) -> ChatPermissions:
+        return ChatPermissions(can_send_messages=False)
+
+
+class Policies:
+    def __init__(self):
+        self.policy = Policy()
+
+    async def get(self, chat_id: int) -> Policy:
+        return self.policy
+
+
+class Stats:
+    def __init__(self):
+        self.counts = Counter()
+
+    def increment(self, chat_id: int, kind: ChatStatKindEnum):
+        self.counts[chat_id, kind] += 1
+
+
+class Bot:
+    id = 1
+
+    def __init__(self):
+        self.fail = False
+        self.permissions = []
+
+    async def restrict_chat_member(
+            self,
+            chat_id: int,
+            user_id: int,
+            permissions: ChatPermissions,
+            **kwargs,
+    ) -> bool:
+        if self.fail:
+            method = RestrictChatMember(chat_id=chat_id, user_id=user_id, permissions=permissions)
+            raise TelegramBadRequest(method=method, message="Bad Request: not enough rights")
+        self.permissions.append(permissions)
+        return True
+
+
+class Database:
+    def record_audit_event(self, **kwargs):
+        pass
+
+    async def get_user_record(self, id: int) -> None:
+        return None
+
+
+class Scheduler:
+    def __init__(self):
+        self.actions = []
+
+    async def cancel(self, kind: ScheduledActionKindEnum, chat_id: int, user_id: int) -> int:
+        cancelled = [action for action in self.actions if action == (kind, chat_id, user_id)]
+        self.actions = [action for action in self.actions if action not in cancelled]
+        return len(cancelled)
+
+    async def schedule(self, kind: ScheduledActionKindEnum, chat_id: int, user_id: int, **kwargs):
+        self.actions.append((kind, chat_id, user_id))
+
+
+class Service:
+    def __init__(self):
+        self.bot = Bot()
+        self.policies = Policies()
+        self.stats = Stats()
+        self.database = Database()
+        self.scheduler = Scheduler()
+        self.captcha = None
+
+    async def get_chat(self, id: int, title: str | None = None) -> SimpleNamespace:
+        return SimpleNamespace(telegram_id=id, title=title)
+
+
+@pytest.fixture
+def service() -> Service:
+    return Service()
+
+
+@pytest.fixture
+def dsn(tmp_path: Path) -> str:
+    return f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"
@@ -0,0 +1,33 @@
+import asyncio
+
+from dresscode_bot.services import database
+
+
+USERS = 20
+
+
+async def stop_with_pending_writes(dsn: str) -> list:
+    database_service = database.Service(dsn=dsn, write_batch_size=5, write_batch_delay=0.05)
+    await database_service.migrate_async()
+    async with database_service:
+        writes = [
+            asyncio.create_task(database_service.add_new_user(id=id, full_name=f"user {id}"))
+            for id in range(1, USERS + 1)
+        ]
+        # Writes are queued, batcher has not committed them yet
+        await asyncio.sleep(0)
+    return await asyncio.gather(*writes, return_exceptions=True)
+
+
+async def count_users(dsn: str) -> int:
+    database_service = database.Service(dsn=dsn)
+    users = await database_service.get_users_page(limit=USERS * 2)
+    await database_service.stop()
+    return len(users)
+
+
+def test_stop_commits_queued_writes(dsn: str):
+    results = asyncio.run(stop_with_pending_writes(dsn=dsn))
+
+    assert not [result for result in results if isinstance(result, BaseException)]
+    assert asyncio.run(count_users(dsn=dsn)) == USERS
@@ -0,0 +1,63 @@
+import asyncio
+from types import SimpleNamespace
+
+from dresscode_bot.services.database.models import LanguageEnum
+from dresscode_bot.services.telegram.captcha import CaptchaCallbackData
+from dresscode_bot.services.telegram.handlers.captcha import captcha_callback_handler
+
+
+class Database:
+    def __init__(self, language: LanguageEnum | None):
+        self.language = language
+
+    async def get_user_record(self, id: int) -> SimpleNamespace | None:
+        if self.language is None:
+            return None
+        return SimpleNamespace(telegram_id=id, language=self.language)
+
+
+class Captcha:
+    async def solve(self, chat_id: int, user_id: int, answer: str) -> bool | None:
+        return None
+
+
+class Callback:
+    def __init__(self, language_code: str | None):
+        self.message = SimpleNamespace(chat=SimpleNamespace(id=-100, full_name="chat"))
+        self.from_user = SimpleNamespace(id=5, full_name="user", language_code=language_code)
+        self.answers = []
+
+    async def answer(self, text: str, show_alert: bool = False):
+        self.answers.append(text)
+
+
+def answer(
+        language: LanguageEnum | None,
+        language_code: str | None,
+        user_id: int = 5,
+        captcha: Captcha | None = Captcha(),
+) -> str:
+    callback = Callback(language_code=language_code)
+    service = SimpleNamespace(database=Database(language=language), captcha=captcha)
+    asyncio.run(captcha_callback_handler(
+        callback=callback,
+        callback_data=CaptchaCallbackData(user_id=user_id, answer="AAAA"),
+        service=service,
+    ))
+    return callback.answers[0]
+
+
+def test_answer_uses_client_language():
+    assert answer(language=None, language_code="en-US") == "Check is already finished"
+    assert answer(language=None, language_code=None) == "Проверка уже завершена"
+
+
+def test_answer_uses_saved_language():
+    assert answer(language=LanguageEnum.ENGLISH, language_code="ru") == "Check is already finished"
+    assert answer(language=LanguageEnum.RUSSIAN, language_code="en", user_id=6) == (
+        "Эта проверка не для Вас"
+    )
+
+
+def test_answer_without_captcha():
+    assert answer(language=None, language_code="en", captcha=None) == "Check is already finished"
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+import yaml
+from typer.testing import CliRunner
+
+from dresscode_bot.cli import get_cli
+from dresscode_bot.services import database
+from dresscode_bot.services.telegram.functions.filter import FilterCache
+from dresscode_bot.services.telegram.policy import PolicyCache
+
+
+CHAT_ID = -1001234567890
+OWNER_ID = 7
+
+
+@pytest.fixture
+def dsn(tmp_path: Path) -> str:
+    return f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"
+
+
+@pytest.fixture
+def invoke(tmp_path: Path, dsn: str):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({
+        "database": {"dsn": dsn},
+        "telegram": {"token": "1:token"},
+    }))
+    runner = CliRunner()
+
+    def invoke(*args: str):
+        return runner.invoke(get_cli(), ["--config", str(config_path), *args])
+
+    assert invoke("database", "migrations", "migrate").exit_code == 0
+
+    async def add_chat():
+        database_service = database.Service(dsn=dsn)
+        owner = await database_service.get_or_create_user(id=OWNER_ID, full_name="owner")
+        await database_service.add_new_chat(id=CHAT_ID, owner=owner)
+        await database_service.stop()
+
+    asyncio.run(add_chat())
+    return invoke
+
+
+def test_filter_rule_is_applied(invoke, dsn: str):
+    result = invoke("chats", "filter", "add", "--chat", str(CHAT_ID), "regex", r"buy\s+now")
+    assert result.exit_code == 0, result.output
+
+    async def get_filter():
+        database_service = database.Service(dsn=dsn)
+        compiled_filter = await FilterCache(database_service=database_service).get(chat_id=CHAT_ID)
+        await database_service.stop()
+        return compiled_filter
+
+    compiled_filter = asyncio.run(get_filter())
+    assert compiled_filter.match_text("Buy  NOW")
+    assert not compiled_filter.match_text("hello")
+
+    result = invoke("chats", "filter", "list", "--chat", str(CHAT_ID))
+    rule_id = result.output.split()[0]
+    assert invoke("chats", "filter", "remove", "--chat", str(CHAT_ID), rule_id).exit_code == 0
+    assert not asyncio.run(get_filter())
+
+
+def test_incorrect_regex_is_rejected(invoke):
+    result = invoke("chats", "filter", "add", "--chat", str(CHAT_ID), "regex", "(unclosed")
+
+    assert result.exit_code != 0
+    assert invoke("chats", "filter", "list", "--chat", str(CHAT_ID)).output == ""
+
+
+def test_policy_is_applied(invoke, dsn: str):
+    result = invoke(
+        "chats", "policy", "set",
+        "--chat", str(CHAT_ID),
+        "--permission", "can_send_messages",
+        "--whitelist", "42",
+        "--window", "22:00-08:00",
+        "--duration", "600",
+    )
+    assert result.exit_code == 0, result.output
+
+    async def get_policy():
+        database_service = database.Service(dsn=dsn)
+        policy = await PolicyCache(database_service=database_service).get(chat_id=CHAT_ID)
+        await database_service.stop()
+        return policy
+
+    policy = asyncio.run(get_policy())
+    night = datetime(2026, 1, 1, 23, 0, tzinfo=timezone.utc)
+    day = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    permissions = policy.decide(user_id=5, now=night)
+    assert permissions.can_send_messages and not permissions.can_send_photos
+    assert policy.decide(user_id=5, now=day) is None
+    assert policy.decide(user_id=42, now=night) is None
+    assert policy.duration == 600
+
+
+def test_unknown_chat_is_rejected(invoke):
+    result = invoke("chats", "filter", "add", "--chat", "-1", "word", "spam")
+
+    assert result.exit_code == 1
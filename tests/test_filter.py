@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from dresscode_bot.services.database.models import FilterRuleKindEnum
+from dresscode_bot.services.telegram.functions.filter import compile_filter
+
+
+def regex_rules(*patterns: str) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(id=id, kind=FilterRuleKindEnum.REGEX, pattern=pattern)
+        for id, pattern in enumerate(patterns, start=1)
+    ]
+
+
+def test_inline_global_flag_after_other_rule():
+    compiled_filter = compile_filter(regex_rules(r"buy\s+now", "(?s)spam.+offer"))
+
+    assert compiled_filter.match_text("BUY  now")
+    assert compiled_filter.match_text("spam\nwith offer")
+    assert not compiled_filter.match_text("hello")
+
+
+def test_numbered_backreferences_stay_in_own_rule():
+    compiled_filter = compile_filter(regex_rules(r"(a)\1", r"(b)\1"))
+
+    assert compiled_filter.match_text("aa")
+    assert compiled_filter.match_text("bb")
+    assert not compiled_filter.match_text("ab")
+
+
+def test_incorrect_regex_is_skipped():
+    compiled_filter = compile_filter(regex_rules("(unclosed", "spam"))
+
+    assert compiled_filter.match_text("spam")
@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import GetChat
+
+from dresscode_bot.services import database
+from dresscode_bot.services.telegram.handlers.dialog.handlers import generate_group_buttons
+
+
+OWNER_ID = 7
+
+
+async def get_managed_chats(dsn: str) -> tuple[list, int]:
+    database_service = database.Service(dsn=dsn)
+    await database_service.migrate_async()
+    owner = await database_service.get_or_create_user(id=OWNER_ID, full_name="owner")
+    await database_service.add_new_chat(id=-1, owner=owner, title="active")
+    left_chat = await database_service.add_new_chat(id=-2, owner=owner, title="left")
+    await database_service.set_chat_left(chat=left_chat, left=True)
+
+    chats, count = await database_service.get_managed_chats(user_id=OWNER_ID)
+    await database_service.stop()
+    return chats, count
+
+
+def test_left_chats_are_not_listed(dsn: str):
+    assert asyncio.run(get_managed_chats(dsn=dsn)) == ([(-1, "active")], 1)
+
+
+class Bot:
+    async def get_chat(self, chat_id: int):
+        method = GetChat(chat_id=chat_id)
+        raise TelegramForbiddenError(method=method, message="Forbidden: bot was kicked")
+
+
+def test_removed_chat_without_title_is_shown_by_id():
+    service = SimpleNamespace(bot=Bot())
+
+    buttons = asyncio.run(generate_group_buttons(service=service, groups=[(-100, None)]))
+
+    assert [button.text for button in buttons] == ["-100"]
@@ -0,0 +1,60 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+
+
+ROOT = Path(__file__).parent.parent
+# Eager imports of service stacks took about 2 seconds, lazy CLI takes about 0.2
+CLI_IMPORT_BUDGET = 1.0
+HEAVY_MODULES = ("aiogram", "aiohttp")
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def get_import_time(stderr: str, module: str) -> float:
+    # Line format: "import time: self [us] | cumulative | imported package"
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1_000_000
+    raise AssertionError(f"module {module!r} was not imported")
+
+
+def test_cli_import_time():
+    result = run_python("from dresscode_bot.cli import get_cli; get_cli()", "-X", "importtime")
+
+    assert get_import_time(result.stderr, "dresscode_bot.cli") < CLI_IMPORT_BUDGET
+
+
+def test_migrations_do_not_import_telegram_stack(tmp_path: Path):
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump({
+        "database": {"dsn": f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"},
+        "telegram": {"token": "1:token"},
+    }))
+    code = (
+        "import json, sys\n"
+        "from dresscode_bot.cli import get_cli\n"
+        f"args = ['--config', {str(config_path)!r}, 'database', 'migrations', 'migrate']\n"
+        "get_cli()(args, standalone_mode=False)\n"
+        "print(json.dumps(sorted({name.split('.')[0] for name in sys.modules})))\n"
+    )
+    result = run_python(code)
+
+    modules = json.loads(result.stdout.splitlines()[-1])
+    assert "alembic" in modules
+    for module in HEAVY_MODULES:
+        assert module not in modules
@@ -0,0 +1,43 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendMessage
+
+from dresscode_bot.services.database.models import ChatStatKindEnum
+from dresscode_bot.services.telegram.handlers.new_member import new_member_handler
+
+
+class FailingCaptcha:
+    async def challenge(self, chat_id: int, **kwargs):
+        method = SendMessage(chat_id=chat_id, text="captcha")
+        raise TelegramBadRequest(method=method, message="Bad Request: not enough rights")
+
+
+def make_event() -> SimpleNamespace:
+    return SimpleNamespace(
+        chat=SimpleNamespace(id=-100, title="chat", full_name="chat"),
+        new_chat_member=SimpleNamespace(
+            user=SimpleNamespace(id=5, full_name="user", language_code=None),
+        ),
+    )
+
+
+def test_failed_restriction_is_counted(service):
+    service.bot.fail = True
+
+    asyncio.run(new_member_handler(event=make_event(), service=service))
+
+    assert service.stats.counts[-100, ChatStatKindEnum.JOINS] == 1
+    assert service.stats.counts[-100, ChatStatKindEnum.RESTRICTION_FAILURES] == 1
+    assert service.stats.counts[-100, ChatStatKindEnum.RESTRICTIONS] == 0
+
+
+def test_failed_challenge_lifts_restrictions(service):
+    service.captcha = FailingCaptcha()
+
+    asyncio.run(new_member_handler(event=make_event(), service=service))
+
+    assert service.stats.counts[-100, ChatStatKindEnum.RESTRICTIONS] == 1
+    assert len(service.bot.permissions) == 2
+    assert service.bot.permissions[-1].can_send_messages
@@ -0,0 +1,32 @@
+import asyncio
+
+from dresscode_bot.services.telegram.policy import DEFAULT_POLICY, PolicyCache
+
+
+class Bus:
+    def subscribe(self, entity, evict, reset=None):
+        self.evict = evict
+
+
+class Database:
+    def __init__(self):
+        self.bus = Bus()
+        self.reads = 0
+
+    async def get_chat_policy(self, chat_id: int) -> None:
+        self.reads += 1
+        if self.reads == 1:
+            # Policy changes in another process while the first read is in flight
+            self.bus.evict(chat_id)
+        return None
+
+
+def test_policy_invalidated_during_read_is_not_cached():
+    database_service = Database()
+    policies = PolicyCache(database_service=database_service)
+
+    async def get_twice() -> list:
+        return [await policies.get(chat_id=-100) for _ in range(2)]
+
+    assert asyncio.run(get_twice()) == [DEFAULT_POLICY, DEFAULT_POLICY]
+    assert database_service.reads == 2
@@ -0,0 +1,16 @@
+import asyncio
+
+from dresscode_bot.services.database.models import ScheduledActionKindEnum
+from dresscode_bot.services.telegram.functions.restrictions import MemberRestrictionFunction
+
+
+def test_restriction_replaces_pending_unrestrict(service):
+    service.policies.policy.duration = 60
+
+    async def rejoin():
+        await MemberRestrictionFunction.restrict(service=service, chat_id=-100, user_id=5)
+        await MemberRestrictionFunction.restrict(service=service, chat_id=-100, user_id=5)
+
+    asyncio.run(rejoin())
+
+    assert service.scheduler.actions == [(ScheduledActionKindEnum.UNRESTRICT, -100, 5)]
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import update
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.models import ChatStatKindEnum, User
+
+
+CHAT_ID = -1001234567890
+OWNER_ID = 7
+MEMBER_ID = 42
+
+
+async def delete_left_member(dsn: str, before: timedelta, forget_last_seen: bool = False) -> int:
+    database_service = database.Service(dsn=dsn)
+    await database_service.migrate_async()
+    owner = await database_service.get_or_create_user(id=OWNER_ID, full_name="owner")
+    chat = await database_service.add_new_chat(id=CHAT_ID, owner=owner)
+    await database_service.add_chat_members(chat=chat, members=[(MEMBER_ID, "member")])
+    if forget_last_seen:
+        # Members synced before the fix were saved without last seen time
+        async def operation(session):
+            await session.execute(
+                update(User).where(User.telegram_id == MEMBER_ID).values(last_seen_at=None),
+            )
+
+        await database_service._write(operation)
+    member = await database_service.get_user(id=MEMBER_ID)
+    await database_service.remove_chat_user(chat=chat, user=member)
+
+    _, deleted = await database_service.delete_stale_users(
+        after_id=None,
+        limit=100,
+        before=datetime.utcnow() + before,
+    )
+    await database_service.stop()
+    return deleted
+
+
+def test_synced_member_is_deleted_when_stale(tmp_path: Path):
+    dsn = f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"
+
+    assert asyncio.run(delete_left_member(dsn=dsn, before=timedelta(days=1))) == 1
+
+
+def test_synced_member_is_kept_when_recent(tmp_path: Path):
+    dsn = f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"
+
+    assert asyncio.run(delete_left_member(dsn=dsn, before=timedelta(days=-1))) == 0
+
+
+def test_synced_member_without_last_seen_is_stale(tmp_path: Path):
+    dsn = f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"
+    deleted = asyncio.run(delete_left_member(
+        dsn=dsn,
+        before=timedelta(days=-1),
+        forget_last_seen=True,
+    ))
+
+    assert deleted == 1
+
+
+async def delete_old_stats(dsn: str, limit: int) -> list[int]:
+    database_service = database.Service(dsn=dsn)
+    await database_service.migrate_async()
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    await database_service.add_chat_stats({
+        (CHAT_ID, now - timedelta(hours=hours), ChatStatKindEnum.JOINS): 1
+        for hours in range(12)
+    })
+
+    batches, after_id = [], None
+    while True:
+        after_id, count = await database_service.delete_old_chat_stats(
+            after_id=after_id,
+            limit=limit,
+            before=now - timedelta(hours=1, minutes=30),
+        )
+        batches.append(count)
+        if after_id is None:
+            break
+    await database_service.stop()
+    return batches
+
+
+def test_hourly_stats_of_one_chat_are_deleted_in_batches(tmp_path: Path):
+    dsn = f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}"
+    batches = asyncio.run(delete_old_stats(dsn=dsn, limit=4))
+
+    assert batches == [4, 4, 2]
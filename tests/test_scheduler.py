@@ -0,0 +1,163 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from dresscode_bot.services import database
+from dresscode_bot.services.database.models import ScheduledAction, ScheduledActionKindEnum
+from dresscode_bot.services.telegram.scheduler import Scheduler, TimingWheel
+
+
+UNRESTRICT = ScheduledActionKindEnum.UNRESTRICT
+
+
+def advance(wheel: TimingWheel, ticks: int) -> dict[int, list]:
+    return {wheel.tick: due for _ in range(ticks) if (due := wheel.advance())}
+
+
+def test_wheel_fires_items_at_their_ticks():
+    wheel = TimingWheel()
+    wheel.add(tick=3, item="inner")
+    wheel.add(tick=130, item="outer")
+
+    assert len(wheel) == 2
+    assert advance(wheel, ticks=200) == {3: ["inner"], 130: ["outer"]}
+    assert len(wheel) == 0
+
+
+def test_wheel_fires_overdue_items_on_next_tick():
+    wheel = TimingWheel()
+    advance(wheel, ticks=10)
+    wheel.add(tick=2, item="overdue")
+
+    assert wheel.advance() == ["overdue"]
+
+
+def test_wheel_rejects_items_beyond_capacity():
+    wheel = TimingWheel()
+
+    assert wheel.add(tick=wheel.capacity - 1, item="last")
+    assert not wheel.add(tick=wheel.capacity + 60, item="too late")
+    assert len(wheel) == 1
+
+
+async def wait_until(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not await condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def run_scheduler(dsn: str, scenario, handler=None, **parameters):
+    database_service = database.Service(dsn=dsn)
+    await database_service.migrate_async()
+    scheduler = Scheduler(
+        database_service=database_service,
+        tick=0.01,
+        reload_interval=10.0,
+        batch_delay=0,
+        **parameters,
+    )
+
+    calls = []
+
+    async def record(action: ScheduledAction) -> bool:
+        calls.append(time.monotonic())
+        return True
+
+    scheduler.register(UNRESTRICT, handler or record)
+
+    async def is_empty() -> bool:
+        until = datetime.utcnow() + timedelta(days=1)
+        return not await database_service.get_scheduled_actions(until=until)
+
+    async with scheduler:
+        await scenario(database_service, scheduler, is_empty)
+    return calls
+
+
+def test_reload_window_limits_loaded_actions(dsn: str):
+    async def scenario(database_service, scheduler, is_empty):
+        # Horizon is 35.4 seconds, so actions due before 25.4 seconds are loaded
+        for delay in (5, 30):
+            await scheduler.schedule(kind=UNRESTRICT, chat_id=-100, user_id=delay, delay=delay)
+        assert len(scheduler._wheel) == 1
+
+        await scheduler._load()
+        assert len(scheduler._wheel) == 1
+
+    asyncio.run(run_scheduler(dsn=dsn, scenario=scenario))
+
+
+def test_overdue_actions_fire_after_start(dsn: str):
+    async def scenario(database_service, scheduler, is_empty):
+        await wait_until(is_empty)
+
+    async def prepare():
+        database_service = database.Service(dsn=dsn)
+        await database_service.migrate_async()
+        await database_service.add_scheduled_action(
+            kind=UNRESTRICT,
+            chat_id=-100,
+            user_id=5,
+            due_at=datetime.utcnow() - timedelta(minutes=1),
+        )
+        await database_service.stop()
+
+    asyncio.run(prepare())
+    calls = asyncio.run(run_scheduler(dsn=dsn, scenario=scenario))
+
+    assert len(calls) == 1
+
+
+def test_failed_action_is_retried_with_backoff(dsn: str):
+    calls = []
+
+    async def handler(action: ScheduledAction) -> bool:
+        calls.append(time.monotonic())
+        return len(calls) > 1
+
+    async def scenario(database_service, scheduler, is_empty):
+        await scheduler.schedule(kind=UNRESTRICT, chat_id=-100, user_id=5, delay=0)
+        await wait_until(is_empty)
+
+    asyncio.run(run_scheduler(dsn=dsn, scenario=scenario, handler=handler, retry_delay=0.2))
+
+    assert len(calls) == 2
+    # Due time is stored with microseconds, so backoff is checked with a small tolerance
+    assert calls[1] - calls[0] >= 0.19
+
+
+def test_failed_action_is_dropped_after_max_attempts(dsn: str):
+    calls = []
+
+    async def handler(action: ScheduledAction) -> bool:
+        calls.append(time.monotonic())
+        return False
+
+    async def scenario(database_service, scheduler, is_empty):
+        await scheduler.schedule(kind=UNRESTRICT, chat_id=-100, user_id=5, delay=0)
+        await wait_until(is_empty)
+
+    asyncio.run(run_scheduler(
+        dsn=dsn,
+        scenario=scenario,
+        handler=handler,
+        retry_delay=0.05,
+        max_attempts=3,
+    ))
+
+    assert len(calls) == 3
+
+
+def test_cancelled_action_is_not_fired(dsn: str):
+    async def scenario(database_service, scheduler, is_empty):
+        await scheduler.schedule(kind=UNRESTRICT, chat_id=-100, user_id=5, delay=0.2)
+        await scheduler.schedule(kind=UNRESTRICT, chat_id=-100, user_id=6, delay=0.2)
+
+        assert await scheduler.cancel(kind=UNRESTRICT, chat_id=-100, user_id=5) == 1
+        await wait_until(is_empty)
+        await asyncio.sleep(0.1)
+
+    calls = asyncio.run(run_scheduler(dsn=dsn, scenario=scenario))
+
+    assert len(calls) == 1
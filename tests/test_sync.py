@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.enums import ChatMemberStatus
+
+from dresscode_bot.services.telegram.policy import DEFAULT_POLICY, CompiledPolicy, build_permissions
+from dresscode_bot.services.telegram.sync import ChatMembersSync
+
+
+CHAT = SimpleNamespace(telegram_id=-100, owner_id=7)
+
+
+class Bot:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_chat_member(self, chat_id: int, user_id: int) -> SimpleNamespace:
+        self.calls += 1
+        return SimpleNamespace(status=ChatMemberStatus.MEMBER, is_member=True)
+
+    async def get_chat_administrators(self, chat_id: int) -> list:
+        return []
+
+
+class Database:
+    def __init__(self, users: int):
+        self.users = [(id, f"user {id}") for id in range(1, users + 1)]
+        self.members = []
+        self.finished = False
+
+    async def count_users(self, after_id: int = 0) -> int:
+        return sum(1 for id, _ in self.users if id > after_id)
+
+    async def get_users_page(self, after_id: int = 0, limit: int = 1000) -> list:
+        return [user for user in self.users if user[0] > after_id][:limit]
+
+    async def get_chat_sync(self, chat_id: int) -> None:
+        return None
+
+    async def set_chat_sync_cursor(self, chat_id: int, cursor: int, finished: bool = False):
+        self.finished = finished
+
+    async def add_chat_members(self, chat, members: list):
+        self.members.extend(members)
+
+
+class Policies:
+    def __init__(self, policy: CompiledPolicy):
+        self.policy = policy
+
+    async def get(self, chat_id: int) -> CompiledPolicy:
+        return self.policy
+
+
+def sync(policy: CompiledPolicy, users: int = 10, max_users: int | None = None) -> tuple:
+    bot, database_service, restricted = Bot(), Database(users=users), []
+
+    async def restrict(chat_id: int, user_id: int) -> bool:
+        restricted.append(user_id)
+        return True
+
+    members_sync = ChatMembersSync(
+        bot=bot,
+        database_service=database_service,
+        policies=Policies(policy=policy),
+        restrict=restrict,
+        batch_size=4,
+        batch_delay=0,
+        max_users=max_users,
+    )
+    asyncio.run(members_sync.run(chat=CHAT))
+    return bot, database_service, restricted
+
+
+def test_default_policy_is_not_applied_to_members():
+    _, database_service, restricted = sync(policy=DEFAULT_POLICY)
+
+    assert len(database_service.members) == 9
+    assert restricted == []
+
+
+def test_stored_policy_is_applied_to_members():
+    policy = CompiledPolicy(permissions=build_permissions(grants=set()))
+
+    _, _, restricted = sync(policy=policy)
+
+    assert restricted == [id for id in range(1, 11) if id != CHAT.owner_id]
+
+
+def test_checked_users_are_capped():
+    bot, database_service, _ = sync(policy=DEFAULT_POLICY, users=10, max_users=6)
+
+    assert bot.calls == 6
+    assert database_service.finished
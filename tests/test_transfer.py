@@ -0,0 +1,13 @@
+from dresscode_bot.services.database.models import Base
+from dresscode_bot.services.database.transfer import EXCLUDED_TABLES, TABLES
+
+
+def test_every_table_is_exported_or_excluded():
+    assert set(TABLES).isdisjoint(EXCLUDED_TABLES)
+    assert set(TABLES) | set(EXCLUDED_TABLES) == set(Base.metadata.tables)
+
+
+def test_parent_tables_are_exported_first():
+    for position, name in enumerate(TABLES):
+        for key in Base.metadata.tables[name].foreign_keys:
+            assert TABLES.index(key.column.table.name) < position